@@ -2,26 +2,48 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import signal
 from contextlib import suppress
+from datetime import timedelta
+from functools import partial
+from multiprocessing.queues import Queue
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 
+from app import runtime
 from app.config import Settings
-from app.db.db import init_engine_and_schema
-from app.db.migrations import run_migrations
+from app.fsm_storage import SQLStorage
 from app.handlers import add_product as add_handlers
+from app.handlers import admin as admin_handlers
 from app.handlers import products as products_handlers
 from app.handlers import settings as settings_handlers
 from app.handlers import start as start_handlers
-from app.metrics import start_metrics_server, stop_metrics_server
+from app.leader import LeaderElector
+from app.metrics import start_metrics_server
 from app.middlewares.db_session import DBSessionMiddleware
 from app.middlewares.errors import ErrorsMiddleware
-from app.scheduler import setup_scheduler
-from app.services.marketplace_client import shutdown_browser
+from app.middlewares.telegram_timing import TelegramTimingMiddleware
+from app.outbox import OutboxDelivery
+from app.services.fetch_jobs import FetchJobClient
+from app.supervisor import ShardForwarder, WorkerPool, consume_updates
+from app.webhook import add_webhook_routes, register_webhook, wait_for_shutdown
+
+logger = logging.getLogger(__name__)
+
+ROUTERS = (
+    start_handlers.router,
+    settings_handlers.router,
+    add_handlers.router,
+    products_handlers.router,
+    admin_handlers.router,
+)
 
 
 async def setup_bot_commands(bot: Bot) -> None:
@@ -32,76 +54,249 @@ async def setup_bot_commands(bot: Bot) -> None:
     await bot.set_my_commands(cmds)
 
 
-async def main() -> None:
-    settings = Settings.from_env()
-
-    logging.basicConfig(
-        level=getattr(logging, settings.log_level.upper(), logging.INFO),
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        force=True,
-    )
-
-    logger = logging.getLogger(__name__)
-
-    if settings.auto_migrate:
-        logger.info("AUTO_MIGRATE is enabled, running database migrations...")
-        try:
-            run_migrations(settings.database_url)
-        except Exception as e:
-            logger.error("Failed to run migrations: %s", e)
-            raise
-
-    engine, session_maker = init_engine_and_schema(settings.database_url)
-
+def _create_bot(settings: Settings) -> Bot:
     bot = Bot(
         token=settings.bot_token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
-    dp = Dispatcher(storage=MemoryStorage())
+    bot.session.middleware(TelegramTimingMiddleware())
+    return bot
+
+
+def build_dispatcher(
+    settings: Settings, session_maker: async_sessionmaker[AsyncSession]
+) -> Dispatcher:
+    storage: BaseStorage
+    if settings.fsm_storage == "sql":
+        storage = SQLStorage(
+            session_maker,
+            state_ttl=timedelta(hours=settings.fsm_state_ttl_hours),
+            cache_seconds=settings.fsm_cache_seconds,
+        )
+    else:
+        storage = MemoryStorage()
+    dp = Dispatcher(storage=storage, admin_ids=settings.admin_ids)
+    if settings.scraper_mode == "worker":
+        dp["fetch_product"] = FetchJobClient(
+            session_maker, timeout=settings.fetch_job_timeout_seconds
+        )
 
     errmw = ErrorsMiddleware(session_maker)
     dp.message.middleware(errmw)
     dp.callback_query.middleware(errmw)
 
-    dbmw = DBSessionMiddleware(session_maker)
+    dbmw = DBSessionMiddleware(session_maker, lazy=settings.db_session_mode == "lazy")
     dp.message.middleware(dbmw)
     dp.callback_query.middleware(dbmw)
 
-    dp.include_router(start_handlers.router)
-    dp.include_router(settings_handlers.router)
-    dp.include_router(add_handlers.router)
-    dp.include_router(products_handlers.router)
+    for router in ROUTERS:
+        dp.include_router(router)
+    return dp
+
+
+async def _start_http_server(
+    settings: Settings, dp: Dispatcher, bot: Bot, *, port: int, webhook: bool
+) -> None:
+    if not (settings.metrics_enabled or webhook):
+        return
+
+    setup_app = (
+        partial(
+            add_webhook_routes,
+            dispatcher=dp,
+            bot=bot,
+            path=settings.webhook_path,
+            secret_token=settings.webhook_secret,
+        )
+        if webhook
+        else None
+    )
+    try:
+        await start_metrics_server(
+            settings.metrics_host,
+            port,
+            profiling_token=settings.profiling_token,
+            expose_metrics=settings.metrics_enabled,
+            setup_app=setup_app,
+        )
+        if settings.metrics_enabled:
+            logger.info(
+                "Prometheus metrics exposed at http://%s:%s/metrics", settings.metrics_host, port
+            )
+    except Exception as exc:
+        if webhook:
+            raise
+        logger.warning("Failed to start metrics server: %s", exc)
+
+
+async def _register_webhook(settings: Settings, dp: Dispatcher, bot: Bot) -> None:
+    await register_webhook(
+        bot,
+        dp,
+        url=settings.webhook_url + settings.webhook_path,
+        secret_token=settings.webhook_secret,
+    )
+
+
+async def _start_background_jobs(
+    settings: Settings,
+    bot: Bot,
+    engine: AsyncEngine,
+    session_maker: async_sessionmaker[AsyncSession],
+) -> tuple[AsyncIOScheduler | None, LeaderElector | None, OutboxDelivery | None]:
+    """The scheduler, or with SCRAPER_MODE=worker the delivery of the worker's notifications."""
+    if settings.scraper_mode == "worker":
+        outbox = OutboxDelivery(bot, session_maker)
+        await outbox.start()
+        return None, None, outbox
+    scheduler, leader = await runtime.start_scheduler(settings, bot, engine, session_maker)
+    return scheduler, leader, None
+
+
+async def main() -> None:
+    settings = Settings.from_env()
+    runtime.setup_logging(settings)
+
+    if settings.bot_workers > 1:
+        await run_supervisor(settings)
+        return
 
-    await bot.delete_webhook(drop_pending_updates=True)
+    runtime.configure_services(settings, scraping=settings.scraper_mode == "embedded")
+    runtime.migrate(settings)
+
+    engine, session_maker = runtime.init_db(settings)
+
+    bot = _create_bot(settings)
+    dp = build_dispatcher(settings, session_maker)
+
+    webhook = settings.bot_mode == "webhook"
+    if not webhook:
+        await bot.delete_webhook(drop_pending_updates=True)
     await setup_bot_commands(bot)
 
-    if settings.metrics_enabled:
-        try:
-            await start_metrics_server(settings.metrics_host, settings.metrics_port)
+    await _start_http_server(settings, dp, bot, port=settings.metrics_port, webhook=webhook)
+    if webhook:
+        await _register_webhook(settings, dp, bot)
+
+    loop_monitor = await runtime.start_loop_monitor(settings)
+    scheduler, leader, outbox = await _start_background_jobs(settings, bot, engine, session_maker)
+
+    try:
+        if webhook:
             logger.info(
-                "Prometheus metrics exposed at http://%s:%s/metrics",
-                settings.metrics_host,
+                "Bot started. Receiving updates at %s%s on port %s with scheduler...",
+                settings.webhook_url,
+                settings.webhook_path,
                 settings.metrics_port,
             )
-        except Exception as exc:
-            logger.warning("Failed to start metrics server: %s", exc)
+            await wait_for_shutdown()
+        else:
+            logger.info("Bot started. Polling with scheduler...")
+            await dp.start_polling(bot)
+    finally:
+        await runtime.shutdown(
+            bot=bot,
+            scheduler=scheduler,
+            leader=leader,
+            outbox=outbox,
+            loop_monitor=loop_monitor,
+            engine=engine,
+        )
+
 
-    scheduler = setup_scheduler(bot, settings.price_check_hours, session_maker)
+async def run_supervisor(settings: Settings) -> None:
+    """Receive updates here and hand each chat's updates to one of `bot_workers` processes.
 
-    logger.info("Bot started. Polling with scheduler...")
+    Worker 0 also runs the scheduler and the parse pool; every worker serves its own
+    metrics on ``METRICS_PORT + 1 + shard`` and, with ``SCRAPER_MODE=embedded``, has
+    its own fetch pool and launches its own Chromium on its first Ozon lookup.
+    """
+    runtime.migrate(settings)
+
+    bot = _create_bot(settings)
+    pool = WorkerPool(run_worker, settings.bot_workers)
+    dp = Dispatcher()
+    dp.update.outer_middleware(ShardForwarder(pool.queues))
+    # Handlers never run here; the routers only tell polling and set_webhook
+    # which update types to request.
+    for router in ROUTERS:
+        dp.include_router(router)
+
+    webhook = settings.bot_mode == "webhook"
+    if not webhook:
+        await bot.delete_webhook(drop_pending_updates=True)
+    await setup_bot_commands(bot)
+
+    pool.start()
     try:
-        await dp.start_polling(bot)
+        await _start_http_server(settings, dp, bot, port=settings.metrics_port, webhook=webhook)
+        if webhook:
+            await _register_webhook(settings, dp, bot)
+            logger.info(
+                "Supervisor started with %d workers, receiving updates at %s%s",
+                settings.bot_workers,
+                settings.webhook_url,
+                settings.webhook_path,
+            )
+            await wait_for_shutdown()
+        else:
+            logger.info("Supervisor started with %d workers, polling", settings.bot_workers)
+            await dp.start_polling(bot)
     finally:
         with suppress(Exception):
-            scheduler.shutdown(wait=False)
-        with suppress(Exception):
-            await bot.session.close()
-        with suppress(Exception):
-            await shutdown_browser()
-        with suppress(Exception):
-            await stop_metrics_server()
+            await pool.stop()
+        await runtime.shutdown(bot=bot)
+
+
+def run_worker(shard: int, workers: int, updates: Queue[str | None]) -> None:
+    # The supervisor owns shutdown and stops workers through their queues.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    asyncio.run(_worker_main(shard, workers, updates))
+
+
+async def _worker_main(shard: int, workers: int, updates: Queue[str | None]) -> None:
+    settings = Settings.from_env()
+    runtime.setup_logging(settings, prefix=f"worker-{shard} | ")
+    # Only worker 0 runs the scheduler's bulk refresh, so only it gets a parse pool;
+    # the others parse the occasional handler lookup inline.
+    runtime.configure_services(
+        settings, scraping=settings.scraper_mode == "embedded" and shard == 0
+    )
+
+    engine, session_maker = runtime.init_db(settings)
+    bot = _create_bot(settings)
+    dp = build_dispatcher(settings, session_maker)
+
+    await _start_http_server(
+        settings, dp, bot, port=settings.metrics_port + 1 + shard, webhook=False
+    )
+    loop_monitor = await runtime.start_loop_monitor(settings)
+    scheduler: AsyncIOScheduler | None = None
+    leader: LeaderElector | None = None
+    outbox: OutboxDelivery | None = None
+    if shard == 0:
+        scheduler, leader, outbox = await _start_background_jobs(
+            settings, bot, engine, session_maker
+        )
+
+    logger.info(
+        "Worker %d/%d started%s", shard, workers, " with background jobs" if shard == 0 else ""
+    )
+    try:
+        await dp.emit_startup(bot=bot, **dp.workflow_data)
+        await consume_updates(updates, dp, bot)
+    finally:
         with suppress(Exception):
-            await engine.dispose()
+            await dp.emit_shutdown(bot=bot, **dp.workflow_data)
+        await runtime.shutdown(
+            bot=bot,
+            scheduler=scheduler,
+            leader=leader,
+            outbox=outbox,
+            loop_monitor=loop_monitor,
+            engine=engine,
+        )
 
 
 if __name__ == "__main__":
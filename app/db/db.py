@@ -2,7 +2,11 @@ from __future__ import annotations
 
 import logging
 from collections.abc import AsyncGenerator
+from dataclasses import dataclass
+from typing import Any
 
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -10,25 +14,118 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 
+from app.db.instrumentation import InstrumentedQueuePool, instrument_engine
+from app.db.replica import DEFAULT_MAX_LAG_SECONDS, ReplicaRouter
+from app.db.sessions import ReleasingSession
+
 logger = logging.getLogger(__name__)
 
 async_engine: AsyncEngine | None = None
 async_session: async_sessionmaker[AsyncSession] | None = None
 
 
-def init_engine_and_schema(dsn: str) -> tuple[AsyncEngine, async_sessionmaker[AsyncSession]]:
-    safe_dsn = dsn.split("@")[-1] if "@" in dsn else dsn
-    logger.info("Initializing database connection | DSN: %s", safe_dsn)
+@dataclass(frozen=True)
+class PoolConfig:
+    size: int = 10
+    max_overflow: int = 20
+    # Seconds before a connection is replaced; -1 keeps connections indefinitely.
+    recycle_seconds: int = -1
+    pre_ping: bool = True
+    # Prepared statements cached per connection; None keeps the driver default and
+    # 0 disables them (needed behind PgBouncer in transaction mode).
+    statement_cache_size: int | None = None
+
+
+def _safe_dsn(dsn: str) -> str:
+    return dsn.split("@")[-1] if "@" in dsn else dsn
+
+
+def _connect_args(driver: str, statement_cache_size: int | None) -> dict[str, Any]:
+    if statement_cache_size is None:
+        return {}
+    if driver == "asyncpg":
+        return {"prepared_statement_cache_size": statement_cache_size}
+    if driver == "psycopg" and statement_cache_size == 0:
+        return {"prepare_threshold": None}
+    return {}
+
+
+def _set_psycopg_prepared_max(engine: AsyncEngine, size: int) -> None:
+    def _on_connect(dbapi_connection: Any, record: Any) -> None:
+        dbapi_connection.driver_connection.prepared_max = size
+
+    event.listen(engine.sync_engine, "connect", _on_connect)
+
+
+def _create_engine(dsn: str, pool: PoolConfig, *, db_metrics: bool) -> AsyncEngine:
+    driver = make_url(dsn).get_driver_name()
+    engine = create_async_engine(
+        dsn,
+        pool_pre_ping=pool.pre_ping,
+        pool_size=pool.size,
+        max_overflow=pool.max_overflow,
+        pool_recycle=pool.recycle_seconds,
+        connect_args=_connect_args(driver, pool.statement_cache_size),
+        **({"poolclass": InstrumentedQueuePool} if db_metrics else {}),
+    )
+    if driver == "psycopg" and pool.statement_cache_size:
+        _set_psycopg_prepared_max(engine, pool.statement_cache_size)
+    return engine
+
+
+def _create_replica_router(
+    primary: AsyncEngine, dsn: str, pool: PoolConfig, *, max_lag_seconds: float
+) -> ReplicaRouter:
+    replica = _create_engine(dsn, pool, db_metrics=False)
+    # Pool metrics describe the primary; replica queries still count towards handler DB time.
+    instrument_engine(replica)
+
+    # Disposing the primary (on shutdown) closes the replica's connections as well.
+    @event.listens_for(primary.sync_engine, "engine_disposed")
+    def _dispose_replica(engine: Any) -> None:
+        replica.sync_engine.dispose()
+
+    logger.info(
+        "Read replica configured | DSN: %s | Max lag: %ss",
+        _safe_dsn(dsn),
+        max_lag_seconds,
+    )
+    return ReplicaRouter(replica, max_lag_seconds=max_lag_seconds)
+
+
+def init_engine_and_schema(
+    dsn: str,
+    *,
+    db_metrics: bool = False,
+    pool: PoolConfig | None = None,
+    replica_dsn: str | None = None,
+    replica_max_lag_seconds: float = DEFAULT_MAX_LAG_SECONDS,
+) -> tuple[AsyncEngine, async_sessionmaker[AsyncSession]]:
+    pool = pool or PoolConfig()
+    driver = make_url(dsn).get_driver_name()
+    logger.info("Initializing database connection | DSN: %s | Driver: %s", _safe_dsn(dsn), driver)
 
     try:
-        async_engine = create_async_engine(
-            dsn,
-            pool_pre_ping=True,
-            pool_size=10,
-            max_overflow=20,
+        async_engine = _create_engine(dsn, pool, db_metrics=db_metrics)
+        instrument_engine(async_engine, query_metrics=db_metrics)
+        replica = (
+            _create_replica_router(
+                async_engine, replica_dsn, pool, max_lag_seconds=replica_max_lag_seconds
+            )
+            if replica_dsn
+            else None
+        )
+        # ReleasingSession only differs when DBSessionMiddleware asks for a lazy session
+        # or a replica is configured.
+        async_session: async_sessionmaker[AsyncSession] = async_sessionmaker(
+            async_engine, class_=ReleasingSession, expire_on_commit=False, replica=replica
+        )
+        logger.info(
+            "Database engine initialized | Pool size: %d | Max overflow: %d | Recycle: %ss",
+            pool.size,
+            pool.max_overflow,
+            pool.recycle_seconds,
         )
-        async_session = async_sessionmaker(async_engine, expire_on_commit=False)
-        logger.info("Database engine initialized | Pool size: 10 | Max overflow: 20")
         return async_engine, async_session
     except Exception as e:
         logger.error("Failed to initialize database: %s", e)
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from functools import lru_cache
+from time import perf_counter
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
+
+from app.metrics import (
+    db_connection_hold_seconds,
+    db_pool_checkout_wait_seconds,
+    db_pool_connections,
+    db_pool_saturation_ratio,
+    db_query_duration_seconds,
+)
+from app.utils.handler_timing import add_db_time
+
+logger = logging.getLogger(__name__)
+
+_STARTED_KEY = "query_started_at"
+_CHECKED_OUT_KEY = "checked_out_at"
+# Further statements share one label so an unexpected query shape cannot blow up cardinality.
+MAX_FINGERPRINTS = 500
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"%\(\w+\)s|%s|\$\d+|\?")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+_OPERATION = re.compile(r"^(\w+)")
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE)\s+\"?(\w+)", re.IGNORECASE)
+
+_seen_fingerprints: set[str] = set()
+
+
+def normalize_statement(statement: str) -> str:
+    """Strip literals and bind parameters so one query shape maps to one string."""
+    sql = _STRING.sub("?", statement)
+    sql = _PARAM.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _LIST.sub("(?)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> tuple[str, str]:
+    """Metric labels for a statement, e.g. ``("select products", "3f2a9c0b1d4e")``."""
+    normalized = normalize_statement(statement)
+    op = _OPERATION.match(normalized)
+    table = _TABLE.search(normalized)
+    operation = " ".join(
+        part for part in (op and op.group(1).lower(), table and table.group(1).lower()) if part
+    )
+    digest = hashlib.sha1(normalized.encode(), usedforsecurity=False).hexdigest()[:12]
+    if digest not in _seen_fingerprints:
+        if len(_seen_fingerprints) >= MAX_FINGERPRINTS:
+            return operation or "other", "other"
+        _seen_fingerprints.add(digest)
+        logger.info("New query fingerprint %s: %s", digest, normalized[:500])
+    return operation or "other", digest
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    conn.info.setdefault(_STARTED_KEY, []).append(perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    started = conn.info[_STARTED_KEY].pop()
+    add_db_time(perf_counter() - started)
+
+
+def _after_cursor_execute_observed(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    elapsed = perf_counter() - conn.info[_STARTED_KEY].pop()
+    add_db_time(elapsed)
+    db_query_duration_seconds.labels(*fingerprint(statement)).observe(elapsed)
+
+
+def _handle_error(context: Any) -> None:
+    conn = context.connection
+    if conn is not None and conn.info.get(_STARTED_KEY):
+        conn.info[_STARTED_KEY].pop()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait_seconds.observe(perf_counter() - started)
+
+
+def _on_checkout(dbapi_conn: Any, record: ConnectionPoolEntry, proxy: Any) -> None:
+    record.info[_CHECKED_OUT_KEY] = perf_counter()
+
+
+def _on_checkin(dbapi_conn: Any, record: ConnectionPoolEntry) -> None:
+    started = record.info.pop(_CHECKED_OUT_KEY, None)
+    if started is not None:
+        db_connection_hold_seconds.observe(perf_counter() - started)
+
+
+def _track_pool(pool: QueuePool) -> None:
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    event.listen(pool, "checkout", _on_checkout)
+    event.listen(pool, "checkin", _on_checkin)
+    db_pool_connections.labels("checked_out").set_function(pool.checkedout)
+    db_pool_connections.labels("idle").set_function(pool.checkedin)
+    db_pool_saturation_ratio.set_function(lambda: pool.checkedout() / capacity)
+
+
+def instrument_engine(engine: AsyncEngine, *, query_metrics: bool = False) -> None:
+    """Charge query time to the current handler; optionally export query and pool metrics."""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    after = _after_cursor_execute_observed if query_metrics else _after_cursor_execute
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after)
+    event.listen(sync_engine, "handle_error", _handle_error)
+    if query_metrics and isinstance(sync_engine.pool, QueuePool):
+        _track_pool(sync_engine.pool)
@@ -31,7 +31,8 @@ def get_alembic_config(dsn: str | None = None) -> Config:
 
 
 def _convert_async_dsn_to_sync(dsn: str) -> str:
-    return dsn.replace("+aiosqlite", "").replace("+asyncpg", "")
+    # Alembic runs synchronously: asyncpg has no sync mode, psycopg 3 has both.
+    return dsn.replace("+aiosqlite", "").replace("+asyncpg", "+psycopg")
 
 
 def run_migrations(dsn: str | None = None, offline: bool = False) -> None:
@@ -82,7 +83,7 @@ def get_current_revision(dsn: str | None = None) -> str | None:
     if not db_url:
         raise ValueError("DATABASE_URL not provided")
 
-    engine = create_engine(db_url.replace("+aiosqlite", "").replace("+asyncpg", ""))
+    engine = create_engine(_convert_async_dsn_to_sync(db_url))
 
     try:
         with engine.begin() as conn:
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Literal
+from typing import Any, Literal
 
 from sqlalchemy import (
+    JSON,
     BigInteger,
     Boolean,
     CheckConstraint,
@@ -84,6 +85,8 @@ class Product(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
     created_at: Mapped[datetime] = mapped_column(server_default=text("CURRENT_TIMESTAMP"))
     updated_at: Mapped[datetime | None]
+    last_checked_at: Mapped[datetime | None]
+    next_check_at: Mapped[datetime | None]
 
     user: Mapped[User] = relationship(back_populates="products")
     history: Mapped[list[PriceHistory]] = relationship(
@@ -93,6 +96,7 @@ class Product(Base):
     __table_args__ = (
         UniqueConstraint("user_id", "url", name="uq_products_user_url"),
         Index("idx_products_user", "user_id"),
+        Index("idx_products_next_check", "next_check_at"),
     )
 
 
@@ -118,6 +122,92 @@ class PriceHistory(Base):
     )
 
 
+class SchedulerState(Base):
+    __tablename__ = "scheduler_state"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[str] = mapped_column(Text, nullable=False)
+    updated_at: Mapped[datetime | None]
+
+
+class RefreshRun(Base):
+    __tablename__ = "refresh_runs"
+
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    cycle: Mapped[str] = mapped_column(String(16), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    started_at: Mapped[datetime] = mapped_column(nullable=False)
+    finished_at: Mapped[datetime] = mapped_column(nullable=False)
+    products_checked: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Distinct URLs per cron cycle or rolling tick; an hourly rolling row sums its ticks.
+    fetches: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    errors: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    errors_by_type: Mapped[dict[str, int]] = mapped_column(JSON, nullable=False, default=dict)
+    blocks: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    notifications: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    fetch_p50_ms: Mapped[float | None]
+    fetch_p95_ms: Mapped[float | None]
+
+    __table_args__ = (Index("idx_refresh_runs_started", "started_at"),)
+
+
+class FsmState(Base):
+    __tablename__ = "fsm_states"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[str | None] = mapped_column(String(255))
+    data: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    expires_at: Mapped[datetime] = mapped_column(nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(nullable=False)
+
+    __table_args__ = (Index("idx_fsm_states_expires", "expires_at"),)
+
+
+class FetchJob(Base):
+    __tablename__ = "fetch_jobs"
+
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    url: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    result: Mapped[dict[str, Any] | None] = mapped_column(JSON)
+    error: Mapped[str | None] = mapped_column(String(255))
+    created_at: Mapped[datetime] = mapped_column(nullable=False)
+    started_at: Mapped[datetime | None]
+    finished_at: Mapped[datetime | None]
+
+    __table_args__ = (Index("idx_fetch_jobs_status_created", "status", "created_at"),)
+
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    reply_markup: Mapped[dict[str, Any] | None] = mapped_column(JSON)
+    disable_web_page_preview: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str | None] = mapped_column(String(255))
+    created_at: Mapped[datetime] = mapped_column(nullable=False)
+    claimed_at: Mapped[datetime | None]
+    sent_at: Mapped[datetime | None]
+
+    __table_args__ = (Index("idx_outbox_status_created", "status", "created_at"),)
+
+
 Index(
     "idx_pricehist_product",
     PriceHistory.product_id,
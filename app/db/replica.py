@@ -0,0 +1,135 @@
+"""Serving marked read-only statements from a streaming replica.
+
+Repositories mark statements that tolerate slightly stale data with `on_replica`.
+A session built with a `ReplicaRouter` sends those to the replica, except when:
+
+- its open transaction has written or locked rows;
+- the session has written one of the statement's tables, even if already committed,
+  so a handler reads back its own changes;
+- the session belongs to a writer (a Telegram user, see `DBSessionMiddleware`) whose
+  earlier session wrote one of the tables less than ``max_lag_seconds`` plus
+  ``check_interval`` ago, so the next update sees them too; this is per process;
+- the replica lags more than ``max_lag_seconds`` behind the primary.
+
+Anyone else may see a change up to ``max_lag_seconds`` late.
+
+Lag is probed on the replica at most every ``check_interval`` seconds, by the first
+marked statement that finds the last probe too old; an unreachable replica counts
+as lagging.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from collections.abc import Collection
+from time import monotonic
+from typing import TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.sql import Executable
+
+from app.metrics import db_replica_lag_seconds
+
+logger = logging.getLogger(__name__)
+
+READ_REPLICA = "read_replica"
+DEFAULT_MAX_LAG_SECONDS = 5.0
+CHECK_INTERVAL_SECONDS = 5.0
+
+# Zero when everything received has been replayed, so an idle primary does not
+# read as a growing lag; NULL on a server that is not a standby.
+_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+E = TypeVar("E", bound=Executable)
+
+
+def on_replica(statement: E) -> E:
+    """Allow `statement` to be served from the read replica, if one is configured."""
+    return statement.execution_options(**{READ_REPLICA: True})
+
+
+def wants_replica(statement: object) -> bool:
+    return isinstance(statement, Executable) and bool(
+        statement.get_execution_options().get(READ_REPLICA)
+    )
+
+
+async def replica_lag(conn: AsyncConnection) -> float:
+    if conn.dialect.name != "postgresql":
+        return 0.0
+    lag = await conn.scalar(_LAG_SQL)
+    return float(lag or 0.0)
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        *,
+        max_lag_seconds: float = DEFAULT_MAX_LAG_SECONDS,
+        check_interval: float = CHECK_INTERVAL_SECONDS,
+    ) -> None:
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.available = False
+        self._checked_at: float | None = None
+        self._checking = False
+        # writer -> (expires_at, tables), oldest expiry first.
+        self._recent: OrderedDict[int, tuple[float, frozenset[str]]] = OrderedDict()
+
+    def remember_writes(self, writer: int, tables: Collection[str]) -> None:
+        """Keep `writer`'s later sessions off the replica for `tables` until it caught up."""
+        if not tables:
+            return
+        now = monotonic()
+        previous = self._recent.pop(writer, None)
+        if previous is not None and previous[0] > now:
+            tables = previous[1].union(tables)
+        # A lag under max_lag_seconds may be up to check_interval old.
+        expires_at = now + self.max_lag_seconds + self.check_interval
+        self._recent[writer] = (expires_at, frozenset(tables))
+        while self._recent:
+            oldest = next(iter(self._recent.values()))
+            if oldest[0] > now:
+                break
+            self._recent.popitem(last=False)
+
+    def recent_writes(self, writer: int) -> frozenset[str]:
+        entry = self._recent.get(writer)
+        if entry is None or entry[0] <= monotonic():
+            return frozenset()
+        return entry[1]
+
+    async def refresh(self) -> None:
+        """Re-probe the replica lag if the last probe is older than `check_interval`."""
+        if self._checking or (
+            self._checked_at is not None and monotonic() - self._checked_at < self.check_interval
+        ):
+            return
+        first = self._checked_at is None
+        self._checking = True
+        try:
+            async with self.engine.connect() as conn:
+                lag = await replica_lag(conn)
+        except Exception as e:
+            self._set_available(False, f"unreachable: {e}", first=first)
+            return
+        finally:
+            self._checking = False
+            self._checked_at = monotonic()
+        db_replica_lag_seconds.set(lag)
+        self._set_available(lag <= self.max_lag_seconds, f"lag {lag:.1f}s", first=first)
+
+    def _set_available(self, available: bool, reason: str, *, first: bool) -> None:
+        if first or available != self.available:
+            if available:
+                logger.info("Read replica in use (%s)", reason)
+            else:
+                logger.warning("Read replica not used, reading from the primary (%s)", reason)
+        self.available = available
@@ -0,0 +1,159 @@
+"""Sessions that hand their connection back to the pool between read-only statements.
+
+A plain ``AsyncSession`` keeps its connection from the first query until commit or
+close, so a handler that read something and then waits on Telegram or a marketplace
+holds a pool slot the whole time. With ``release_between_queries=True`` the session
+commits a transaction that has only read, right after the statement; the next
+statement checks out a connection again. Transactions that wrote, flushed or took
+row locks are left to the caller as usual.
+
+Given a ``replica`` router, the same tracking decides whether statements marked with
+``on_replica`` may go to the read replica (see app.db.replica).
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import Connection, Engine, event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session, SessionTransaction
+from sqlalchemy.sql.util import find_tables
+
+from app.db.replica import ReplicaRouter, wants_replica
+from app.metrics import db_replica_statements_total
+
+_HOLD_KEY = "hold_connection"
+# Tables this session has written to, kept past commit: the replica may not have them yet.
+_WRITTEN_KEY = "written_tables"
+# Tables the session's writer wrote in earlier sessions that the replica may still miss.
+_RECENT_KEY = "recently_written_tables"
+
+
+class _TrackedSession(Session):
+    replica: ReplicaRouter | None = None
+
+    def get_bind(self, mapper: Any = None, *, clause: Any = None, **kw: Any) -> Engine | Connection:
+        if self.replica is not None and wants_replica(clause):
+            if self._replica_allowed(clause):
+                db_replica_statements_total.labels("replica").inc()
+                return self.replica.engine.sync_engine
+            db_replica_statements_total.labels("primary").inc()
+        return super().get_bind(mapper, clause=clause, **kw)
+
+    def _replica_allowed(self, clause: Any) -> bool:
+        assert self.replica is not None
+        if not self.replica.available or self.info.get(_HOLD_KEY):
+            return False
+        written = self.info.get(_WRITTEN_KEY, set()) | self.info.get(_RECENT_KEY, frozenset())
+        return not written or all(t.name not in written for t in find_tables(clause))
+
+
+def _mark_written(session: Session, *tables: str) -> None:
+    session.info.setdefault(_WRITTEN_KEY, set()).update(tables)
+
+
+@event.listens_for(_TrackedSession, "do_orm_execute")
+def _track_statement(state: ORMExecuteState) -> None:
+    if not state.is_select or getattr(state.statement, "_for_update_arg", None) is not None:
+        state.session.info[_HOLD_KEY] = True
+    table = getattr(state.statement, "table", None)
+    if not state.is_select and table is not None:
+        _mark_written(state.session, table.name)
+
+
+@event.listens_for(_TrackedSession, "after_flush")
+def _track_flush(session: Session, flush_context: Any) -> None:
+    session.info[_HOLD_KEY] = True
+    _mark_written(
+        session,
+        *(
+            table.name
+            for obj in (*session.new, *session.dirty, *session.deleted)
+            for table in inspect(obj).mapper.tables
+        ),
+    )
+
+
+@event.listens_for(_TrackedSession, "after_transaction_end")
+def _reset(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_HOLD_KEY, None)
+
+
+class ReleasingSession(AsyncSession):
+    sync_session_class = _TrackedSession
+    sync_session: _TrackedSession
+
+    def __init__(
+        self,
+        *args: Any,
+        release_between_queries: bool = False,
+        replica: ReplicaRouter | None = None,
+        writer: int | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.release_between_queries = release_between_queries
+        self.replica = replica
+        self.sync_session.replica = replica
+        # Sessions of the same writer read back each other's recent writes.
+        self.writer = writer
+        if replica is not None and writer is not None:
+            self.info[_RECENT_KEY] = replica.recent_writes(writer)
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        await self._probe_replica(statement)
+        result = await super().execute(statement, *args, **kwargs)
+        await self._release()
+        return result
+
+    async def scalar(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        await self._probe_replica(statement)
+        result = await super().scalar(statement, *args, **kwargs)
+        await self._release()
+        return result
+
+    async def scalars(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        await self._probe_replica(statement)
+        result = await super().scalars(statement, *args, **kwargs)
+        await self._release()
+        return result
+
+    async def stream(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        await self._probe_replica(statement)
+        return await super().stream(statement, *args, **kwargs)
+
+    async def stream_scalars(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        await self._probe_replica(statement)
+        return await super().stream_scalars(statement, *args, **kwargs)
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        result = await super().get(*args, **kwargs)
+        await self._release()
+        return result
+
+    async def refresh(self, *args: Any, **kwargs: Any) -> None:
+        await super().refresh(*args, **kwargs)
+        await self._release()
+
+    async def close(self) -> None:
+        if self.replica is not None and self.writer is not None:
+            self.replica.remember_writes(self.writer, self.info.pop(_WRITTEN_KEY, ()))
+            self.info[_RECENT_KEY] = self.replica.recent_writes(self.writer)
+        await super().close()
+
+    async def _probe_replica(self, statement: Any) -> None:
+        if self.replica is not None and wants_replica(statement):
+            await self.replica.refresh()
+
+    async def _release(self) -> None:
+        if (
+            self.release_between_queries
+            and self.in_transaction()
+            and not self.info.get(_HOLD_KEY)
+            and not (self.new or self.dirty or self.deleted)
+            # Expiring would turn the next attribute access into lazy IO.
+            and not self.sync_session.expire_on_commit
+        ):
+            await self.commit()
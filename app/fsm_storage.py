@@ -0,0 +1,169 @@
+"""FSM storage shared by all replicas through the ``fsm_states`` table.
+
+Reads go through a short-lived in-process cache that writes update in place, so the
+get_state/get_data/update_data calls of one update cost a single SELECT. The cache
+lifetime bounds cross-replica staleness: a write made by another replica is seen
+here after at most ``cache_seconds``. States untouched for ``state_ttl`` read as
+empty and are purged from the table.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+from sqlalchemy import case, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.models import FsmState
+from app.metrics import fsm_storage_reads_total
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_TTL = timedelta(hours=24)
+DEFAULT_CACHE_SECONDS = 2.0
+PURGE_INTERVAL_SECONDS = 600.0
+CACHE_MAX_ENTRIES = 10_000
+
+
+@dataclass(slots=True)
+class _Entry:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    loaded_at: float = field(default_factory=monotonic)
+
+
+class SQLStorage(BaseStorage):
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        *,
+        state_ttl: timedelta = DEFAULT_STATE_TTL,
+        cache_seconds: float = DEFAULT_CACHE_SECONDS,
+        key_builder: KeyBuilder | None = None,
+    ) -> None:
+        self.session_maker = session_maker
+        self.state_ttl = state_ttl
+        self.cache_seconds = cache_seconds
+        self.key_builder = key_builder or DefaultKeyBuilder(
+            with_bot_id=True, with_business_connection_id=True, with_destiny=True
+        )
+        self._cache: dict[str, _Entry] = {}
+        self._last_purge = monotonic()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._write(self.key_builder.build(key), state=value)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._read(self.key_builder.build(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._write(self.key_builder.build(key), data=copy.deepcopy(dict(data)))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return copy.deepcopy((await self._read(self.key_builder.build(key))).data)
+
+    async def close(self) -> None:
+        self._cache.clear()
+
+    async def purge_expired(self) -> int:
+        async with self.session_maker() as session:
+            deleted = await self._purge(session, datetime.now())
+            await session.commit()
+        return deleted
+
+    def _fresh(self, entry: _Entry | None) -> bool:
+        return entry is not None and monotonic() - entry.loaded_at < self.cache_seconds
+
+    def _remember(self, key: str, entry: _Entry) -> None:
+        if self.cache_seconds <= 0:
+            return
+        if key not in self._cache and len(self._cache) >= CACHE_MAX_ENTRIES:
+            for stale in [k for k, e in self._cache.items() if not self._fresh(e)]:
+                del self._cache[stale]
+            while len(self._cache) >= CACHE_MAX_ENTRIES:
+                del self._cache[next(iter(self._cache))]
+        self._cache[key] = entry
+
+    async def _read(self, key: str) -> _Entry:
+        entry = self._cache.get(key)
+        if entry is not None and self._fresh(entry):
+            fsm_storage_reads_total.labels("hit").inc()
+            return entry
+
+        fsm_storage_reads_total.labels("miss").inc()
+        async with self.session_maker() as session:
+            row = (
+                await session.execute(
+                    select(FsmState.state, FsmState.data).where(
+                        FsmState.key == key, FsmState.expires_at > datetime.now()
+                    )
+                )
+            ).one_or_none()
+        entry = _Entry(row.state, row.data) if row else _Entry()
+        self._remember(key, entry)
+        return entry
+
+    async def _write(self, key: str, **values: Any) -> None:
+        now = datetime.now()
+        row = {"key": key, "state": None, "data": {}, **values}
+        async with self.session_maker() as session:
+            insert = (
+                postgresql.insert
+                if session.get_bind().dialect.name == "postgresql"
+                else sqlite.insert
+            )
+            stmt = insert(FsmState).values(**row, expires_at=now + self.state_ttl, updated_at=now)
+            # The column not being written is reset too if the old row had expired,
+            # so an abandoned dialog's data does not leak into a new one.
+            untouched = {
+                name: case(
+                    (FsmState.expires_at <= now, stmt.excluded[name]),
+                    else_=getattr(FsmState, name),
+                )
+                for name in ("state", "data")
+                if name not in values
+            }
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[FsmState.key],
+                set_={
+                    **values,
+                    **untouched,
+                    "expires_at": stmt.excluded.expires_at,
+                    "updated_at": now,
+                },
+            )
+            await session.execute(stmt)
+            if monotonic() - self._last_purge >= PURGE_INTERVAL_SECONDS:
+                await self._purge(session, now)
+            await session.commit()
+
+        entry = self._cache.get(key)
+        if entry is not None and self._fresh(entry):
+            for name, value in values.items():
+                setattr(entry, name, value)
+        else:
+            self._cache.pop(key, None)
+
+    async def _purge(self, session: AsyncSession, now: datetime) -> int:
+        self._last_purge = monotonic()
+        result = await session.execute(delete(FsmState).where(FsmState.expires_at <= now))
+        deleted = getattr(result, "rowcount", 0) or 0
+        if deleted:
+            logger.info("Purged %d abandoned FSM states", deleted)
+        return deleted
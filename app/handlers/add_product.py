@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+from collections.abc import Awaitable, Callable
 from decimal import Decimal
+from functools import partial
 
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
@@ -8,12 +10,13 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import CallbackQuery, InaccessibleMessage, Message
 
 from app.callbacks import ActionCB, MenuCB
-from app.i18n import i18n
+from app.i18n import Lang, i18n
 from app.keyboards.common import cancel_kb
 from app.keyboards.main import main_menu_kb
 from app.repositories.products import MAX_PRODUCTS_PER_USER, ProductsRepo
 from app.repositories.users import PostgresUserRepo
-from app.services.marketplace_client import fetch_product_info
+from app.services.fetch_queue import Priority, run_fetch, spawn_task
+from app.services.marketplace_client import ProductInfo, fetch_product_info
 from app.utils.logging import (
     log_callback_handler,
     log_error,
@@ -87,6 +90,7 @@ async def got_url(
     user_repo: PostgresUserRepo,
     products: ProductsRepo,
     state: FSMContext,
+    fetch_product: Callable[[str], Awaitable[ProductInfo]] | None = None,
 ) -> None:
     from_user = message.from_user
     if from_user is None:
@@ -120,10 +124,32 @@ async def got_url(
         temp_message_chat_id=temp_msg.chat.id, temp_message_id=temp_msg.message_id
     )
 
+    # `fetch_product` is set by the dispatcher when SCRAPER_MODE=worker and the scraper
+    # worker does the fetching. Either way only the fetch itself takes a pool slot.
+    fetch = fetch_product or _fetch_in_pool
+    spawn_task(
+        partial(_fetch_and_show, message, temp_msg, state, fetch, user.id, user.language, url)
+    )
+
+
+async def _fetch_in_pool(url: str) -> ProductInfo:
+    return await run_fetch(partial(fetch_product_info, url), priority=Priority.INTERACTIVE, key=url)
+
+
+async def _fetch_and_show(
+    message: Message,
+    temp_msg: Message,
+    state: FSMContext,
+    fetch: Callable[[str], Awaitable[ProductInfo]],
+    user_id: int,
+    lang: Lang,
+    url: str,
+) -> None:
+    """Runs as a task after `got_url` returned; edits the "fetching" message."""
     try:
-        info = await fetch_product_info(url)
+        info = await fetch(url)
         log_product_action(
-            user.id,
+            user_id,
             "fetched_product_info",
             url=url[:100],
             marketplace=info.marketplace,
@@ -132,22 +158,22 @@ async def got_url(
             price_no_card=info.price_no_card,
         )
     except RuntimeError as e:
-        log_error("fetch_product_blocked", e, user_id=user.id, url=url[:100])
-        err_text = i18n.t(user.language, "add.fetch_blocked")
+        log_error("fetch_product_blocked", e, user_id=user_id, url=url[:100])
+        err_text = i18n.t(lang, "add.fetch_blocked")
         try:
             if (await state.get_state()) == AddProduct.waiting_for_url.state:
-                await temp_msg.edit_text(err_text, reply_markup=cancel_kb(i18n, user.language))
+                await temp_msg.edit_text(err_text, reply_markup=cancel_kb(i18n, lang))
         except Exception:
-            await message.answer(err_text, reply_markup=cancel_kb(i18n, user.language))
+            await message.answer(err_text, reply_markup=cancel_kb(i18n, lang))
         return
     except Exception as e:
-        log_error("fetch_product_failed", e, user_id=user.id, url=url[:100])
-        err_text = i18n.t(user.language, "add.fetch_error")
+        log_error("fetch_product_failed", e, user_id=user_id, url=url[:100])
+        err_text = i18n.t(lang, "add.fetch_error")
         try:
             if (await state.get_state()) == AddProduct.waiting_for_url.state:
-                await temp_msg.edit_text(err_text, reply_markup=cancel_kb(i18n, user.language))
+                await temp_msg.edit_text(err_text, reply_markup=cancel_kb(i18n, lang))
         except Exception:
-            await message.answer(err_text, reply_markup=cancel_kb(i18n, user.language))
+            await message.answer(err_text, reply_markup=cancel_kb(i18n, lang))
         return
     if (await state.get_state()) != AddProduct.waiting_for_url.state:
         return
@@ -160,15 +186,11 @@ async def got_url(
         current_price=str(chosen) if chosen is not None else None,
     )
 
-    lines = [i18n.t(user.language, "add.found", title=info.title, price=f"{(chosen or 0):.2f}")]
+    lines = [i18n.t(lang, "add.found", title=info.title, price=f"{(chosen or 0):.2f}")]
     if info.price_with_card is not None:
-        lines.append(
-            f"\n{i18n.t(user.language, 'add.with_card_label')}: <b>{info.price_with_card:.2f}</b>"
-        )
+        lines.append(f"\n{i18n.t(lang, 'add.with_card_label')}: <b>{info.price_with_card:.2f}</b>")
     if info.price_no_card is not None:
-        lines.append(
-            f"{i18n.t(user.language, 'add.no_card_label')}: <b>{info.price_no_card:.2f}</b>"
-        )
+        lines.append(f"{i18n.t(lang, 'add.no_card_label')}: <b>{info.price_no_card:.2f}</b>")
 
     ftext = "\n".join(lines)
     try:
@@ -178,8 +200,8 @@ async def got_url(
 
     await state.set_state(AddProduct.waiting_for_target_price)
     await message.answer(
-        i18n.t(user.language, "add.ask_target"),
-        reply_markup=cancel_kb(i18n, user.language),
+        i18n.t(lang, "add.ask_target"),
+        reply_markup=cancel_kb(i18n, lang),
     )
 
 
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.i18n import Lang, i18n
+from app.repositories.refresh_runs import RefreshRunDTO, RefreshRunsRepo
+from app.repositories.users import PostgresUserRepo
+from app.utils.logging import log_message_handler
+
+router = Router(name="admin")
+
+DEFAULT_RUNS = 10
+MAX_RUNS = 30
+
+
+def _fmt_ms(v: float | None) -> str:
+    return f"{v:.0f}" if v is not None else "-"
+
+
+def _run_text(lang: Lang, run: RefreshRunDTO) -> str:
+    text = i18n.t(
+        lang,
+        "admin.runs.item",
+        id=run.id,
+        cycle=run.cycle,
+        status=run.status,
+        started=run.started_at.strftime("%d.%m %H:%M"),
+        duration=f"{run.duration_seconds:.0f}",
+        checked=run.products_checked,
+        fetches=run.fetches,
+        errors=run.errors,
+        blocks=run.blocks,
+        notifications=run.notifications,
+        p50=_fmt_ms(run.fetch_p50_ms),
+        p95=_fmt_ms(run.fetch_p95_ms),
+    )
+    if run.errors_by_type:
+        top = sorted(run.errors_by_type.items(), key=lambda kv: kv[1], reverse=True)
+        text += "\n" + ", ".join(f"{name}: {count}" for name, count in top[:3])
+    return text
+
+
+@router.message(Command("runs"))
+@log_message_handler("admin_runs")
+async def cmd_runs(
+    message: Message,
+    command: CommandObject,
+    user_repo: PostgresUserRepo,
+    db_session: AsyncSession,
+    admin_ids: frozenset[int],
+) -> None:
+    from_user = message.from_user
+    if from_user is None or from_user.id not in admin_ids:
+        return
+
+    user = await user_repo.get_by_tg_id(from_user.id)
+    lang = user.language if user is not None else i18n.default_lang
+    limit = DEFAULT_RUNS
+    if command.args and command.args.strip().isdigit():
+        limit = max(1, min(int(command.args.strip()), MAX_RUNS))
+
+    runs = await RefreshRunsRepo(db_session).list_recent(limit)
+    if not runs:
+        await message.answer(i18n.t(lang, "admin.runs.empty"))
+        return
+
+    body = "\n\n".join(_run_text(lang, run) for run in runs)
+    await message.answer(f"<b>{i18n.t(lang, 'admin.runs.title')}</b>\n\n{body}")
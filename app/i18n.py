@@ -92,6 +92,15 @@ i18n = I18N(
             "notif.delete.ok": "Товар удалён и больше не отслеживается.",
             "btn.delete": "🗑️ Удалить товар",
             "btn.open": "🔗 Открыть товар",
+            # Admin
+            "admin.runs.title": "Последние циклы обновления цен",
+            "admin.runs.empty": "Циклов обновления пока не было.",
+            "admin.runs.item": (
+                "#{id} {cycle} · {status} · {started} · {duration} с\n"  # noqa: RUF001
+                "проверено {checked}, запросов {fetches}, ошибок {errors} "
+                "(блокировок {blocks}), уведомлений {notifications}\n"
+                "p50/p95: {p50}/{p95} мс"
+            ),
             # Common buttons
             "btn.cancel": "❌ Отмена",
             # Errors
@@ -168,6 +177,15 @@ Now: <b>{current}</b> > target <b>{target}</b>.""",  # noqa: RUF001
             "notif.delete.ok": "Product removed and will not be tracked anymore.",
             "btn.delete": "🗑️ Remove product",
             "btn.open": "🔗 Open product",
+            # Admin
+            "admin.runs.title": "Recent price refresh cycles",
+            "admin.runs.empty": "No refresh cycles recorded yet.",
+            "admin.runs.item": (
+                "#{id} {cycle} · {status} · {started} · {duration} s\n"
+                "checked {checked}, fetches {fetches}, errors {errors} "
+                "(blocks {blocks}), notified {notifications}\n"
+                "p50/p95: {p50}/{p95} ms"
+            ),
             # Common buttons
             "btn.cancel": "❌ Cancel",
             # Errors
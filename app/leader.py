@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.metrics import leader_gauge
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL_SECONDS = 15.0
+
+
+class LeaderElector:
+    """Holds a session-level Postgres advisory lock so only one replica runs jobs.
+
+    On SQLite (no advisory locks) every process is considered the leader.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        *,
+        lock_key: int,
+        check_interval: float = CHECK_INTERVAL_SECONDS,
+    ) -> None:
+        self.engine = engine
+        self.lock_key = lock_key
+        self.check_interval = check_interval
+        self._conn: AsyncConnection | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._is_leader = False
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    @property
+    def uses_advisory_lock(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    async def start(self) -> None:
+        await self.check()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="leader-election")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await self._task
+            self._task = None
+
+        if self._conn is not None:
+            try:
+                await self._conn.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key}
+                )
+                await self._conn.commit()
+            except Exception as e:
+                logger.warning("Failed to release the leader lock, dropping its session: %s", e)
+                await self._drop_connection(invalidate=True)
+            else:
+                await self._drop_connection()
+        self._set_leader(False)
+
+    async def check(self) -> bool:
+        if not self.uses_advisory_lock:
+            self._set_leader(True)
+            return True
+
+        if self._conn is not None:
+            try:
+                await self._conn.execute(text("SELECT 1"))
+                await self._conn.commit()
+                return True
+            except Exception as e:
+                logger.warning("Leader lock connection lost, stepping down: %s", e)
+                await self._drop_connection(invalidate=True)
+                self._set_leader(False)
+
+        try:
+            conn = await self.engine.connect()
+        except Exception as e:
+            logger.warning("Leader election failed to connect: %s", e)
+            self._set_leader(False)
+            return False
+
+        try:
+            acquired = bool(
+                await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key})
+            )
+            await conn.commit()
+        except Exception as e:
+            logger.warning("Leader election query failed: %s", e)
+            # The lock may have been taken before the failure.
+            await _discard(conn)
+            self._set_leader(False)
+            return False
+
+        if acquired:
+            self._conn = conn
+        else:
+            with contextlib.suppress(Exception):
+                await conn.close()
+        self._set_leader(acquired)
+        return acquired
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.warning("Leader election check failed: %s", e)
+
+    async def _drop_connection(self, *, invalidate: bool = False) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if invalidate:
+            await _discard(conn)
+        else:
+            with contextlib.suppress(Exception):
+                await conn.close()
+
+    def _set_leader(self, value: bool) -> None:
+        if value != self._is_leader:
+            logger.info(
+                "Leader election | Key: %s | Status: %s",
+                self.lock_key,
+                "acquired" if value else "released",
+            )
+        self._is_leader = value
+        leader_gauge.set(1 if value else 0)
+
+
+async def _discard(conn: AsyncConnection) -> None:
+    """Close `conn` without returning it to the pool.
+
+    A session-level advisory lock lives as long as the backend session, so a pooled
+    connection that may still hold it would block every other replica.
+    """
+    with contextlib.suppress(Exception):
+        await conn.invalidate()
+    with contextlib.suppress(Exception):
+        await conn.close()
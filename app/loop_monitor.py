@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from time import perf_counter
+from typing import Any
+
+from app.metrics import event_loop_lag_seconds, event_loop_slow_callbacks_total
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL_SECONDS = 0.5
+
+
+def _describe(handle: asyncio.Handle) -> str:
+    callback = handle._callback  # type: ignore[attr-defined]
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        coro = task.get_coro()
+        frame = getattr(coro, "cr_frame", None)
+        where = f" now at {frame.f_code.co_filename}:{frame.f_lineno}" if frame else ""
+        name = getattr(coro, "__qualname__", repr(coro))
+        return f"task {task.get_name()!r} running {name}{where}"
+    return repr(handle)
+
+
+class LoopMonitor:
+    """Samples event-loop scheduling delay and reports callbacks that hog the loop.
+
+    Slow-callback detection times every ``Handle._run`` like asyncio debug mode does,
+    without the rest of debug mode's overhead. That still costs every callback a frame
+    and two clock reads and relies on asyncio internals, so it is off unless
+    ``slow_callback_seconds`` is set, and skipped on loops other than asyncio's own
+    (e.g. uvloop).
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = SAMPLE_INTERVAL_SECONDS,
+        slow_callback_seconds: float = 0.0,
+    ) -> None:
+        self.interval = interval
+        self.slow_callback_seconds = slow_callback_seconds
+        self._task: asyncio.Task[None] | None = None
+        self._original_run: Any = None
+
+    async def start(self) -> None:
+        if self.slow_callback_seconds > 0 and self._original_run is None:
+            if isinstance(asyncio.get_running_loop(), asyncio.BaseEventLoop):
+                self._patch_handles()
+            else:
+                logger.warning("Slow-callback tracking needs the asyncio event loop, skipping")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="loop-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._original_run is not None:
+            asyncio.Handle._run = self._original_run  # type: ignore[method-assign]
+            self._original_run = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            event_loop_lag_seconds.observe(max(loop.time() - expected, 0.0))
+
+    def _patch_handles(self) -> None:
+        original = asyncio.Handle._run
+        threshold = self.slow_callback_seconds
+
+        def _timed_run(handle: asyncio.Handle) -> None:
+            started = perf_counter()
+            original(handle)
+            elapsed = perf_counter() - started
+            if elapsed >= threshold:
+                event_loop_slow_callbacks_total.inc()
+                logger.warning(
+                    "Slow event loop callback: %s blocked the loop for %.3fs",
+                    _describe(handle),
+                    elapsed,
+                )
+
+        self._original_run = original
+        asyncio.Handle._run = _timed_run  # type: ignore[method-assign, assignment]
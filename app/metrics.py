@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+from collections.abc import Callable
+
 from aiohttp import web
 from prometheus_client import Counter, Gauge, Histogram, generate_latest
 
+from app.profiling import add_profiling_routes
+
 # Core bot metrics
 bot_updates_total = Counter(
     "marketplace_bot_updates_total",
@@ -22,6 +26,84 @@ notifications_sent_total = Counter(
     labelnames=("kind",),
 )
 
+handler_duration_seconds = Histogram(
+    "marketplace_bot_handler_duration_seconds",
+    "Time spent in a bot handler: total, and the parts waiting on the database and Telegram API",
+    labelnames=("action", "component"),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+event_loop_lag_seconds = Histogram(
+    "marketplace_bot_event_loop_lag_seconds",
+    "How late the event loop ran a timer scheduled by the lag sampler",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+event_loop_slow_callbacks_total = Counter(
+    "marketplace_bot_event_loop_slow_callbacks_total",
+    "Event loop callbacks that ran longer than the slow-callback threshold",
+)
+
+# Database
+db_query_duration_seconds = Histogram(
+    "marketplace_bot_db_query_duration_seconds",
+    "SQL statement duration by operation and normalised statement fingerprint",
+    labelnames=("operation", "fingerprint"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+db_pool_checkout_wait_seconds = Histogram(
+    "marketplace_bot_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+)
+
+db_connection_hold_seconds = Histogram(
+    "marketplace_bot_db_connection_hold_seconds",
+    "How long a connection stayed checked out of the SQLAlchemy pool",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60),
+)
+
+db_pool_connections = Gauge(
+    "marketplace_bot_db_pool_connections",
+    "Connections held by the SQLAlchemy pool by state",
+    labelnames=("state",),
+)
+
+db_pool_saturation_ratio = Gauge(
+    "marketplace_bot_db_pool_saturation_ratio",
+    "Checked-out connections as a share of pool size plus max overflow",
+)
+
+db_replica_lag_seconds = Gauge(
+    "marketplace_bot_db_replica_lag_seconds",
+    "Replay lag of the read replica as last probed",
+)
+
+db_replica_statements_total = Counter(
+    "marketplace_bot_db_replica_statements_total",
+    "Statements marked as replica-safe, by where they were sent",
+    labelnames=("target",),
+)
+
+fsm_storage_reads_total = Counter(
+    "marketplace_bot_fsm_storage_reads_total",
+    "FSM state/data reads served from the in-process cache (hit) or the database (miss)",
+    labelnames=("result",),
+)
+
+supervisor_updates_forwarded_total = Counter(
+    "marketplace_bot_supervisor_updates_forwarded_total",
+    "Updates the supervisor front process handed to each worker shard",
+    labelnames=("shard",),
+)
+
+supervisor_worker_restarts_total = Counter(
+    "marketplace_bot_supervisor_worker_restarts_total",
+    "Worker processes restarted by the supervisor after exiting",
+    labelnames=("shard",),
+)
+
 # Scheduler / scraping metrics
 price_check_duration_seconds = Histogram(
     "marketplace_bot_price_check_duration_seconds",
@@ -49,6 +131,64 @@ inflight_products_gauge = Gauge(
     "Number of products currently being processed",
 )
 
+refresh_due_backlog_gauge = Gauge(
+    "marketplace_bot_refresh_due_backlog",
+    "Number of active products whose next scheduled check is overdue",
+)
+
+refresh_interval_seconds = Histogram(
+    "marketplace_bot_refresh_interval_seconds",
+    "Adaptive interval until the next check of a product",
+    buckets=(900, 1800, 3600, 7200, 14400, 28800, 43200, 86400, 172800),
+)
+
+refresh_cycle_lag_seconds = Gauge(
+    "marketplace_bot_refresh_cycle_lag_seconds",
+    "Seconds since the start of the unfinished cron refresh cycle (0 when caught up)",
+)
+
+refresh_skipped_products_total = Counter(
+    "marketplace_bot_refresh_skipped_products_total",
+    "Products left for the next run when a refresh cycle stopped early",
+    labelnames=("reason",),
+)
+
+leader_gauge = Gauge(
+    "marketplace_bot_is_leader",
+    "Whether this replica holds the scheduler leader lock (1) or not (0)",
+)
+
+fetch_queue_wait_seconds = Histogram(
+    "marketplace_bot_fetch_queue_wait_seconds",
+    "Time a marketplace fetch waited for a free slot in the fetch pool",
+    labelnames=("priority",),
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+fetch_queue_depth = Gauge(
+    "marketplace_bot_fetch_queue_depth",
+    "Marketplace fetches waiting for a slot in the fetch pool",
+    labelnames=("priority",),
+)
+
+fetch_queue_coalesced_total = Counter(
+    "marketplace_bot_fetch_queue_coalesced_total",
+    "Marketplace fetches that joined a queued or running fetch of the same product",
+    labelnames=("priority",),
+)
+
+fetch_jobs_total = Counter(
+    "marketplace_bot_fetch_jobs_total",
+    "Interactive product fetches run by the scraper worker, by outcome",
+    labelnames=("status",),
+)
+
+outbox_messages_total = Counter(
+    "marketplace_bot_outbox_messages_total",
+    "Notification outbox delivery attempts by outcome (sent, retry, failed)",
+    labelnames=("result",),
+)
+
 # External marketplace scraping
 marketplace_request_duration_seconds = Histogram(
     "marketplace_bot_request_duration_seconds",
@@ -68,6 +208,38 @@ marketplace_blocked_total = Counter(
     labelnames=("marketplace",),
 )
 
+ozon_stage_duration_seconds = Histogram(
+    "marketplace_bot_ozon_stage_duration_seconds",
+    "Duration of individual stages of an Ozon product fetch",
+    labelnames=("stage",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+ozon_parse_duration_seconds = Histogram(
+    "marketplace_bot_ozon_parse_duration_seconds",
+    "Time to decode and scan a composer payload, inline on the loop or in the parse pool",
+    labelnames=("mode",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+ozon_parse_queue_wait_seconds = Histogram(
+    "marketplace_bot_ozon_parse_queue_wait_seconds",
+    "Time a composer payload waited for a free parse pool worker",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+ozon_retries_total = Counter(
+    "marketplace_bot_ozon_retries_total",
+    "Retries of Ozon requests by level (composer attempt or whole fetch) and cause",
+    labelnames=("level", "reason"),
+)
+
+ozon_challenge_refresh_total = Counter(
+    "marketplace_bot_ozon_challenge_refresh_total",
+    "Ozon anti-bot challenge runs by outcome",
+    labelnames=("result",),
+)
+
 
 _runner: web.AppRunner | None = None
 
@@ -81,13 +253,26 @@ async def _metrics_handler(_: web.Request) -> web.Response:
     )
 
 
-async def start_metrics_server(host: str, port: int) -> None:
+async def start_metrics_server(
+    host: str,
+    port: int,
+    *,
+    profiling_token: str = "",
+    expose_metrics: bool = True,
+    setup_app: Callable[[web.Application], None] | None = None,
+) -> None:
+    """Serve ``/metrics`` plus whatever `setup_app` mounts (e.g. the Telegram webhook)."""
     global _runner  # noqa: PLW0603
     if _runner is not None:
         return
 
     app = web.Application()
-    _ = app.router.add_get("/metrics", _metrics_handler)
+    if expose_metrics:
+        _ = app.router.add_get("/metrics", _metrics_handler)
+    if profiling_token:
+        add_profiling_routes(app, profiling_token)
+    if setup_app is not None:
+        setup_app(app)
 
     runner = web.AppRunner(app, access_log=None)
     await runner.setup()
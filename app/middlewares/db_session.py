@@ -7,6 +7,7 @@ from typing import Any
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.db.sessions import ReleasingSession
 from app.repositories.products import ProductsRepo
 from app.repositories.users import PostgresUserRepo
 from app.utils.telegram_helpers import extract_user_data
@@ -15,8 +16,13 @@ logger = logging.getLogger(__name__)
 
 
 class DBSessionMiddleware:
-    def __init__(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+    def __init__(
+        self, session_maker: async_sessionmaker[AsyncSession], *, lazy: bool = False
+    ) -> None:
         self.session_maker = session_maker
+        # Lazy sessions return their connection to the pool between read-only
+        # statements (see app.db.sessions); needs a maker from init_engine_and_schema.
+        self.lazy = lazy
 
     async def __call__(
         self,
@@ -24,13 +30,17 @@ class DBSessionMiddleware:
         event: Any,
         data: dict[str, Any],
     ) -> Any:
-        async with self.session_maker() as session:
+        maker_kw: dict[str, Any] = {"release_between_queries": True} if self.lazy else {}
+        from_user = getattr(event, "from_user", None)
+        if from_user and issubclass(self.session_maker.class_, ReleasingSession):
+            # This user's next updates read their own writes back from the primary.
+            maker_kw["writer"] = from_user.id
+        async with self.session_maker(**maker_kw) as session:
             data["db_session"] = session
             data["user_repo"] = PostgresUserRepo(session)
             data["products"] = ProductsRepo(session)
 
             user_repo = data["user_repo"]
-            from_user = getattr(event, "from_user", None)
             if from_user:
                 try:
                     user_data = extract_user_data(from_user)
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from time import perf_counter
+from typing import Any
+
+from app.utils.handler_timing import add_telegram_time
+
+
+class TelegramTimingMiddleware:
+    """Bot session middleware charging Telegram API round-trips to the current handler."""
+
+    async def __call__(
+        self,
+        make_request: Callable[[Any, Any], Awaitable[Any]],
+        bot: Any,
+        method: Any,
+    ) -> Any:
+        started = perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            add_telegram_time(perf_counter() - started)
@@ -0,0 +1,153 @@
+"""Notification outbox between the scraper worker and the bot process.
+
+The worker hands the scheduler an `OutboxSender` in place of the ``Bot``: price
+alerts become ``notification_outbox`` rows. `OutboxDelivery` in the bot process
+claims them, sends them through Telegram and records the outcome. Delivery is
+at-least-once: a row claimed by a sender that died is claimed again later.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Any, Protocol
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.metrics import outbox_messages_total
+from app.repositories.outbox import NotificationOutboxRepo, OutboxMessageDTO
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_INTERVAL_SECONDS = 2.0
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+STALE_CLAIM = timedelta(minutes=5)
+CLEANUP_INTERVAL_SECONDS = 3600.0
+RETENTION = timedelta(days=7)
+
+
+class MessageSender(Protocol):
+    async def send_message(
+        self,
+        chat_id: int,
+        text: str,
+        *,
+        reply_markup: InlineKeyboardMarkup | None = None,
+        disable_web_page_preview: bool | None = None,
+    ) -> Any: ...
+
+
+class OutboxSender:
+    def __init__(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        self.session_maker = session_maker
+
+    async def send_message(
+        self,
+        chat_id: int,
+        text: str,
+        *,
+        reply_markup: InlineKeyboardMarkup | None = None,
+        disable_web_page_preview: bool | None = None,
+    ) -> None:
+        async with self.session_maker() as session:
+            await NotificationOutboxRepo(session).add(
+                chat_id,
+                text,
+                reply_markup=(
+                    reply_markup.model_dump(mode="json", exclude_none=True)
+                    if reply_markup is not None
+                    else None
+                ),
+                disable_web_page_preview=bool(disable_web_page_preview),
+            )
+
+
+class OutboxDelivery:
+    def __init__(
+        self,
+        bot: Bot,
+        session_maker: async_sessionmaker[AsyncSession],
+        *,
+        interval: float = DELIVERY_INTERVAL_SECONDS,
+        batch_size: int = BATCH_SIZE,
+    ) -> None:
+        self.bot = bot
+        self.session_maker = session_maker
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: asyncio.Task[None] | None = None
+        self._last_cleanup = 0.0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="outbox-delivery")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                delivered = await self.deliver_once()
+            except Exception:
+                logger.exception("Outbox delivery iteration failed")
+                delivered = 0
+            if delivered < self.batch_size:
+                await asyncio.sleep(self.interval)
+
+    async def deliver_once(self) -> int:
+        async with self.session_maker() as session:
+            outbox = NotificationOutboxRepo(session)
+            if monotonic() - self._last_cleanup >= CLEANUP_INTERVAL_SECONDS:
+                self._last_cleanup = monotonic()
+                await outbox.delete_finished_before(datetime.now() - RETENTION)
+
+            batch = await outbox.claim_batch(self.batch_size, stale_after=STALE_CLAIM)
+            for message in batch:
+                await self._deliver(outbox, message)
+            return len(batch)
+
+    async def _deliver(self, outbox: NotificationOutboxRepo, message: OutboxMessageDTO) -> None:
+        try:
+            await self.bot.send_message(
+                message.chat_id,
+                message.text,
+                reply_markup=(
+                    InlineKeyboardMarkup.model_validate(message.reply_markup)
+                    if message.reply_markup
+                    else None
+                ),
+                disable_web_page_preview=message.disable_web_page_preview,
+            )
+        except TelegramRetryAfter as e:
+            outbox_messages_total.labels("retry").inc()
+            await outbox.mark_failed(message.id, str(e), retry=True)
+            await asyncio.sleep(e.retry_after)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # The user blocked the bot or the message is malformed; retrying will not help.
+            outbox_messages_total.labels("failed").inc()
+            logger.warning("Dropping outbox message %s: %s", message.id, e)
+            await outbox.mark_failed(message.id, str(e), retry=False)
+        except Exception as e:
+            retry = message.attempts + 1 < MAX_ATTEMPTS
+            outbox_messages_total.labels("retry" if retry else "failed").inc()
+            logger.warning("Failed to deliver outbox message %s: %s", message.id, e)
+            await outbox.mark_failed(message.id, str(e) or type(e).__name__, retry=retry)
+        else:
+            outbox_messages_total.labels("sent").inc()
+            await outbox.mark_sent(message.id)
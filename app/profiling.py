@@ -0,0 +1,145 @@
+"""On-demand diagnostics served next to ``/metrics``.
+
+Routes are only registered when a token is configured, and every request must
+carry it as ``Authorization: Bearer <token>``:
+
+- ``GET /debug/profile?seconds=10&interval_ms=5`` samples the event-loop thread and
+  returns collapsed stacks (``frame;frame;frame count``), ready for flamegraph tools.
+  The sampler thread needs the GIL, so time inside C calls is charged to the point
+  where the loop next releases it; long pure-Python work shows up where it runs.
+- ``GET /debug/tasks`` lists asyncio tasks with the chain of awaits each is parked on.
+- ``GET /debug/tracemalloc?top=25`` starts tracemalloc on first call, then returns the
+  top allocation sites; ``DELETE /debug/tracemalloc`` stops tracing.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hmac
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Any
+
+from aiohttp import web
+
+MAX_PROFILE_SECONDS = 60
+MIN_INTERVAL_MS = 1
+MAX_TRACEMALLOC_TOP = 200
+
+_TOKEN_KEY = web.AppKey("profiling_token", str)
+_profile_lock = asyncio.Lock()
+
+
+def _int_param(request: web.Request, name: str, default: int, lo: int, hi: int) -> int:
+    try:
+        value = int(request.query.get(name, default))
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=f"{name} must be an integer") from e
+    return max(lo, min(value, hi))
+
+
+@web.middleware
+async def _auth_middleware(request: web.Request, handler: Any) -> web.StreamResponse:
+    if request.path.startswith("/debug/"):
+        expected = f"Bearer {request.app[_TOKEN_KEY]}"
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+            raise web.HTTPUnauthorized(text="missing or invalid token")
+    return await handler(request)
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({code.co_filename}:{frame.f_lineno})"
+
+
+def _sample_stacks(thread_id: int, interval: float, stop: threading.Event) -> Counter[str]:
+    stacks: Counter[str] = Counter()
+    while not stop.wait(interval):
+        frame = sys._current_frames().get(thread_id)
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        if labels:
+            stacks[";".join(reversed(labels))] += 1
+    return stacks
+
+
+async def _profile(request: web.Request) -> web.Response:
+    seconds = _int_param(request, "seconds", 10, 1, MAX_PROFILE_SECONDS)
+    interval_ms = _int_param(request, "interval_ms", 5, MIN_INTERVAL_MS, 1000)
+    if _profile_lock.locked():
+        raise web.HTTPConflict(text="a profile is already running")
+
+    async with _profile_lock:
+        stop = threading.Event()
+        loop_thread = threading.get_ident()
+        sampler = asyncio.get_running_loop().run_in_executor(
+            None, _sample_stacks, loop_thread, interval_ms / 1000, stop
+        )
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+        stacks = await sampler
+
+    body = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+    return web.Response(text=body + "\n")
+
+
+def _await_chain(task: asyncio.Task[Any]) -> list[str]:
+    chain = []
+    awaitable: Any = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is not None:
+            chain.append(_frame_label(frame))
+        else:
+            chain.append(repr(awaitable)[:200])
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return chain
+
+
+async def _tasks(request: web.Request) -> web.Response:
+    current = asyncio.current_task()
+    lines = []
+    tasks = sorted(asyncio.all_tasks(), key=lambda t: t.get_name())
+    for task in tasks:
+        state = "running" if task is current else "pending"
+        lines.append(f"{task.get_name()} [{state}]")
+        lines.extend(f"    {frame}" for frame in _await_chain(task))
+    return web.Response(text=f"{len(tasks)} tasks\n\n" + "\n".join(lines) + "\n")
+
+
+async def _tracemalloc_snapshot(request: web.Request) -> web.Response:
+    top = _int_param(request, "top", 25, 1, MAX_TRACEMALLOC_TOP)
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(_int_param(request, "frames", 1, 1, 25))
+        return web.Response(
+            status=202, text="tracemalloc started; request again to get a snapshot\n"
+        )
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__),)
+    )
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [f"traced: current={current / 1024:.1f} KiB peak={peak / 1024:.1f} KiB", ""]
+    lines.extend(str(stat) for stat in snapshot.statistics("lineno")[:top])
+    return web.Response(text="\n".join(lines) + "\n")
+
+
+async def _tracemalloc_stop(request: web.Request) -> web.Response:
+    tracemalloc.stop()
+    return web.Response(text="tracemalloc stopped\n")
+
+
+def add_profiling_routes(app: web.Application, token: str) -> None:
+    app[_TOKEN_KEY] = token
+    app.middlewares.append(_auth_middleware)
+    app.router.add_get("/debug/profile", _profile)
+    app.router.add_get("/debug/tasks", _tasks)
+    app.router.add_get("/debug/tracemalloc", _tracemalloc_snapshot)
+    app.router.add_delete("/debug/tracemalloc", _tracemalloc_stop)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import heapq
+from collections.abc import Iterator, Sequence
+from datetime import datetime, timedelta
+from itertools import count, pairwise
+
+from app.repositories.products import Product
+from app.repositories.users import UserDTO
+
+# Mean relative move between observations at which a product keeps the base interval.
+VOLATILITY_REFERENCE = 0.02
+# Gap above target at which proximity stops shortening the interval.
+NEAR_TARGET_GAP = 0.2
+MIN_HISTORY_POINTS = 3
+
+# Priority weights: near-target products dominate, then stale, active and premium users.
+PRIORITY_WEIGHT_TARGET = 3.0
+PRIORITY_WEIGHT_STALENESS = 1.0
+PRIORITY_WEIGHT_ACTIVITY = 1.0
+PRIORITY_WEIGHT_PREMIUM = 0.5
+PRIORITY_TARGET_WINDOW = 0.5
+PRIORITY_ACTIVITY_HALF_LIFE_DAYS = 7.0
+PRIORITY_MAX_STALENESS = 2.0
+
+
+def price_volatility(prices: Sequence[float]) -> float:
+    changes = [abs(b - a) / a for a, b in pairwise(prices) if a]
+    if not changes:
+        return 0.0
+    return sum(changes) / len(changes)
+
+
+def _volatility_factor(prices: Sequence[float]) -> float:
+    if len(prices) < MIN_HISTORY_POINTS:
+        return 1.0
+    return 2.0 / (1.0 + price_volatility(prices) / VOLATILITY_REFERENCE)
+
+
+def _proximity_factor(current: float | None, target: float) -> float:
+    if current is None or target <= 0:
+        return 1.0
+    gap = (current - target) / target
+    if gap <= 0:
+        # Deal is active: watch closely for the price going back up.
+        return 0.5
+    return min(max(gap / NEAR_TARGET_GAP, 0.25), 2.0)
+
+
+def next_check_interval(
+    prices: Sequence[float],
+    current: float | None,
+    target: float,
+    *,
+    base: timedelta,
+    min_interval: timedelta,
+    max_interval: timedelta,
+) -> timedelta:
+    """Scale the base interval down for volatile or near-target products and up for static ones.
+
+    `prices` are the most recent observations in chronological order.
+    """
+    factor = _volatility_factor(prices) * _proximity_factor(current, target)
+    return min(max(base * factor, min_interval), max_interval)
+
+
+def refresh_priority(
+    product: Product, user: UserDTO | None, *, now: datetime, base: timedelta
+) -> float:
+    """Higher is more urgent. Never-checked products count as maximally stale."""
+    target = float(product.target_price)
+    if product.current_price is None or target <= 0:
+        proximity = 0.5
+    else:
+        gap = (float(product.current_price) - target) / target
+        proximity = 1.0 if gap <= 0 else max(0.0, 1.0 - gap / PRIORITY_TARGET_WINDOW)
+
+    if product.last_checked_at is None:
+        staleness = PRIORITY_MAX_STALENESS
+    else:
+        staleness = min((now - product.last_checked_at) / base, PRIORITY_MAX_STALENESS)
+
+    activity = 0.0
+    premium = 0.0
+    if user is not None:
+        if user.last_active_at is not None:
+            idle_days = max((now - user.last_active_at).total_seconds(), 0.0) / 86400
+            activity = 1.0 / (1.0 + idle_days / PRIORITY_ACTIVITY_HALF_LIFE_DAYS)
+        premium = 1.0 if user.is_premium else 0.0
+
+    return (
+        PRIORITY_WEIGHT_TARGET * proximity
+        + PRIORITY_WEIGHT_STALENESS * max(staleness, 0.0)
+        + PRIORITY_WEIGHT_ACTIVITY * activity
+        + PRIORITY_WEIGHT_PREMIUM * premium
+    )
+
+
+class RefreshQueue:
+    """Max-priority queue of products; ties keep insertion order."""
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, int, Product]] = []
+        self._seq = count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, product: Product, priority: float) -> None:
+        heapq.heappush(self._heap, (-priority, next(self._seq), product))
+
+    def pop(self) -> Product:
+        return heapq.heappop(self._heap)[2]
+
+    def drain(self) -> Iterator[Product]:
+        while self._heap:
+            yield self.pop()
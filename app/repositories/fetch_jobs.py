@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import FetchJob
+
+
+@dataclass
+class FetchJobDTO:
+    id: int
+    url: str
+    status: str
+    result: dict[str, Any] | None
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+
+class FetchJobsRepo:
+    """Product fetches requested by the bot and carried out by the scraper worker."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    @staticmethod
+    def _to_dto(row: FetchJob) -> FetchJobDTO:
+        return FetchJobDTO(
+            id=row.id,
+            url=row.url,
+            status=row.status,
+            result=row.result,
+            error=row.error,
+            created_at=row.created_at,
+            started_at=row.started_at,
+            finished_at=row.finished_at,
+        )
+
+    async def enqueue(self, url: str) -> int:
+        row = FetchJob(url=url, status="pending", created_at=datetime.now())
+        self.session.add(row)
+        await self.session.commit()
+        return row.id
+
+    async def get(self, job_id: int) -> FetchJobDTO | None:
+        row = await self.session.get(FetchJob, job_id, populate_existing=True)
+        return self._to_dto(row) if row else None
+
+    async def claim_next(self, *, max_age: timedelta) -> FetchJobDTO | None:
+        """Mark the oldest pending job running; jobs older than `max_age` were given up on."""
+        now = datetime.now()
+        candidate = (
+            select(FetchJob.id)
+            .where(FetchJob.status == "pending", FetchJob.created_at >= now - max_age)
+            .order_by(FetchJob.created_at, FetchJob.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        claimed = (
+            await self.session.execute(
+                update(FetchJob)
+                .where(FetchJob.id == candidate, FetchJob.status == "pending")
+                .values(status="running", started_at=now)
+                .returning(FetchJob.id)
+            )
+        ).scalar_one_or_none()
+        await self.session.commit()
+        return await self.get(claimed) if claimed is not None else None
+
+    async def finish(
+        self, job_id: int, *, result: dict[str, Any] | None = None, error: str | None = None
+    ) -> None:
+        await self.session.execute(
+            update(FetchJob)
+            .where(FetchJob.id == job_id)
+            .values(
+                status="failed" if error else "done",
+                result=result,
+                error=error[:255] if error else None,
+                finished_at=datetime.now(),
+            )
+        )
+        await self.session.commit()
+
+    async def delete_created_before(self, cutoff: datetime) -> int:
+        res = await self.session.execute(delete(FetchJob).where(FetchJob.created_at < cutoff))
+        await self.session.commit()
+        return getattr(res, "rowcount", 0) or 0
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import NotificationOutbox
+
+
+@dataclass
+class OutboxMessageDTO:
+    id: int
+    chat_id: int
+    text: str
+    reply_markup: dict[str, Any] | None
+    disable_web_page_preview: bool
+    attempts: int
+
+
+class NotificationOutboxRepo:
+    """Messages queued by the scraper worker for the bot process to deliver."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add(
+        self,
+        chat_id: int,
+        text: str,
+        *,
+        reply_markup: dict[str, Any] | None = None,
+        disable_web_page_preview: bool = False,
+    ) -> int:
+        row = NotificationOutbox(
+            chat_id=chat_id,
+            text=text,
+            reply_markup=reply_markup,
+            disable_web_page_preview=disable_web_page_preview,
+            status="pending",
+            attempts=0,
+            created_at=datetime.now(),
+        )
+        self.session.add(row)
+        await self.session.commit()
+        return row.id
+
+    async def claim_batch(self, limit: int, *, stale_after: timedelta) -> list[OutboxMessageDTO]:
+        """Claim pending messages, plus ones a crashed sender claimed over `stale_after` ago."""
+        now = datetime.now()
+        claimable = or_(
+            NotificationOutbox.status == "pending",
+            (NotificationOutbox.status == "sending")
+            & (NotificationOutbox.claimed_at < now - stale_after),
+        )
+        ids = (
+            select(NotificationOutbox.id)
+            .where(claimable)
+            .order_by(NotificationOutbox.id)
+            .limit(limit)
+            .scalar_subquery()
+        )
+        res = await self.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(ids), claimable)
+            .values(status="sending", claimed_at=now)
+            .returning(
+                NotificationOutbox.id,
+                NotificationOutbox.chat_id,
+                NotificationOutbox.text,
+                NotificationOutbox.reply_markup,
+                NotificationOutbox.disable_web_page_preview,
+                NotificationOutbox.attempts,
+            )
+        )
+        claimed = [OutboxMessageDTO(*row) for row in res.all()]
+        await self.session.commit()
+        return sorted(claimed, key=lambda m: m.id)
+
+    async def mark_sent(self, message_id: int) -> None:
+        await self.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == message_id)
+            .values(status="sent", sent_at=datetime.now(), error=None)
+        )
+        await self.session.commit()
+
+    async def mark_failed(self, message_id: int, error: str, *, retry: bool) -> None:
+        await self.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == message_id)
+            .values(
+                status="pending" if retry else "failed",
+                attempts=NotificationOutbox.attempts + 1,
+                error=error[:255],
+                claimed_at=None,
+            )
+        )
+        await self.session.commit()
+
+    async def delete_finished_before(self, cutoff: datetime) -> int:
+        res = await self.session.execute(
+            delete(NotificationOutbox).where(
+                NotificationOutbox.status.in_(("sent", "failed")),
+                NotificationOutbox.created_at < cutoff,
+            )
+        )
+        await self.session.commit()
+        return getattr(res, "rowcount", 0) or 0
@@ -3,18 +3,50 @@ from __future__ import annotations
 import logging
 from collections.abc import AsyncGenerator
 from dataclasses import dataclass
+from datetime import datetime
 
-from sqlalchemy import delete, func, select, update
+from sqlalchemy import ColumnElement, and_, bindparam, delete, func, insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import PriceHistory
 from app.db.models import Product as ProductModel
+from app.db.replica import on_replica
+from app.utils.tracing import traced_methods
 
 logger = logging.getLogger(__name__)
 
 MAX_PRODUCTS_PER_USER = 20
 PAGE_SIZE = 5
 
+# Statements on the hot paths are built once: executing the same object skips
+# constructing it and lets SQLAlchemy reuse its memoized compiled-cache key.
+_COUNT_BY_USER = (
+    select(func.count())
+    .select_from(ProductModel)
+    .where(ProductModel.user_id == bindparam("user_id"))
+)
+_COUNT_BY_USER_STALE_OK = on_replica(_COUNT_BY_USER)
+_GET_BY_ID = on_replica(select(ProductModel).where(ProductModel.id == bindparam("product_id")))
+_GET_LATEST_PRICE = on_replica(
+    select(PriceHistory.price, PriceHistory.observed_at)
+    .where(PriceHistory.product_id == bindparam("product_id"))
+    .order_by(PriceHistory.observed_at.desc(), PriceHistory.id.desc())
+    .limit(1)
+)
+# The ORM would "synchronise" loaded objects with the bindparams' placeholder values,
+# so update_current_and_history expires the product instead.
+_UPDATE_CURRENT_PRICE = (
+    update(ProductModel)
+    .where(ProductModel.id == bindparam("product_id"))
+    .values(
+        current_price=bindparam("price"),
+        updated_at=func.now(),
+        last_checked_at=bindparam("checked_at"),
+    )
+    .execution_options(synchronize_session=False)
+)
+_INSERT_PRICE_HISTORY = insert(PriceHistory)
+
 
 @dataclass
 class Product:
@@ -27,8 +59,11 @@ class Product:
     last_notified_price: float | None
     last_state: str | None
     is_active: bool
+    last_checked_at: datetime | None = None
+    next_check_at: datetime | None = None
 
 
+@traced_methods
 class ProductsRepo:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
@@ -47,28 +82,31 @@ class ProductsRepo:
             else None,
             last_state=p.last_state,
             is_active=bool(p.is_active),
+            last_checked_at=p.last_checked_at,
+            next_check_at=p.next_check_at,
         )
 
-    async def count_by_user(self, user_id: int) -> int:
-        res = await self.session.execute(
-            select(func.count()).select_from(ProductModel).where(ProductModel.user_id == user_id)
-        )
+    async def count_by_user(self, user_id: int, *, stale_ok: bool = False) -> int:
+        stmt = _COUNT_BY_USER_STALE_OK if stale_ok else _COUNT_BY_USER
+        res = await self.session.execute(stmt, {"user_id": user_id})
         return int(res.scalar_one())
 
     async def list_page(
         self, user_id: int, page: int, page_size: int = PAGE_SIZE
     ) -> tuple[list[Product], int]:
-        total = await self.count_by_user(user_id)
+        total = await self.count_by_user(user_id, stale_ok=True)
         pages = max((total + page_size - 1) // page_size, 1)
         page = max(1, min(page, pages))
         offset = (page - 1) * page_size
 
         res = await self.session.execute(
-            select(ProductModel)
-            .where(ProductModel.user_id == user_id)
-            .order_by(ProductModel.id.desc())
-            .limit(page_size)
-            .offset(offset)
+            on_replica(
+                select(ProductModel)
+                .where(ProductModel.user_id == user_id)
+                .order_by(ProductModel.id.desc())
+                .limit(page_size)
+                .offset(offset)
+            )
         )
         items = [self._to_dto(p) for p in res.scalars().all()]
         return items, pages
@@ -81,7 +119,7 @@ class ProductsRepo:
         return self._to_dto(p) if p else None
 
     async def get_by_id(self, product_id: int) -> Product | None:
-        res = await self.session.execute(select(ProductModel).where(ProductModel.id == product_id))
+        res = await self.session.execute(_GET_BY_ID, {"product_id": product_id})
         p = res.scalar_one_or_none()
         return self._to_dto(p) if p else None
 
@@ -131,18 +169,22 @@ class ProductsRepo:
         await self.session.commit()
 
     async def get_latest_price(self, product_id: int) -> tuple[float, str] | None:
-        res = await self.session.execute(
-            select(PriceHistory.price, PriceHistory.observed_at)
-            .where(PriceHistory.product_id == product_id)
-            .order_by(PriceHistory.observed_at.desc(), PriceHistory.id.desc())
-            .limit(1)
-        )
+        res = await self.session.execute(_GET_LATEST_PRICE, {"product_id": product_id})
         row = res.first()
         if not row:
             return None
         price, observed_at = row
         return float(price), observed_at.isoformat()
 
+    async def recent_prices(self, product_id: int, limit: int) -> list[float]:
+        res = await self.session.execute(
+            select(PriceHistory.price)
+            .where(PriceHistory.product_id == product_id)
+            .order_by(PriceHistory.observed_at.desc(), PriceHistory.id.desc())
+            .limit(limit)
+        )
+        return [float(price) for price in reversed(res.scalars().all())]
+
     async def update_target_price(self, product_id: int, new_price: float) -> None:
         await self.session.execute(
             update(ProductModel).where(ProductModel.id == product_id).values(target_price=new_price)
@@ -151,21 +193,72 @@ class ProductsRepo:
 
     async def list_all_active(self) -> AsyncGenerator[Product, None]:
         res = await self.session.stream_scalars(
-            select(ProductModel).where(ProductModel.is_active.is_(True))
+            on_replica(select(ProductModel).where(ProductModel.is_active.is_(True)))
         )
         async for p in res:
             yield self._to_dto(p)
 
+    @staticmethod
+    def _is_due(now: datetime) -> ColumnElement[bool]:
+        return and_(
+            ProductModel.is_active.is_(True),
+            or_(ProductModel.next_check_at.is_(None), ProductModel.next_check_at <= now),
+        )
+
+    async def list_due(self, *, limit: int, now: datetime | None = None) -> list[Product]:
+        """Due products, locked until the caller commits (see `lease`)."""
+        res = await self.session.execute(
+            select(ProductModel)
+            .where(self._is_due(now or datetime.now()))
+            .order_by(ProductModel.next_check_at.asc().nulls_first(), ProductModel.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return [self._to_dto(p) for p in res.scalars().all()]
+
+    async def lease(self, product_ids: list[int], until: datetime) -> None:
+        if product_ids:
+            await self.session.execute(
+                update(ProductModel)
+                .where(ProductModel.id.in_(product_ids))
+                .values(next_check_at=until)
+            )
+        await self.session.commit()
+
+    async def schedule_next_check(self, product_id: int, at: datetime) -> None:
+        await self.session.execute(
+            update(ProductModel).where(ProductModel.id == product_id).values(next_check_at=at)
+        )
+        await self.session.commit()
+
+    async def count_due(self, now: datetime | None = None) -> int:
+        res = await self.session.execute(
+            on_replica(
+                select(func.count())
+                .select_from(ProductModel)
+                .where(self._is_due(now or datetime.now()))
+            )
+        )
+        return int(res.scalar_one())
+
     async def update_current_and_history(
         self, product_id: int, price: float, source: str = "scheduler"
     ) -> None:
         try:
             await self.session.execute(
-                update(ProductModel)
-                .where(ProductModel.id == product_id)
-                .values(current_price=price, updated_at=func.now())
+                _UPDATE_CURRENT_PRICE,
+                {"product_id": product_id, "price": price, "checked_at": datetime.now()},
+            )
+            loaded = self.session.identity_map.get(
+                ProductModel.__mapper__.identity_key_from_primary_key((product_id,))
+            )
+            if loaded is not None:
+                # Reloaded by the next query instead of keeping the old price.
+                self.session.expire(loaded)
+            await self.session.execute(
+                _INSERT_PRICE_HISTORY,
+                {"product_id": product_id, "price": price, "source": source},
             )
-            self.session.add(PriceHistory(product_id=product_id, price=price, source=source))
             await self.session.commit()
         except Exception as e:
             logger.error(
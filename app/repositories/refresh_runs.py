@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import RefreshRun
+
+# A merged window is as bad as its worst tick.
+_STATUS_RANK = {"completed": 0, "partial": 1, "failed": 2}
+
+
+@dataclass
+class RefreshRunDTO:
+    id: int
+    cycle: str
+    status: str
+    started_at: datetime
+    finished_at: datetime
+    products_checked: int
+    fetches: int
+    errors: int
+    errors_by_type: dict[str, int]
+    blocks: int
+    notifications: int
+    fetch_p50_ms: float | None
+    fetch_p95_ms: float | None
+
+    @property
+    def duration_seconds(self) -> float:
+        return (self.finished_at - self.started_at).total_seconds()
+
+
+class RefreshRunsRepo:
+    """One row per cron cycle or per window of rolling ticks, for throughput trends."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    @staticmethod
+    def _to_dto(row: RefreshRun) -> RefreshRunDTO:
+        return RefreshRunDTO(
+            id=row.id,
+            cycle=row.cycle,
+            status=row.status,
+            started_at=row.started_at,
+            finished_at=row.finished_at,
+            products_checked=row.products_checked,
+            fetches=row.fetches,
+            errors=row.errors,
+            errors_by_type=dict(row.errors_by_type or {}),
+            blocks=row.blocks,
+            notifications=row.notifications,
+            fetch_p50_ms=row.fetch_p50_ms,
+            fetch_p95_ms=row.fetch_p95_ms,
+        )
+
+    async def add(
+        self,
+        *,
+        cycle: str,
+        status: str,
+        started_at: datetime,
+        finished_at: datetime,
+        products_checked: int,
+        fetches: int,
+        errors: int,
+        errors_by_type: Mapping[str, int],
+        blocks: int,
+        notifications: int,
+        fetch_p50_ms: float | None,
+        fetch_p95_ms: float | None,
+    ) -> int:
+        row = RefreshRun(
+            cycle=cycle,
+            status=status,
+            started_at=started_at,
+            finished_at=finished_at,
+            products_checked=products_checked,
+            fetches=fetches,
+            errors=errors,
+            errors_by_type=dict(errors_by_type),
+            blocks=blocks,
+            notifications=notifications,
+            fetch_p50_ms=fetch_p50_ms,
+            fetch_p95_ms=fetch_p95_ms,
+        )
+        self.session.add(row)
+        await self.session.commit()
+        return row.id
+
+    async def add_to_window(
+        self,
+        *,
+        cycle: str,
+        window_start: datetime,
+        status: str,
+        finished_at: datetime,
+        products_checked: int,
+        fetches: int,
+        errors: int,
+        errors_by_type: Mapping[str, int],
+        blocks: int,
+        notifications: int,
+        fetch_p50_ms: float | None,
+        fetch_p95_ms: float | None,
+    ) -> int:
+        """Fold one tick into the row starting at `window_start`, creating it if needed.
+
+        Counters are summed, so `fetches` counts a URL once per tick that fetched it.
+        Percentiles of a window are approximate: p50 is averaged weighted by products
+        checked, p95 is the worst tick's.
+        """
+        res = await self.session.execute(
+            select(RefreshRun)
+            .where(RefreshRun.cycle == cycle, RefreshRun.started_at == window_start)
+            .with_for_update()
+        )
+        row = res.scalars().first()
+        if row is None:
+            return await self.add(
+                cycle=cycle,
+                status=status,
+                started_at=window_start,
+                finished_at=finished_at,
+                products_checked=products_checked,
+                fetches=fetches,
+                errors=errors,
+                errors_by_type=errors_by_type,
+                blocks=blocks,
+                notifications=notifications,
+                fetch_p50_ms=fetch_p50_ms,
+                fetch_p95_ms=fetch_p95_ms,
+            )
+
+        if fetch_p50_ms is not None:
+            if row.fetch_p50_ms is None:
+                row.fetch_p50_ms = fetch_p50_ms
+            else:
+                total = row.products_checked + products_checked
+                row.fetch_p50_ms = (
+                    round(
+                        (row.fetch_p50_ms * row.products_checked + fetch_p50_ms * products_checked)
+                        / total,
+                        2,
+                    )
+                    if total
+                    else fetch_p50_ms
+                )
+        if fetch_p95_ms is not None:
+            row.fetch_p95_ms = max(row.fetch_p95_ms or 0.0, fetch_p95_ms)
+        if _STATUS_RANK.get(status, 0) > _STATUS_RANK.get(row.status, 0):
+            row.status = status
+        row.finished_at = max(row.finished_at, finished_at)
+        row.products_checked += products_checked
+        row.fetches += fetches
+        row.errors += errors
+        merged = dict(row.errors_by_type or {})
+        for name, count in errors_by_type.items():
+            merged[name] = merged.get(name, 0) + count
+        row.errors_by_type = merged
+        row.blocks += blocks
+        row.notifications += notifications
+        await self.session.commit()
+        return row.id
+
+    async def delete_older_than(self, cutoff: datetime) -> int:
+        result = await self.session.execute(
+            delete(RefreshRun).where(RefreshRun.started_at < cutoff)
+        )
+        await self.session.commit()
+        return getattr(result, "rowcount", 0) or 0
+
+    async def list_recent(self, limit: int = 10) -> list[RefreshRunDTO]:
+        res = await self.session.execute(
+            select(RefreshRun)
+            .order_by(RefreshRun.started_at.desc(), RefreshRun.id.desc())
+            .limit(limit)
+        )
+        return [self._to_dto(row) for row in res.scalars()]
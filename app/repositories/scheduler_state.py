@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import SchedulerState
+
+
+class SchedulerStateRepo:
+    """Small key/value store for scheduler bookkeeping that must survive restarts."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, key: str) -> str | None:
+        row = await self.session.get(SchedulerState, key)
+        return row.value if row else None
+
+    async def set(self, key: str, value: str) -> None:
+        row = await self.session.get(SchedulerState, key)
+        if row is None:
+            self.session.add(SchedulerState(key=key, value=value, updated_at=datetime.now()))
+        else:
+            row.value = value
+            row.updated_at = datetime.now()
+        await self.session.commit()
+
+    async def delete(self, key: str) -> None:
+        await self.session.execute(delete(SchedulerState).where(SchedulerState.key == key))
+        await self.session.commit()
+
+    async def get_datetime(self, key: str) -> datetime | None:
+        value = await self.get(key)
+        return datetime.fromisoformat(value) if value else None
+
+    async def set_datetime(self, key: str, value: datetime) -> None:
+        await self.set(key, value.isoformat())
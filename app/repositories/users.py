@@ -3,11 +3,15 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
 
-from sqlalchemy import func, select, update
+from sqlalchemy import bindparam, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import User
 from app.i18n import Lang
+from app.utils.tracing import traced_methods
+
+# Runs for every incoming update (DBSessionMiddleware), so it is built once.
+_BY_TG_ID = select(User).where(User.tg_user_id == bindparam("tg_user_id"))
 
 
 @dataclass
@@ -26,6 +30,7 @@ class UserDTO:
     timezone: str | None = None
 
 
+@traced_methods
 class PostgresUserRepo:
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -57,7 +62,7 @@ class PostgresUserRepo:
         is_premium: bool | None = None,
     ) -> UserDTO:
         """Ensure user exists in DB. Create if new, update fields if existing."""
-        res = await self.session.execute(select(User).where(User.tg_user_id == tg_user_id))
+        res = await self.session.execute(_BY_TG_ID, {"tg_user_id": tg_user_id})
         u = res.scalar_one_or_none()
         now = datetime.now()
 
@@ -92,7 +97,7 @@ class PostgresUserRepo:
         return self._to_dto(u)
 
     async def get_by_tg_id(self, tg_user_id: int) -> UserDTO | None:
-        res = await self.session.execute(select(User).where(User.tg_user_id == tg_user_id))
+        res = await self.session.execute(_BY_TG_ID, {"tg_user_id": tg_user_id})
         u = res.scalar_one_or_none()
         return self._to_dto(u) if u else None
 
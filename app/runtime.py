@@ -0,0 +1,166 @@
+"""Startup and shutdown shared by the bot (``app.bot``) and the scraper worker (``app.worker``)."""
+
+from __future__ import annotations
+
+import logging
+from contextlib import suppress
+from datetime import timedelta
+
+from aiogram import Bot
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.config import Settings
+from app.db.db import PoolConfig, init_engine_and_schema
+from app.db.migrations import run_migrations
+from app.leader import LeaderElector
+from app.loop_monitor import LoopMonitor
+from app.metrics import stop_metrics_server
+from app.outbox import MessageSender, OutboxDelivery
+from app.scheduler import RollingConfig, setup_scheduler
+from app.services.fetch_queue import configure_fetch_queue, shutdown_fetch_queue
+from app.services.marketplace_client import (
+    configure_endpoints,
+    configure_parse_executor,
+    shutdown_browser,
+    shutdown_parse_executor,
+)
+from app.utils.tracing import setup_tracing, shutdown_tracing
+
+logger = logging.getLogger(__name__)
+
+
+def setup_logging(settings: Settings, *, prefix: str = "") -> None:
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level.upper(), logging.INFO),
+        format=f"%(asctime)s | %(levelname)s | {prefix}%(name)s | %(message)s",
+        force=True,
+    )
+
+
+def configure_services(settings: Settings, *, scraping: bool = True) -> None:
+    configure_endpoints(
+        ozon_base_url=settings.ozon_base_url, wb_api_base_url=settings.wb_api_base_url
+    )
+
+    configure_fetch_queue(settings.fetch_workers)
+
+    if settings.parse_workers > 0 and scraping:
+        configure_parse_executor(
+            settings.parse_workers, min_bytes=settings.parse_offload_min_kb * 1024
+        )
+        logger.info("Parsing large Ozon payloads in %d processes", settings.parse_workers)
+
+    if settings.tracing_enabled and setup_tracing(settings.tracing_service_name):
+        logger.info("OpenTelemetry tracing enabled, exporting spans over OTLP")
+
+
+def migrate(settings: Settings) -> None:
+    if settings.auto_migrate:
+        logger.info("AUTO_MIGRATE is enabled, running database migrations...")
+        try:
+            run_migrations(settings.database_url)
+        except Exception as e:
+            logger.error("Failed to run migrations: %s", e)
+            raise
+
+
+def init_db(settings: Settings) -> tuple[AsyncEngine, async_sessionmaker[AsyncSession]]:
+    return init_engine_and_schema(
+        settings.database_url,
+        db_metrics=settings.db_metrics_enabled,
+        pool=PoolConfig(
+            size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            recycle_seconds=settings.db_pool_recycle_seconds,
+            pre_ping=settings.db_pool_pre_ping,
+            statement_cache_size=settings.db_statement_cache_size,
+        ),
+        replica_dsn=settings.database_replica_url or None,
+        replica_max_lag_seconds=settings.db_replica_max_lag_seconds,
+    )
+
+
+async def start_loop_monitor(settings: Settings) -> LoopMonitor | None:
+    if not settings.loop_monitor_enabled:
+        return None
+    loop_monitor = LoopMonitor(slow_callback_seconds=settings.loop_slow_callback_ms / 1000)
+    await loop_monitor.start()
+    return loop_monitor
+
+
+async def start_scheduler(
+    settings: Settings,
+    bot: MessageSender,
+    engine: AsyncEngine,
+    session_maker: async_sessionmaker[AsyncSession],
+) -> tuple[AsyncIOScheduler, LeaderElector | None]:
+    leader: LeaderElector | None = None
+    if settings.leader_election_enabled:
+        leader = LeaderElector(engine, lock_key=settings.leader_lock_key)
+        await leader.start()
+
+    rolling: RollingConfig | None = None
+    if settings.refresh_mode == "rolling":
+        rolling = RollingConfig(
+            batch_size=settings.refresh_batch_size,
+            tick_seconds=settings.refresh_tick_seconds,
+            interval_minutes=settings.refresh_interval_minutes,
+            adaptive=settings.refresh_adaptive,
+            min_interval_minutes=settings.refresh_min_interval_minutes,
+            max_interval_minutes=settings.refresh_max_interval_minutes,
+        )
+
+    cycle_budget = (
+        timedelta(minutes=settings.refresh_cycle_budget_minutes)
+        if settings.refresh_cycle_budget_minutes > 0
+        else None
+    )
+    scheduler = setup_scheduler(
+        bot,
+        settings.price_check_hours,
+        session_maker,
+        leader=leader,
+        rolling=rolling,
+        cycle_budget=cycle_budget,
+    )
+    return scheduler, leader
+
+
+async def shutdown(
+    *,
+    bot: Bot | None,
+    scheduler: AsyncIOScheduler | None = None,
+    leader: LeaderElector | None = None,
+    outbox: OutboxDelivery | None = None,
+    loop_monitor: LoopMonitor | None = None,
+    engine: AsyncEngine | None = None,
+) -> None:
+    if scheduler is not None:
+        with suppress(Exception):
+            scheduler.shutdown(wait=False)
+    if leader is not None:
+        with suppress(Exception):
+            await leader.stop()
+    if outbox is not None:
+        with suppress(Exception):
+            await outbox.stop()
+    if loop_monitor is not None:
+        with suppress(Exception):
+            await loop_monitor.stop()
+    if bot is not None:
+        with suppress(Exception):
+            await bot.session.close()
+    with suppress(Exception):
+        await shutdown_fetch_queue()
+    with suppress(Exception):
+        await shutdown_browser()
+    with suppress(Exception):
+        shutdown_parse_executor()
+    with suppress(Exception):
+        await stop_metrics_server()
+    if engine is not None:
+        with suppress(Exception):
+            await engine.dispose()
+    with suppress(Exception):
+        shutdown_tracing()
@@ -1,32 +1,92 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+from collections import Counter
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import partial
 from time import perf_counter
+from typing import Any
 
-from aiogram import Bot
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.i18n import Lang, i18n
 from app.keyboards.products import deal_reached_kb
+from app.leader import LeaderElector
 from app.metrics import (
     inflight_products_gauge,
     price_check_duration_seconds,
+    refresh_cycle_lag_seconds,
+    refresh_due_backlog_gauge,
+    refresh_interval_seconds,
+    refresh_skipped_products_total,
     scheduler_runs_total,
     total_price_check_errors,
     total_products_checked,
 )
-from app.repositories.products import ProductsRepo
-from app.repositories.users import PostgresUserRepo
-from app.services.marketplace_client import fetch_product_info
+from app.outbox import MessageSender
+from app.refresh_policy import RefreshQueue, next_check_interval, refresh_priority
+from app.repositories.products import Product, ProductsRepo
+from app.repositories.refresh_runs import RefreshRunsRepo
+from app.repositories.scheduler_state import SchedulerStateRepo
+from app.repositories.users import PostgresUserRepo, UserDTO
+from app.services.fetch_queue import Priority, run_fetch
+from app.services.marketplace_client import (
+    BLOCK_ERRORS,
+    MarketplaceBlockedError,
+    fetch_product_info,
+)
 from app.utils.logging import log_notification_sent, log_price_check, log_scheduler_event
 
 logger = logging.getLogger(__name__)
 
+# Rolling mode scores this many due candidates per batch slot before leasing the best ones.
+CANDIDATES_PER_SLOT = 4
+# Staleness reference for prioritising cron cycles, which have no per-product interval.
+CRON_STALENESS_BASE = timedelta(hours=8)
+# Start of the cron cycle in progress; products checked since then are skipped on resume.
+CRON_CURSOR_KEY = "cron_cycle_started_at"
+# refresh_runs history; rolling ticks are merged into one row per hour.
+REFRESH_RUNS_RETENTION = timedelta(days=90)
+# A running cycle re-checks the leader lock after this many products, so it stops
+# writing soon after another replica takes over.
+LEADER_CHECK_EVERY = 20
+
+_cron_lock = asyncio.Lock()
+
+
+class _RunsRetention:
+    # Rolling window whose first tick last pruned refresh_runs; once per hour is plenty.
+    window: datetime | None = None
+
+
+class _UserCache:
+    def __init__(self, users: PostgresUserRepo) -> None:
+        self._users = users
+        self._cache: dict[int, UserDTO | None] = {}
+
+    async def get_by_id(self, user_id: int) -> UserDTO | None:
+        if user_id not in self._cache:
+            self._cache[user_id] = await self._users.get_by_id(user_id)
+        return self._cache[user_id]
+
+
+async def _prioritize(items: list[Product], users: _UserCache, *, base: timedelta) -> RefreshQueue:
+    now = datetime.now()
+    queue = RefreshQueue()
+    for p in items:
+        queue.push(p, refresh_priority(p, await users.get_by_id(p.user_id), now=now, base=base))
+    return queue
+
 
 async def _notify_deal_reached(
-    bot: Bot,
+    bot: MessageSender,
     *,
     user_tg_id: int,
     lang: Lang,
@@ -52,7 +112,7 @@ async def _notify_deal_reached(
 
 
 async def _notify_deal_over(
-    bot: Bot,
+    bot: MessageSender,
     *,
     user_tg_id: int,
     lang: Lang,
@@ -72,125 +132,407 @@ async def _notify_deal_over(
     await bot.send_message(user_tg_id, text, disable_web_page_preview=True)
 
 
-async def refresh_prices_and_notify(
-    bot: Bot,
+@dataclass
+class CycleStats:
+    products_checked: int = 0
+    notifications_sent: int = 0
+    errors: int = 0
+    blocks: int = 0
+    skipped: int = 0
+    errors_by_type: Counter[str] = field(default_factory=Counter)
+    fetched_urls: set[str] = field(default_factory=set)
+    fetch_seconds: list[float] = field(default_factory=list)
+
+    def record_error(self, exc: Exception) -> None:
+        self.errors += 1
+        cause = exc.__cause__ if isinstance(exc, MarketplaceBlockedError) else None
+        self.errors_by_type[type(cause or exc).__name__] += 1
+        if isinstance(cause, BLOCK_ERRORS):
+            self.blocks += 1
+
+    def fetch_percentile_ms(self, q: float) -> float | None:
+        if not self.fetch_seconds:
+            return None
+        ordered = sorted(self.fetch_seconds)
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+
+@dataclass(frozen=True)
+class RollingConfig:
+    batch_size: int = 20
+    tick_seconds: int = 60
+    interval_minutes: int = 480
+    adaptive: bool = True
+    min_interval_minutes: int = 60
+    max_interval_minutes: int = 1440
+    history_size: int = 10
+
+    @property
+    def interval(self) -> timedelta:
+        return timedelta(minutes=self.interval_minutes)
+
+
+async def _schedule_next_check(
+    products: ProductsRepo, p: Product, current: float, config: RollingConfig
+) -> None:
+    prices = await products.recent_prices(p.id, config.history_size)
+    interval = next_check_interval(
+        prices,
+        current,
+        float(p.target_price),
+        base=config.interval,
+        min_interval=timedelta(minutes=config.min_interval_minutes),
+        max_interval=timedelta(minutes=config.max_interval_minutes),
+    )
+    refresh_interval_seconds.observe(interval.total_seconds())
+    await products.schedule_next_check(p.id, datetime.now() + interval)
+
+
+async def _save_run(
     session_maker: async_sessionmaker[AsyncSession],
+    cycle: str,
+    status: str,
+    started_at: datetime,
+    stats: CycleStats,
 ) -> None:
-    log_scheduler_event("price_check_started")
+    fields: dict[str, Any] = {
+        "cycle": cycle,
+        "status": status,
+        "finished_at": datetime.now(),
+        "products_checked": stats.products_checked,
+        "fetches": len(stats.fetched_urls),
+        "errors": stats.errors,
+        "errors_by_type": stats.errors_by_type,
+        "blocks": stats.blocks,
+        "notifications": stats.notifications_sent,
+        "fetch_p50_ms": stats.fetch_percentile_ms(0.50),
+        "fetch_p95_ms": stats.fetch_percentile_ms(0.95),
+    }
+    try:
+        async with session_maker() as session:
+            runs = RefreshRunsRepo(session)
+            if cycle == "rolling":
+                # A rolling tick every minute would flood /runs; keep one row per window.
+                window_start = started_at.replace(minute=0, second=0, microsecond=0)
+                await runs.add_to_window(window_start=window_start, **fields)
+                if _RunsRetention.window == window_start:
+                    return
+                _RunsRetention.window = window_start
+            else:
+                await runs.add(started_at=started_at, **fields)
+            await runs.delete_older_than(datetime.now() - REFRESH_RUNS_RETENTION)
+    except Exception:
+        logger.exception("Failed to record %s refresh run", cycle)
+
+
+@asynccontextmanager
+async def _track_cycle(
+    cycle: str, session_maker: async_sessionmaker[AsyncSession]
+) -> AsyncIterator[CycleStats]:
+    log_scheduler_event("price_check_started", cycle=cycle)
     scheduler_runs_total.labels("started").inc()
     started = perf_counter()
+    started_at = datetime.now()
     inflight_products_gauge.set(0)
-    status_label = "completed"
+    stats = CycleStats()
+    status = "failed"
 
-    products_checked = 0
-    notifications_sent = 0
-    errors_count = 0
+    cancelled = False
 
     try:
-        async with session_maker() as session:
-            users = PostgresUserRepo(session)
-            products = ProductsRepo(session)
-
-            async for p in products.list_all_active():
-                inflight_products_gauge.inc()
-                try:
-                    info = await fetch_product_info(p.url)
-                    chosen = info.price_for_compare
-                    if chosen is None:
-                        continue
-
-                    old_price = float(p.current_price) if p.current_price else None
-                    current = float(chosen)
-
-                    await products.update_current_and_history(p.id, current, source="scheduler")
-                    products_checked += 1
-                    total_products_checked.inc()
-
-                    user = await users.get_by_id(p.user_id)
-                    if not user:
-                        continue
-
-                    target = float(p.target_price)
-                    prev_state = p.last_state
-
-                    log_price_check(
-                        product_id=p.id,
-                        title=p.title,
-                        old_price=old_price,
-                        new_price=current,
-                        target_price=target,
-                    )
-
-                    if current <= target:
-                        if prev_state != "below":
-                            await _notify_deal_reached(
-                                bot,
-                                user_tg_id=user.tg_user_id,
-                                lang=user.language,
-                                product_id=p.id,
-                                title=p.title,
-                                url=p.url,
-                                current=current,
-                                target=target,
-                            )
-                            await products.set_last_state(
-                                p.id, "below", last_notified_price=current
-                            )
-                            notifications_sent += 1
-                    else:
-                        if prev_state == "below":
-                            await _notify_deal_over(
-                                bot,
-                                user_tg_id=user.tg_user_id,
-                                lang=user.language,
-                                product_id=p.id,
-                                title=p.title,
-                                current=current,
-                                target=target,
-                            )
-                            await products.set_last_state(p.id, "above", last_notified_price=None)
-                            notifications_sent += 1
-                except Exception as e:
-                    errors_count += 1
-                    total_price_check_errors.inc()
-                    logger.exception("Failed to refresh product %s: %s", p.id, e)
-                finally:
-                    inflight_products_gauge.dec()
+        yield stats
+    except asyncio.CancelledError:
+        # Shutting down: the session may no longer be usable, and a partial tick
+        # would skew the history.
+        cancelled = True
+        raise
     except Exception:
-        status_label = "failed"
         scheduler_runs_total.labels("failed").inc()
         log_scheduler_event(
             "price_check_completed",
-            products_checked=products_checked,
-            notifications_sent=notifications_sent,
-            errors=errors_count,
-            status=status_label,
+            cycle=cycle,
+            products_checked=stats.products_checked,
+            notifications_sent=stats.notifications_sent,
+            errors=stats.errors,
+            status="failed",
         )
         raise
     else:
-        scheduler_runs_total.labels("completed").inc()
+        status = "partial" if stats.skipped else "completed"
+        scheduler_runs_total.labels(status).inc()
         log_scheduler_event(
             "price_check_completed",
-            products_checked=products_checked,
-            notifications_sent=notifications_sent,
-            errors=errors_count,
-            status=status_label,
+            cycle=cycle,
+            products_checked=stats.products_checked,
+            notifications_sent=stats.notifications_sent,
+            errors=stats.errors,
+            status=status,
         )
     finally:
         price_check_duration_seconds.observe(perf_counter() - started)
         inflight_products_gauge.set(0)
+        if not cancelled:
+            await _save_run(session_maker, cycle, status, started_at, stats)
+
+
+async def _lost_leadership(leader: LeaderElector | None, processed: int) -> bool:
+    if leader is None or not processed or processed % LEADER_CHECK_EVERY:
+        return False
+    return not await leader.check()
+
+
+def _leadership_lost(cycle: str, stats: CycleStats, remaining: int) -> None:
+    stats.skipped = remaining
+    refresh_skipped_products_total.labels("leadership").inc(remaining)
+    log_scheduler_event(
+        "price_check_leadership_lost",
+        cycle=cycle,
+        products_checked=stats.products_checked,
+        remaining=remaining,
+    )
+
+
+async def _refresh_product(
+    bot: MessageSender,
+    users: _UserCache,
+    products: ProductsRepo,
+    p: Product,
+    stats: CycleStats,
+    rolling: RollingConfig | None = None,
+) -> None:
+    inflight_products_gauge.inc()
+    try:
+        stats.fetched_urls.add(p.url)
+        fetch_started = perf_counter()
+        try:
+            info = await run_fetch(
+                partial(fetch_product_info, p.url), priority=Priority.SCHEDULED, key=p.url
+            )
+        finally:
+            stats.fetch_seconds.append(perf_counter() - fetch_started)
+        chosen = info.price_for_compare
+        if chosen is None:
+            return
+
+        old_price = float(p.current_price) if p.current_price else None
+        current = float(chosen)
+
+        await products.update_current_and_history(p.id, current, source="scheduler")
+        stats.products_checked += 1
+        total_products_checked.inc()
+
+        if rolling is not None and rolling.adaptive:
+            await _schedule_next_check(products, p, current, rolling)
+
+        user = await users.get_by_id(p.user_id)
+        if not user:
+            return
+
+        target = float(p.target_price)
+        prev_state = p.last_state
+
+        log_price_check(
+            product_id=p.id,
+            title=p.title,
+            old_price=old_price,
+            new_price=current,
+            target_price=target,
+        )
+
+        if current <= target:
+            if prev_state != "below":
+                await _notify_deal_reached(
+                    bot,
+                    user_tg_id=user.tg_user_id,
+                    lang=user.language,
+                    product_id=p.id,
+                    title=p.title,
+                    url=p.url,
+                    current=current,
+                    target=target,
+                )
+                await products.set_last_state(p.id, "below", last_notified_price=current)
+                stats.notifications_sent += 1
+        else:
+            if prev_state == "below":
+                await _notify_deal_over(
+                    bot,
+                    user_tg_id=user.tg_user_id,
+                    lang=user.language,
+                    product_id=p.id,
+                    title=p.title,
+                    current=current,
+                    target=target,
+                )
+                await products.set_last_state(p.id, "above", last_notified_price=None)
+                stats.notifications_sent += 1
+    except Exception as e:
+        stats.record_error(e)
+        total_price_check_errors.inc()
+        logger.exception("Failed to refresh product %s: %s", p.id, e)
+    finally:
+        inflight_products_gauge.dec()
+
+
+async def refresh_prices_and_notify(
+    bot: MessageSender,
+    session_maker: async_sessionmaker[AsyncSession],
+    *,
+    budget: timedelta | None = None,
+    leader: LeaderElector | None = None,
+) -> None:
+    if _cron_lock.locked():
+        scheduler_runs_total.labels("overlapped").inc()
+        log_scheduler_event("job_skipped", job="refresh_prices_and_notify", reason="overlap")
+        return
+    async with _cron_lock:
+        await _run_cron_cycle(bot, session_maker, budget=budget, leader=leader)
+
+
+async def _run_cron_cycle(
+    bot: MessageSender,
+    session_maker: async_sessionmaker[AsyncSession],
+    *,
+    budget: timedelta | None,
+    leader: LeaderElector | None = None,
+) -> None:
+    deadline = None if budget is None else perf_counter() + budget.total_seconds()
+
+    async with _track_cycle("cron", session_maker) as stats, session_maker() as session:
+        users = _UserCache(PostgresUserRepo(session))
+        products = ProductsRepo(session)
+        state = SchedulerStateRepo(session)
+
+        cycle_started = await state.get_datetime(CRON_CURSOR_KEY)
+        if cycle_started is None:
+            cycle_started = datetime.now()
+            await state.set_datetime(CRON_CURSOR_KEY, cycle_started)
+        else:
+            log_scheduler_event(
+                "price_check_resumed", cycle="cron", cycle_started=cycle_started.isoformat()
+            )
+
+        pending = [
+            p
+            async for p in products.list_all_active()
+            if p.last_checked_at is None or p.last_checked_at < cycle_started
+        ]
+        queue = await _prioritize(pending, users, base=CRON_STALENESS_BASE)
+        for processed, product in enumerate(queue.drain()):
+            # `product` has already left the queue, so it counts as remaining.
+            if deadline is not None and perf_counter() >= deadline:
+                remaining = stats.skipped = len(queue) + 1
+                refresh_skipped_products_total.labels("budget").inc(remaining)
+                refresh_cycle_lag_seconds.set((datetime.now() - cycle_started).total_seconds())
+                log_scheduler_event(
+                    "price_check_budget_exhausted",
+                    cycle="cron",
+                    products_checked=stats.products_checked,
+                    remaining=remaining,
+                )
+                return
+            if await _lost_leadership(leader, processed):
+                # The cursor stays, so the new leader resumes this cycle.
+                _leadership_lost("cron", stats, len(queue) + 1)
+                return
+            await _refresh_product(bot, users, products, product, stats)
+
+        await state.delete(CRON_CURSOR_KEY)
+        refresh_cycle_lag_seconds.set(0)
+
+
+async def refresh_due_products(
+    bot: MessageSender,
+    session_maker: async_sessionmaker[AsyncSession],
+    *,
+    config: RollingConfig,
+    leader: LeaderElector | None = None,
+) -> None:
+    async with session_maker() as session:
+        users = _UserCache(PostgresUserRepo(session))
+        products = ProductsRepo(session)
+
+        now = datetime.now()
+        candidates = await products.list_due(limit=config.batch_size * CANDIDATES_PER_SLOT, now=now)
+        queue = await _prioritize(candidates, users, base=config.interval)
+        due = [queue.pop() for _ in range(min(config.batch_size, len(queue)))]
+        await products.lease([p.id for p in due], now + config.interval)
+
+        refresh_due_backlog_gauge.set(await products.count_due())
+        if not due:
+            return
+
+        async with _track_cycle("rolling", session_maker) as stats:
+            for processed, p in enumerate(due):
+                if await _lost_leadership(leader, processed):
+                    # Their lease runs out and the new leader picks them up.
+                    _leadership_lost("rolling", stats, len(due) - processed)
+                    return
+                await _refresh_product(bot, users, products, p, stats, rolling=config)
+
+
+async def run_as_leader(
+    job: Callable[..., Awaitable[None]], leader: LeaderElector | None, **kwargs: Any
+) -> None:
+    """Run `job` on the leader only; it gets `leader` to re-check during long runs."""
+    if leader is not None and not leader.is_leader:
+        log_scheduler_event("job_skipped", job=job.__name__, reason="not_leader")
+        return
+    await job(leader=leader, **kwargs)
 
 
 def setup_scheduler(
-    bot: Bot, cron_trigger: str, session_maker: async_sessionmaker[AsyncSession]
+    bot: MessageSender,
+    cron_trigger: str,
+    session_maker: async_sessionmaker[AsyncSession],
+    *,
+    leader: LeaderElector | None = None,
+    rolling: RollingConfig | None = None,
+    cycle_budget: timedelta | None = None,
 ) -> AsyncIOScheduler:
     scheduler = AsyncIOScheduler()
-    scheduler.add_job(
-        refresh_prices_and_notify,
-        CronTrigger(hour=cron_trigger, minute=0),
-        kwargs={"bot": bot, "session_maker": session_maker},
-    )
+    if rolling is not None:
+        scheduler.add_job(
+            run_as_leader,
+            IntervalTrigger(seconds=rolling.tick_seconds),
+            args=[refresh_due_products, leader],
+            kwargs={"bot": bot, "session_maker": session_maker, "config": rolling},
+            max_instances=1,
+            coalesce=True,
+        )
+    else:
+        scheduler.add_job(
+            run_as_leader,
+            CronTrigger(hour=cron_trigger, minute=0),
+            args=[refresh_prices_and_notify, leader],
+            kwargs={"bot": bot, "session_maker": session_maker, "budget": cycle_budget},
+            max_instances=1,
+            coalesce=True,
+        )
     scheduler.start()
-    log_scheduler_event("scheduler_started", cron=cron_trigger)
-    logger.info("Scheduler configured with hours: %s", cron_trigger)
+
+    if rolling is not None:
+        log_scheduler_event(
+            "scheduler_started",
+            mode="rolling",
+            batch_size=rolling.batch_size,
+            tick_seconds=rolling.tick_seconds,
+            interval_minutes=rolling.interval_minutes,
+            adaptive=rolling.adaptive,
+            leader_election=leader is not None,
+        )
+        logger.info(
+            "Scheduler configured for rolling refresh: %d products every %ds",
+            rolling.batch_size,
+            rolling.tick_seconds,
+        )
+    else:
+        log_scheduler_event(
+            "scheduler_started",
+            mode="cron",
+            cron=cron_trigger,
+            cycle_budget_seconds=cycle_budget.total_seconds() if cycle_budget else None,
+            leader_election=leader is not None,
+        )
+        logger.info("Scheduler configured with hours: %s", cron_trigger)
     return scheduler
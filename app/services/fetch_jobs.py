@@ -0,0 +1,177 @@
+"""Product fetches carried out by the scraper worker on behalf of the bot.
+
+The bot inserts a ``fetch_jobs`` row and polls it; ``python -m app.worker`` claims
+pending rows, runs the fetch with its browser and stores the result or the error.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import partial
+from time import monotonic
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.metrics import fetch_jobs_total
+from app.repositories.fetch_jobs import FetchJobDTO, FetchJobsRepo
+from app.services.fetch_queue import Priority, run_fetch
+from app.services.marketplace_client import (
+    MarketplaceBlockedError,
+    ProductInfo,
+    fetch_product_info,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT_SECONDS = 120.0
+POLL_INTERVAL_SECONDS = 0.5
+CLEANUP_INTERVAL_SECONDS = 3600.0
+RETENTION = timedelta(days=1)
+
+
+def info_to_result(info: ProductInfo) -> dict[str, Any]:
+    return {
+        "marketplace": info.marketplace,
+        "title": info.title,
+        "price_with_card": None if info.price_with_card is None else str(info.price_with_card),
+        "price_no_card": None if info.price_no_card is None else str(info.price_no_card),
+    }
+
+
+def result_to_info(result: dict[str, Any]) -> ProductInfo:
+    def _price(value: str | None) -> Decimal | None:
+        return None if value is None else Decimal(value)
+
+    return ProductInfo(
+        marketplace=result["marketplace"],
+        title=result["title"],
+        price_with_card=_price(result["price_with_card"]),
+        price_no_card=_price(result["price_no_card"]),
+    )
+
+
+class FetchJobClient:
+    """Drop-in for `fetch_product_info` in the bot when scraping runs in the worker."""
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        *,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        poll_interval: float = POLL_INTERVAL_SECONDS,
+    ) -> None:
+        self.session_maker = session_maker
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    async def __call__(self, url: str) -> ProductInfo:
+        async with self.session_maker() as session:
+            job_id = await FetchJobsRepo(session).enqueue(url)
+
+        # A short session per poll, so no connection is held while the worker scrapes.
+        deadline = monotonic() + self.timeout
+        while monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            async with self.session_maker() as session:
+                job = await FetchJobsRepo(session).get(job_id)
+            if job is None or job.status in ("pending", "running"):
+                continue
+            if job.error or job.result is None:
+                raise MarketplaceBlockedError(job.error or "fetch_job_failed")
+            return result_to_info(job.result)
+        raise MarketplaceBlockedError(f"fetch job {job_id} timed out after {self.timeout:.0f}s")
+
+
+class FetchJobRunner:
+    """Worker side: claims jobs and runs up to `concurrency` of them with the local browser."""
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        *,
+        concurrency: int = 1,
+        max_age: timedelta = timedelta(seconds=DEFAULT_TIMEOUT_SECONDS),
+        poll_interval: float = POLL_INTERVAL_SECONDS,
+    ) -> None:
+        self.session_maker = session_maker
+        self.concurrency = max(concurrency, 1)
+        self.max_age = max_age
+        self.poll_interval = poll_interval
+        self._task: asyncio.Task[None] | None = None
+        self._running: set[asyncio.Task[None]] = set()
+        self._last_cleanup = 0.0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="fetch-job-runner")
+
+    async def stop(self) -> None:
+        tasks = list(self._running)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def _run(self) -> None:
+        while True:
+            if len(self._running) >= self.concurrency:
+                await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                job = await self._claim()
+            except Exception:
+                logger.exception("Claiming a fetch job failed")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            task = asyncio.create_task(self._execute(job), name=f"fetch-job-{job.id}")
+            self._running.add(task)
+            task.add_done_callback(self._job_done)
+
+    def _job_done(self, task: asyncio.Task[None]) -> None:
+        self._running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Fetch job task failed", exc_info=task.exception())
+
+    async def run_once(self) -> bool:
+        """Claim one pending job and run it to completion; False if none was pending."""
+        job = await self._claim()
+        if job is None:
+            return False
+        await self._execute(job)
+        return True
+
+    async def _claim(self) -> FetchJobDTO | None:
+        # Sessions only wrap the claim and the result, so no connection is held
+        # while the browser scrapes.
+        async with self.session_maker() as session:
+            jobs = FetchJobsRepo(session)
+            if monotonic() - self._last_cleanup >= CLEANUP_INTERVAL_SECONDS:
+                self._last_cleanup = monotonic()
+                await jobs.delete_created_before(datetime.now() - RETENTION)
+            return await jobs.claim_next(max_age=self.max_age)
+
+    async def _execute(self, job: FetchJobDTO) -> None:
+        try:
+            info = await run_fetch(
+                partial(fetch_product_info, job.url), priority=Priority.INTERACTIVE, key=job.url
+            )
+        except Exception as e:
+            fetch_jobs_total.labels("failed").inc()
+            logger.warning("Fetch job %s failed: %s", job.id, e)
+            outcome: dict[str, Any] = {"error": str(e) or type(e).__name__}
+        else:
+            fetch_jobs_total.labels("done").inc()
+            outcome = {"result": info_to_result(info)}
+        async with self.session_maker() as session:
+            await FetchJobsRepo(session).finish(job.id, **outcome)
@@ -0,0 +1,194 @@
+"""Bounded pool running marketplace fetches, interactive ones ahead of scheduled refreshes.
+
+Handlers hand their fetch to a task and return, so neither the update task nor its
+DB session waits on Ozon retries. Fetches of the same product share one pool job.
+Without a configured pool (tests, scripts) jobs run inline in the caller.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import itertools
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from enum import IntEnum
+from time import monotonic
+from typing import Any, ClassVar, TypeVar
+
+from app.metrics import fetch_queue_coalesced_total, fetch_queue_depth, fetch_queue_wait_seconds
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    SCHEDULED = 1
+
+
+@dataclass
+class _Job:
+    run: Callable[[], Awaitable[Any]]
+    key: str | None
+    waiters: list[asyncio.Future[Any]]
+    entry: _Entry | None = None
+    started: bool = False
+
+    def wanted(self) -> bool:
+        return any(not w.done() for w in self.waiters)
+
+
+@dataclass(order=True)
+class _Entry:
+    priority: Priority
+    seq: int
+    enqueued_at: float = field(compare=False)
+    job: _Job = field(compare=False)
+    # Replaced by an entry at a higher priority; skipped when a worker takes it.
+    stale: bool = field(default=False, compare=False)
+
+
+class FetchQueue:
+    def __init__(self, workers: int) -> None:
+        self._queue: asyncio.PriorityQueue[_Entry] = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        # Queued or running jobs by key, for callers to join instead of fetching again.
+        self._inflight: dict[str, _Job] = {}
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"fetch-worker-{i}") for i in range(workers)
+        ]
+
+    def submit(
+        self, run: Callable[[], Awaitable[T]], *, priority: Priority, key: str | None = None
+    ) -> asyncio.Future[T]:
+        """Queue `run`, or with a `key` join the queued or running job for the same key.
+
+        Every caller gets its own future, so cancelling one does not cancel the others.
+        """
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        job = self._inflight.get(key) if key is not None else None
+        if job is not None:
+            fetch_queue_coalesced_total.labels(priority.name.lower()).inc()
+            job.waiters.append(future)
+            if job.entry is not None and not job.started and priority < job.entry.priority:
+                job.entry.stale = True
+                fetch_queue_depth.labels(job.entry.priority.name.lower()).dec()
+                self._put(job, priority)
+            return future
+        job = _Job(run, key, [future])
+        if key is not None:
+            self._inflight[key] = job
+        self._put(job, priority)
+        return future
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            with contextlib.suppress(asyncio.CancelledError):
+                await worker
+        while not self._queue.empty():
+            entry = self._queue.get_nowait()
+            if entry.stale:
+                continue
+            fetch_queue_depth.labels(entry.priority.name.lower()).dec()
+            for waiter in entry.job.waiters:
+                waiter.cancel()
+        self._inflight.clear()
+
+    def _put(self, job: _Job, priority: Priority) -> None:
+        job.entry = _Entry(priority, next(self._seq), monotonic(), job)
+        self._queue.put_nowait(job.entry)
+        fetch_queue_depth.labels(priority.name.lower()).inc()
+
+    async def _work(self) -> None:
+        while True:
+            entry = await self._queue.get()
+            if entry.stale:
+                continue
+            job = entry.job
+            label = entry.priority.name.lower()
+            fetch_queue_depth.labels(label).dec()
+            if not job.wanted():
+                self._forget(job)
+                continue
+            fetch_queue_wait_seconds.labels(label).observe(monotonic() - entry.enqueued_at)
+            job.started = True
+            try:
+                result = await job.run()
+            except asyncio.CancelledError:
+                for waiter in job.waiters:
+                    waiter.cancel()
+                raise
+            except Exception as e:
+                for waiter in job.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+            else:
+                for waiter in job.waiters:
+                    if not waiter.done():
+                        waiter.set_result(result)
+            finally:
+                self._forget(job)
+
+    def _forget(self, job: _Job) -> None:
+        if job.key is not None and self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+
+
+class _Pool:
+    queue: FetchQueue | None = None
+    # Spawned with `spawn_task`; held here so they are not garbage collected.
+    tasks: ClassVar[set[asyncio.Task[None]]] = set()
+
+
+def configure_fetch_queue(workers: int) -> None:
+    """Run fetches on `workers` tasks of the running loop; 0 runs them inline."""
+    if _Pool.queue is not None:
+        raise RuntimeError("fetch queue is already configured")
+    if workers > 0:
+        _Pool.queue = FetchQueue(workers)
+
+
+async def shutdown_fetch_queue() -> None:
+    queue, _Pool.queue = _Pool.queue, None
+    if queue is not None:
+        await queue.close()
+    tasks = list(_Pool.tasks)
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
+async def run_fetch(
+    run: Callable[[], Awaitable[T]], *, priority: Priority, key: str | None = None
+) -> T:
+    """Wait for a slot in the pool, then for `run` to finish.
+
+    Callers passing the same `key` (the product URL) while a fetch for it is queued or
+    running share that fetch and its result.
+    """
+    if _Pool.queue is None:
+        return await run()
+    return await _Pool.queue.submit(run, priority=priority, key=key)
+
+
+def spawn_task(run: Callable[[], Awaitable[None]]) -> None:
+    """Run `run` as a task outside the pool, for work that only waits on a fetch.
+
+    `run` must handle its own errors; anything it lets through is logged.
+    """
+    task = asyncio.ensure_future(run())
+    _Pool.tasks.add(task)
+    task.add_done_callback(_Pool.tasks.discard)
+    task.add_done_callback(_log_failure)
+
+
+def _log_failure(future: asyncio.Future[None]) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Background fetch failed", exc_info=future.exception())
@@ -12,6 +12,8 @@ from app.metrics import (
     marketplace_requests_total,
 )
 from app.services import ozon_client, wb_client
+from app.utils.tracing import span
+from app.utils.validators import marketplace_of
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,10 @@ class MarketplaceBlockedError(RuntimeError):
     pass
 
 
+# Upstream refusals (antibot, bad status), as opposed to our own bugs or network trouble.
+BLOCK_ERRORS = (ozon_client.OzonBlockedError, wb_client.WBBlockedError)
+
+
 @dataclass
 class ProductInfo:
     marketplace: Marketplace
@@ -37,14 +43,21 @@ class ProductInfo:
 
 
 def detect_marketplace(url: str) -> Marketplace:
-    url_lower = url.lower()
+    return marketplace_of(url) or "unknown"
+
+
+def configure_endpoints(*, ozon_base_url: str, wb_api_base_url: str) -> None:
+    """Point the clients at mirrors or local stand-ins instead of the public hosts."""
+    ozon_client.configure_base_url(ozon_base_url)
+    wb_client.configure_api_base_url(wb_api_base_url)
+
+
+def configure_parse_executor(workers: int, *, min_bytes: int) -> None:
+    ozon_client.configure_parse_executor(workers, min_bytes=min_bytes)
+
 
-    if "ozon.ru" in url_lower:
-        return "ozon"
-    elif "wildberries.ru" in url_lower or "wb.ru" in url_lower:
-        return "wildberries"
-    else:
-        return "unknown"
+def shutdown_parse_executor() -> None:
+    ozon_client.shutdown_parse_executor()
 
 
 async def fetch_product_info(url: str, *, retries: int = 2) -> ProductInfo:
@@ -58,39 +71,40 @@ async def fetch_product_info(url: str, *, retries: int = 2) -> ProductInfo:
     status_label = "success"
     started = perf_counter()
 
-    try:
-        if marketplace == "ozon":
-            ozon_info = await ozon_client.fetch_product_info(url, retries=retries)
-            return ProductInfo(
-                marketplace="ozon",
-                title=ozon_info.title,
-                price_with_card=ozon_info.price_with_card,
-                price_no_card=ozon_info.price_no_card,
-            )
-        elif marketplace == "wildberries":
-            wb_info = await wb_client.fetch_product_info(url)
-            return ProductInfo(
-                marketplace="wildberries",
-                title=wb_info.title,
-                price_with_card=wb_info.price_with_card,
-                price_no_card=wb_info.price_no_card,
-            )
-        else:
-            raise ValueError(f"Unsupported marketplace: {marketplace}")
-
-    except (ozon_client.OzonBlockedError, wb_client.WBBlockedError) as e:
-        status_label = "blocked"
-        marketplace_blocked_total.labels(marketplace).inc()
-        logger.error("Marketplace blocked or failed: %s", e)
-        raise MarketplaceBlockedError(str(e)) from e
-    except Exception as e:
-        status_label = "error"
-        logger.error("Unexpected error fetching product: %s", e)
-        raise MarketplaceBlockedError(f"Unexpected error: {e}") from e
-    finally:
-        duration = perf_counter() - started
-        marketplace_requests_total.labels(marketplace, status_label).inc()
-        marketplace_request_duration_seconds.labels(marketplace, status_label).observe(duration)
+    with span("marketplace.fetch_product_info", {"marketplace": marketplace}):
+        try:
+            if marketplace == "ozon":
+                ozon_info = await ozon_client.fetch_product_info(url, retries=retries)
+                return ProductInfo(
+                    marketplace="ozon",
+                    title=ozon_info.title,
+                    price_with_card=ozon_info.price_with_card,
+                    price_no_card=ozon_info.price_no_card,
+                )
+            elif marketplace == "wildberries":
+                wb_info = await wb_client.fetch_product_info(url)
+                return ProductInfo(
+                    marketplace="wildberries",
+                    title=wb_info.title,
+                    price_with_card=wb_info.price_with_card,
+                    price_no_card=wb_info.price_no_card,
+                )
+            else:
+                raise ValueError(f"Unsupported marketplace: {marketplace}")
+
+        except BLOCK_ERRORS as e:
+            status_label = "blocked"
+            marketplace_blocked_total.labels(marketplace).inc()
+            logger.error("Marketplace blocked or failed: %s", e)
+            raise MarketplaceBlockedError(str(e)) from e
+        except Exception as e:
+            status_label = "error"
+            logger.error("Unexpected error fetching product: %s", e)
+            raise MarketplaceBlockedError(f"Unexpected error: {e}") from e
+        finally:
+            duration = perf_counter() - started
+            marketplace_requests_total.labels(marketplace, status_label).inc()
+            marketplace_request_duration_seconds.labels(marketplace, status_label).observe(duration)
 
 
 async def shutdown_browser() -> None:
@@ -4,19 +4,39 @@ import asyncio
 import contextlib
 import json
 import logging
+import multiprocessing
 import os
 import platform
 import re
 import shlex
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 from decimal import Decimal
 from pathlib import Path
+from time import perf_counter
 from urllib.parse import quote, urlparse, urlsplit, urlunsplit
 
 from playwright.async_api import Browser, BrowserContext, Page, async_playwright
 
+from app.metrics import (
+    ozon_challenge_refresh_total,
+    ozon_parse_duration_seconds,
+    ozon_parse_queue_wait_seconds,
+    ozon_retries_total,
+    ozon_stage_duration_seconds,
+)
+from app.utils.tracing import span
+from app.utils.validators import marketplace_of
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_BASE_URL = "https://www.ozon.ru"
+# Composer payloads at least this large go to the parse pool when one is configured.
+DEFAULT_PARSE_OFFLOAD_BYTES = 256 * 1024
+
 FIRST_PARTY = ("ozon.ru", "ozone.ru", "cdn1.ozone.ru", "cdn2.ozone.ru", "ir.ozone.ru")
 _WIDGET_PRICE_KEYS = ("webPrice", "webProductPrices", "webSale")
 _WIDGET_TITLE_KEYS = ("webProductHeading",)
@@ -24,6 +44,53 @@ _WIDGET_TITLE_KEYS = ("webProductHeading",)
 ALLOWED_RESOURCE_TYPES = {"document", "script", "xhr", "fetch", "other"}
 
 
+class _Endpoints:
+    base_url = DEFAULT_BASE_URL
+
+
+def configure_base_url(url: str) -> None:
+    """Host serving the composer API and anti-bot challenge (a mirror or local stand-in)."""
+    _Endpoints.base_url = url.rstrip("/")
+
+
+class _ParsePool:
+    executor: ProcessPoolExecutor | None = None
+    workers = 0
+    min_bytes = DEFAULT_PARSE_OFFLOAD_BYTES
+
+    @classmethod
+    def start(cls) -> None:
+        # Spawned, not forked: the parent runs Playwright and driver threads.
+        cls.executor = ProcessPoolExecutor(
+            max_workers=cls.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+
+def configure_parse_executor(workers: int, *, min_bytes: int = DEFAULT_PARSE_OFFLOAD_BYTES) -> None:
+    """Parse large composer payloads in `workers` processes; 0 keeps parsing on the loop."""
+    shutdown_parse_executor()
+    _ParsePool.min_bytes = min_bytes
+    _ParsePool.workers = workers
+    if workers > 0:
+        _ParsePool.start()
+
+
+def shutdown_parse_executor() -> None:
+    if _ParsePool.executor is not None:
+        _ParsePool.executor.shutdown(wait=False, cancel_futures=True)
+        _ParsePool.executor = None
+
+
+@contextlib.contextmanager
+def _stage(name: str) -> Iterator[None]:
+    started = perf_counter()
+    try:
+        with span(f"ozon.{name}"):
+            yield
+    finally:
+        ozon_stage_duration_seconds.labels(name).observe(perf_counter() - started)
+
+
 def _env_bool(name: str, default: bool) -> bool:
     val = os.getenv(name)
     if val is None:
@@ -205,7 +272,7 @@ async def _pass_ozon_challenge(ctx: BrowserContext, page: Page, timeout_ms=60000
     logger.debug("Passing Ozon anti-bot challenge...")
     try:
         await page.goto(
-            "https://www.ozon.ru/?abt_att=1&__rr=1",
+            f"{_Endpoints.base_url}/?abt_att=1&__rr=1",
             wait_until="domcontentloaded",
             timeout=timeout_ms,
         )
@@ -215,7 +282,7 @@ async def _pass_ozon_challenge(ctx: BrowserContext, page: Page, timeout_ms=60000
 
     try:
         async with page.expect_response(
-            lambda r: ("www.ozon.ru/abt/result" in r.url) and r.status == 200,
+            lambda r: r.url.startswith(f"{_Endpoints.base_url}/abt/result") and r.status == 200,
             timeout=timeout_ms,
         ) as resp_info:
             await resp_info.value
@@ -223,7 +290,7 @@ async def _pass_ozon_challenge(ctx: BrowserContext, page: Page, timeout_ms=60000
         logger.warning("Failed to pass Ozon challenge: %s", e)
         return False
 
-    cookies = await ctx.cookies("https://www.ozon.ru/")
+    cookies = await ctx.cookies(f"{_Endpoints.base_url}/")
     ok = any(c.get("name") == "abt_data" for c in cookies)
     logger.debug("Ozon challenge result: %s", "passed" if ok else "failed")
     return ok
@@ -234,22 +301,24 @@ async def _warmup_challenge(ctx: BrowserContext) -> bool:
         return True
     page = None
     passed = False
-    try:
-        page = await ctx.new_page()
-        passed = await _pass_ozon_challenge(ctx, page, timeout_ms=30000)
-        if passed:
-            await _save_storage_state(ctx)
-    except Exception as exc:
-        logger.debug("Warmup challenge failed: %s", exc)
-    finally:
-        if page:
-            with contextlib.suppress(Exception):
-                await page.close()
+    with _stage("warmup_challenge"):
+        try:
+            page = await ctx.new_page()
+            passed = await _pass_ozon_challenge(ctx, page, timeout_ms=30000)
+            if passed:
+                await _save_storage_state(ctx)
+        except Exception as exc:
+            logger.debug("Warmup challenge failed: %s", exc)
+        finally:
+            if page:
+                with contextlib.suppress(Exception):
+                    await page.close()
+    ozon_challenge_refresh_total.labels("passed" if passed else "failed").inc()
     return passed
 
 
 async def fetch_product_info(url: str, *, retries: int = 2) -> OzonProductInfo:
-    if not re.search(r"^https?://(www\.)?ozon\.[^/]+/", url, re.IGNORECASE):
+    if marketplace_of(url) != "ozon":
         logger.warning("Invalid Ozon URL: %s", url[:100])
         raise ValueError("Not an Ozon product URL")
 
@@ -276,7 +345,9 @@ async def fetch_product_info(url: str, *, retries: int = 2) -> OzonProductInfo:
                 e,
             )
             if attempt < retries:
-                await asyncio.sleep(1.2)
+                ozon_retries_total.labels("fetch", type(e).__name__).inc()
+                with _stage("backoff_sleep"):
+                    await asyncio.sleep(1.2)
     logger.error("All fetch attempts failed for URL: %s", url[:100])
     raise OzonBlockedError()
 
@@ -408,6 +479,64 @@ def _pick_prices(data: dict) -> tuple[Decimal | None, Decimal | None]:
     return with_card, no_card
 
 
+ParsedComposer = tuple[str | None, Decimal | None, Decimal | None]
+
+
+def _parse_composer(body: bytes) -> ParsedComposer:
+    data = json.loads(body)
+    with_card, no_card = _pick_prices(data)
+    return _pick_title(data), with_card, no_card
+
+
+def _parse_composer_timed(body: bytes) -> tuple[ParsedComposer, float, float]:
+    # time.monotonic is system-wide, so the parent can compare it with its own clock.
+    started = time.monotonic()
+    result = _parse_composer(body)
+    return result, started, time.monotonic() - started
+
+
+async def _parse_payload(body: bytes) -> ParsedComposer:
+    executor = _ParsePool.executor
+    if executor is None or len(body) < _ParsePool.min_bytes:
+        started = perf_counter()
+        result = _parse_composer(body)
+        ozon_parse_duration_seconds.labels("inline").observe(perf_counter() - started)
+        return result
+
+    submitted = time.monotonic()
+    try:
+        result, started_at, elapsed = await asyncio.get_running_loop().run_in_executor(
+            executor, _parse_composer_timed, body
+        )
+    except BrokenProcessPool:
+        # A worker died (OOM on a huge payload, killed); the executor never recovers.
+        logger.warning("Parse process pool broke, restarting it and parsing this payload inline")
+        if _ParsePool.executor is executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+            _ParsePool.start()
+        started = perf_counter()
+        result = _parse_composer(body)
+        ozon_parse_duration_seconds.labels("inline").observe(perf_counter() - started)
+        return result
+    ozon_parse_queue_wait_seconds.observe(max(started_at - submitted, 0.0))
+    ozon_parse_duration_seconds.labels("process").observe(elapsed)
+    return result
+
+
+_NEXT_TOKEN = re.compile(rb"\s*(\S)")
+
+
+def _is_composer_payload(body: bytes | None) -> bool:
+    """Cheap check that rejects anti-bot HTML and empty objects without decoding the JSON."""
+    if not body:
+        return False
+    first = _NEXT_TOKEN.match(body)
+    if first is None or first.group(1) != b"{":
+        return False
+    second = _NEXT_TOKEN.match(body, first.end())
+    return second is not None and second.group(1) != b"}"
+
+
 async def fetch_product_info_via_api(url: str) -> OzonProductInfo:
     normalized_url = _to_www(url)
     ctx = await _ensure_browser_context()
@@ -422,23 +551,33 @@ async def fetch_product_info_via_api(url: str) -> OzonProductInfo:
         if not warmed:
             logger.warning("Anti-bot warmup failed, continuing without cached cookies")
 
-    data = await _fetch_with_composer(ctx, normalized_url)
-    if not data:
+    body = await _fetch_with_composer(ctx, normalized_url)
+    if not body:
         logger.info("Composer empty for %s, forcing challenge refresh", url[:80])
         refreshed = await _warmup_challenge(ctx)
         if refreshed:
-            data = await _fetch_with_composer(ctx, normalized_url)
-        if not data:
+            body = await _fetch_with_composer(ctx, normalized_url)
+        if not body:
             logger.error("Composer API returned empty payload for URL: %s", url[:100])
             raise OzonBlockedError("ozon_composer_empty")
 
-    title = _pick_title(data)
+    with _stage("parse"):
+        try:
+            title, with_card, no_card = await _parse_payload(body)
+        except ValueError:
+            # Usually a truncated response: fetch once more, and if that is broken too
+            # the error propagates and fetch_product_info retries it like any other.
+            logger.warning("Composer API returned invalid JSON for URL: %s", url[:100])
+            ozon_retries_total.labels("composer", "invalid_json").inc()
+            body = await _fetch_with_composer(ctx, normalized_url)
+            if not body:
+                raise OzonBlockedError("ozon_composer_empty") from None
+            title, with_card, no_card = await _parse_payload(body)
+
     if not title:
         logger.warning("Could not extract title from Ozon API for URL: %s", url[:100])
         title = "Ozon item"
 
-    with_card, no_card = _pick_prices(data)
-
     if not with_card and not no_card:
         logger.warning(
             "Could not extract any prices from Ozon API for URL: %s | Title: %s",
@@ -449,31 +588,33 @@ async def fetch_product_info_via_api(url: str) -> OzonProductInfo:
     return OzonProductInfo(title=title, price_with_card=with_card, price_no_card=no_card)
 
 
-async def _fetch_with_composer(ctx: BrowserContext, url: str, attempts: int = 3) -> dict | None:
+async def _fetch_with_composer(ctx: BrowserContext, url: str, attempts: int = 3) -> bytes | None:
     relative = _relative_url_path(url)
     q = quote(relative, safe="/:?=&%")
-    api_url = f"https://www.ozon.ru/api/composer-api.bx/page/json/v2?url={q}"
+    api_url = f"{_Endpoints.base_url}/api/composer-api.bx/page/json/v2?url={q}"
     headers = {
         "Accept": "application/json",
-        "Referer": "https://www.ozon.ru/",
+        "Referer": f"{_Endpoints.base_url}/",
         "X-O3-App-Name": "dweb_client",
         "X-O3-App-Version": "1.0.0",
     }
 
     delay = 1.0
     for attempt in range(1, attempts + 1):
-        try:
-            resp = await ctx.request.get(api_url, headers=headers)
-        except Exception as exc:
-            logger.warning("Composer request failed (%s/%s): %s", attempt, attempts, exc)
-            resp = None
-
-        if resp and getattr(resp, "ok", False):
-            with contextlib.suppress(Exception):
-                data = await resp.json()
-                if data:
-                    logger.debug("Composer API succeeded on attempt %s", attempt)
-                    return data
+        body = None
+        with _stage("composer_attempt"):
+            try:
+                resp = await ctx.request.get(api_url, headers=headers)
+            except Exception as exc:
+                logger.warning("Composer request failed (%s/%s): %s", attempt, attempts, exc)
+                resp = None
+
+            if resp and getattr(resp, "ok", False):
+                with contextlib.suppress(Exception):
+                    body = await resp.body()
+        if _is_composer_payload(body):
+            logger.debug("Composer API succeeded on attempt %s", attempt)
+            return body
 
         status = getattr(resp, "status", None) if resp else None
         retry_after = 0.0
@@ -490,7 +631,13 @@ async def _fetch_with_composer(ctx: BrowserContext, url: str, attempts: int = 3)
                 sleep_for,
                 status,
             )
-            await asyncio.sleep(sleep_for)
+            if resp and getattr(resp, "ok", False):
+                reason = "empty"
+            else:
+                reason = str(status) if status else "error"
+            ozon_retries_total.labels("composer", reason).inc()
+            with _stage("backoff_sleep"):
+                await asyncio.sleep(sleep_for)
             delay = min(delay * 2, 10.0)
 
     return None
@@ -506,7 +653,8 @@ def _relative_url_path(url: str) -> str:
 
 async def _ensure_browser_context() -> BrowserContext | None:
     try:
-        await _Browser.ensure_started()
+        with _stage("ensure_started"):
+            await _Browser.ensure_started()
     except Exception as exc:
         logger.warning("Browser startup failed, reason: %s", exc)
         return None
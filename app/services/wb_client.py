@@ -7,8 +7,21 @@ from decimal import Decimal
 
 import aiohttp
 
+from app.utils.tracing import span
+from app.utils.validators import is_wb_product_url
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_API_BASE_URL = "https://card.wb.ru"
+
+
+class _Endpoints:
+    api_base_url = DEFAULT_API_BASE_URL
+
+
+def configure_api_base_url(url: str) -> None:
+    _Endpoints.api_base_url = url.rstrip("/")
+
 
 class WBBlockedError(RuntimeError):
     """Raised when Wildberries blocks the request"""
@@ -36,13 +49,47 @@ def _extract_product_id(url: str) -> int | None:
 
 def _get_api_url(product_id: int) -> str:
     return (
-        f"https://card.wb.ru/cards/v2/detail"
+        f"{_Endpoints.api_base_url}/cards/v2/detail"
         f"?appType=1&curr=rub&dest=-1257786&spp=30&nm={product_id}"
     )
 
 
+def _parse_product(data: dict) -> WBProductInfo:
+    products = data.get("data", {}).get("products", [])
+    if not products:
+        raise WBBlockedError("No product data in API response")
+
+    product = products[0]
+
+    title = product.get("name", "Wildberries item")
+    logger.info("Found WB product: %s", title[:50])
+
+    price_with_card = None
+    price_no_card = None
+
+    sizes = product.get("sizes", [])
+    if sizes and "price" in sizes[0]:
+        price_info = sizes[0]["price"]
+
+        total_price = price_info.get("total")
+        product_price = price_info.get("product")
+
+        if total_price:
+            price_with_card = Decimal(str(total_price)) / 100
+        if product_price:
+            price_no_card = Decimal(str(product_price)) / 100
+
+    logger.info("WB prices - with card: %s, no card: %s", price_with_card, price_no_card)
+
+    return WBProductInfo(
+        title=title,
+        price_with_card=price_with_card,
+        price_no_card=price_no_card,
+    )
+
+
 async def fetch_product_info(url: str, *, timeout: int = 10) -> WBProductInfo:
-    if not re.search(r"wildberries\.ru/catalog/\d+", url, re.IGNORECASE):
+    if not is_wb_product_url(url):
         logger.warning("Invalid Wildberries URL: %s", url[:100])
         raise ValueError("Not a Wildberries product URL")
 
@@ -64,47 +111,19 @@ async def fetch_product_info(url: str, *, timeout: int = 10) -> WBProductInfo:
     }
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                api_url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)
-            ) as response:
-                if response.status != 200:
-                    logger.error("WB API returned status %d", response.status)
-                    raise WBBlockedError(f"WB API returned status {response.status}")
-
-                data = await response.json()
-
-        products = data.get("data", {}).get("products", [])
-        if not products:
-            raise WBBlockedError("No product data in API response")
-
-        product = products[0]
-
-        title = product.get("name", "Wildberries item")
-        logger.info("Found WB product: %s", title[:50])
-
-        price_with_card = None
-        price_no_card = None
-
-        sizes = product.get("sizes", [])
-        if sizes and "price" in sizes[0]:
-            price_info = sizes[0]["price"]
-
-            total_price = price_info.get("total")
-            product_price = price_info.get("product")
-
-            if total_price:
-                price_with_card = Decimal(str(total_price)) / 100
-            if product_price:
-                price_no_card = Decimal(str(product_price)) / 100
-
-        logger.info("WB prices - with card: %s, no card: %s", price_with_card, price_no_card)
-
-        result = WBProductInfo(
-            title=title,
-            price_with_card=price_with_card,
-            price_no_card=price_no_card,
-        )
+        with span("wb.request"):
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    api_url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as response:
+                    if response.status != 200:
+                        logger.error("WB API returned status %d", response.status)
+                        raise WBBlockedError(f"WB API returned status {response.status}")
+
+                    data = await response.json()
+
+        with span("wb.parse"):
+            result = _parse_product(data)
 
         logger.info(
             "WB product fetched | ID: %d | Title: %s | With card: %s | No card: %s",
@@ -0,0 +1,185 @@
+"""Supervisor mode: one front process receives updates, N worker processes handle them.
+
+The front runs polling or the webhook like a single-process bot, but its dispatcher
+only forwards each raw update to the worker owning ``chat_id % N``. A chat therefore
+always lands on the same worker, which keeps its dialog state local; the worker
+then handles one chat's updates in order while different chats run concurrently.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import multiprocessing
+import queue
+from collections import deque
+from collections.abc import Awaitable, Callable
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import Queue
+from typing import Any
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.types import TelegramObject, Update
+
+from app.metrics import supervisor_updates_forwarded_total, supervisor_worker_restarts_total
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL_SECONDS = 5.0
+STOP_TIMEOUT_SECONDS = 30.0
+
+# Queues carry raw update JSON; None asks the worker to stop.
+WorkerTarget = Callable[[int, int, "Queue[str | None]"], None]
+
+
+def chat_id_of(update: Update) -> int:
+    event = update.event
+    chat = getattr(event, "chat", None)
+    if chat is None:
+        chat = getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return int(chat.id)
+    user = getattr(event, "from_user", None)
+    return int(user.id) if user is not None else update.update_id
+
+
+class ShardForwarder(BaseMiddleware):
+    """Outer ``update`` middleware of the front dispatcher; never calls the handler."""
+
+    def __init__(self, queues: list[Queue[str | None]]) -> None:
+        self.queues = queues
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> None:
+        assert isinstance(event, Update)
+        shard = chat_id_of(event) % len(self.queues)
+        self.queues[shard].put(event.model_dump_json(by_alias=True, exclude_unset=True))
+        supervisor_updates_forwarded_total.labels(str(shard)).inc()
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        target: WorkerTarget,
+        workers: int,
+        *,
+        check_interval: float = CHECK_INTERVAL_SECONDS,
+    ) -> None:
+        # Spawned, not forked: the front already runs an event loop and aiohttp.
+        self._ctx = multiprocessing.get_context("spawn")
+        self.target = target
+        self.check_interval = check_interval
+        self.queues: list[Queue[str | None]] = [self._ctx.Queue() for _ in range(workers)]
+        self._processes: list[BaseProcess | None] = [None] * workers
+        self._monitor: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        for shard in range(len(self.queues)):
+            self._spawn(shard)
+        if self._monitor is None:
+            self._monitor = asyncio.create_task(self._watch(), name="worker-pool-monitor")
+
+    async def stop(self, timeout: float = STOP_TIMEOUT_SECONDS) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._monitor
+            self._monitor = None
+
+        for q in self.queues:
+            q.put(None)
+        loop = asyncio.get_running_loop()
+        for process in self._processes:
+            if process is None:
+                continue
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.warning(
+                    "Worker %s did not stop in %.0fs, terminating", process.name, timeout
+                )
+                process.terminate()
+        self._processes = [None] * len(self.queues)
+
+    def _spawn(self, shard: int) -> None:
+        process = self._ctx.Process(
+            target=self.target,
+            args=(shard, len(self.queues), self.queues[shard]),
+            name=f"bot-worker-{shard}",
+        )
+        process.start()
+        self._processes[shard] = process
+        logger.info("Started %s (pid %s)", process.name, process.pid)
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for shard, process in enumerate(self._processes):
+                if process is not None and not process.is_alive():
+                    logger.error(
+                        "%s exited with code %s, restarting", process.name, process.exitcode
+                    )
+                    supervisor_worker_restarts_total.labels(str(shard)).inc()
+                    self._spawn(shard)
+
+
+async def _feed_chat(
+    dispatcher: Dispatcher, bot: Bot, chats: dict[int, deque[Update]], chat_id: int
+) -> None:
+    pending = chats[chat_id]
+    while pending:
+        update = pending.popleft()
+        try:
+            await dispatcher.feed_update(bot, update)
+        except Exception:
+            logger.exception("Failed to handle forwarded update %s", update.update_id)
+    del chats[chat_id]
+
+
+async def consume_updates(
+    updates: Queue[str | None],
+    dispatcher: Dispatcher,
+    bot: Bot,
+    *,
+    poll_interval: float = 1.0,
+) -> None:
+    """Feed forwarded updates to `dispatcher` until the stop sentinel or the front dies.
+
+    Each chat with pending updates gets one task that feeds them in arrival order,
+    so a handler never overtakes an earlier update from the same chat.
+    """
+    loop = asyncio.get_running_loop()
+    parent = multiprocessing.parent_process()
+    chats: dict[int, deque[Update]] = {}
+    tasks: set[asyncio.Task[None]] = set()
+    while True:
+        try:
+            raw = await loop.run_in_executor(None, updates.get, True, poll_interval)
+        except queue.Empty:
+            if parent is not None and not parent.is_alive():
+                logger.warning("Front process is gone, stopping worker")
+                break
+            continue
+        if raw is None:
+            break
+        try:
+            update = Update.model_validate(json.loads(raw), context={"bot": bot})
+        except Exception:
+            logger.exception("Failed to parse forwarded update")
+            continue
+        chat_id = chat_id_of(update)
+        pending = chats.get(chat_id)
+        if pending is not None:
+            pending.append(update)
+            continue
+        chats[chat_id] = deque([update])
+        task = asyncio.create_task(_feed_chat(dispatcher, bot, chats, chat_id))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
@@ -0,0 +1,52 @@
+"""Per-handler latency split into database and Telegram API time.
+
+`measure_handler` opens a timer in a context variable for the duration of a handler;
+the engine hooks in `app.db.instrumentation` and `TelegramTimingMiddleware` add their
+elapsed time to whichever timer is current.
+"""
+
+from __future__ import annotations
+
+import contextlib
+from collections.abc import Iterator
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+
+from app.metrics import handler_duration_seconds
+
+
+@dataclass
+class HandlerTimer:
+    db: float = 0.0
+    telegram: float = 0.0
+
+
+_current: ContextVar[HandlerTimer | None] = ContextVar("handler_timer", default=None)
+
+
+def add_db_time(seconds: float) -> None:
+    timer = _current.get()
+    if timer is not None:
+        timer.db += seconds
+
+
+def add_telegram_time(seconds: float) -> None:
+    timer = _current.get()
+    if timer is not None:
+        timer.telegram += seconds
+
+
+@contextlib.contextmanager
+def measure_handler(action: str) -> Iterator[HandlerTimer]:
+    timer = HandlerTimer()
+    token = _current.set(timer)
+    started = perf_counter()
+    try:
+        yield timer
+    finally:
+        total = perf_counter() - started
+        _current.reset(token)
+        handler_duration_seconds.labels(action, "total").observe(total)
+        handler_duration_seconds.labels(action, "db").observe(timer.db)
+        handler_duration_seconds.labels(action, "telegram").observe(timer.telegram)
@@ -6,6 +6,8 @@ from functools import wraps
 from typing import TYPE_CHECKING, Any, TypeVar
 
 from app.metrics import bot_errors_total, bot_updates_total, notifications_sent_total
+from app.utils.handler_timing import measure_handler
+from app.utils.tracing import span
 
 if TYPE_CHECKING:
     from aiogram.types import CallbackQuery, Message, User
@@ -43,7 +45,17 @@ def log_message_handler(action_name: str) -> Callable[[F], F]:
                     (message.text or "")[:100],
                 )
                 bot_updates_total.labels("message").inc()
-            return await func(message, *args, **kwargs)
+            with (
+                measure_handler(action_name),
+                span(
+                    f"handler.{action_name}",
+                    {
+                        "handler.kind": "message",
+                        "telegram.user_id": from_user.id if from_user else None,
+                    },
+                ),
+            ):
+                return await func(message, *args, **kwargs)
 
         return wrapper  # type: ignore
 
@@ -63,7 +75,14 @@ def log_callback_handler(action_name: str) -> Callable[[F], F]:
                 callback_data,
             )
             bot_updates_total.labels("callback").inc()
-            return await func(cb, *args, **kwargs)
+            with (
+                measure_handler(action_name),
+                span(
+                    f"handler.{action_name}",
+                    {"handler.kind": "callback", "telegram.user_id": from_user.id},
+                ),
+            ):
+                return await func(cb, *args, **kwargs)
 
         return wrapper  # type: ignore
 
@@ -0,0 +1,90 @@
+"""Optional OpenTelemetry tracing.
+
+Spans are only recorded after `setup_tracing` succeeds, which needs the
+``tracing`` extra (``opentelemetry-sdk`` and ``opentelemetry-exporter-otlp-proto-http``).
+Without them, or with tracing disabled, `span` and friends are no-ops.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import inspect
+import logging
+from collections.abc import Callable, Iterator, Mapping
+from functools import wraps
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+C = TypeVar("C", bound=type)
+
+AttrValue = str | bool | int | float
+
+
+class _Tracing:
+    tracer: Any = None
+    provider: Any = None
+
+
+def setup_tracing(service_name: str = "marketplace-bot") -> bool:
+    """Export spans over OTLP/HTTP; endpoint and headers come from the standard OTEL_* env vars."""
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning(
+            "TRACING_ENABLED is set but OpenTelemetry is not installed; "
+            "install the tracing extra (uv sync --extra tracing)"
+        )
+        return False
+
+    provider = TracerProvider(resource=Resource.create({SERVICE_NAME: service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _Tracing.provider = provider
+    _Tracing.tracer = trace.get_tracer("app")
+    return True
+
+
+def shutdown_tracing() -> None:
+    if _Tracing.provider is not None:
+        _Tracing.provider.shutdown()
+    _Tracing.provider = None
+    _Tracing.tracer = None
+
+
+@contextlib.contextmanager
+def span(name: str, attributes: Mapping[str, AttrValue | None] | None = None) -> Iterator[None]:
+    tracer = _Tracing.tracer
+    if tracer is None:
+        yield
+        return
+    attrs = {k: v for k, v in (attributes or {}).items() if v is not None}
+    with tracer.start_as_current_span(name, attributes=attrs):
+        yield
+
+
+def traced(name: str) -> Callable[[F], F]:
+    def decorator(func: F) -> F:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _Tracing.tracer is None:
+                return await func(*args, **kwargs)
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def traced_methods(cls: C) -> C:
+    """Wrap every public coroutine method of a repository in a ``Class.method`` span."""
+    for attr, value in list(vars(cls).items()):
+        if not attr.startswith("_") and inspect.iscoroutinefunction(value):
+            setattr(cls, attr, traced(f"{cls.__name__}.{attr}")(value))
+    return cls
@@ -2,14 +2,37 @@ from __future__ import annotations
 
 import re
 from decimal import Decimal, InvalidOperation
+from typing import Literal
 
-_OZON_RE = re.compile(r"^https?://(www\.)?ozon\.[^/]+/.+", re.IGNORECASE)
-_WB_RE = re.compile(r"^https?://(www\.)?(wildberries|wb)\.[^/]+/catalog/\d+", re.IGNORECASE)
+_OZON_HOST = r"^https?://(?:www\.)?ozon\.[^/]+"
+_WB_HOST = r"^https?://(?:www\.)?(?:wildberries|wb)\.[^/]+"
 
+_OZON_HOST_RE = re.compile(rf"{_OZON_HOST}(?:/|$)", re.IGNORECASE)
+_WB_HOST_RE = re.compile(rf"{_WB_HOST}(?:/|$)", re.IGNORECASE)
+_OZON_RE = re.compile(rf"{_OZON_HOST}/.+", re.IGNORECASE)
+_WB_RE = re.compile(rf"{_WB_HOST}/catalog/\d+", re.IGNORECASE)
 
-def is_marketplace_url(url: str) -> bool:
+
+def marketplace_of(url: str) -> Literal["ozon", "wildberries"] | None:
+    """Marketplace by host alone; use the `is_*_product_url` checks before fetching."""
     url = url.strip()
-    return bool(_OZON_RE.match(url)) or bool(_WB_RE.match(url))
+    if _OZON_HOST_RE.match(url):
+        return "ozon"
+    if _WB_HOST_RE.match(url):
+        return "wildberries"
+    return None
+
+
+def is_ozon_product_url(url: str) -> bool:
+    return bool(_OZON_RE.match(url.strip()))
+
+
+def is_wb_product_url(url: str) -> bool:
+    return bool(_WB_RE.match(url.strip()))
+
+
+def is_marketplace_url(url: str) -> bool:
+    return is_ozon_product_url(url) or is_wb_product_url(url)
 
 
 def parse_price(text: str) -> Decimal | None:
@@ -0,0 +1,59 @@
+"""Webhook delivery of Telegram updates, served by the same aiohttp app as ``/metrics``.
+
+Telegram POSTs every update to ``WEBHOOK_URL + WEBHOOK_PATH`` with the configured
+secret in ``X-Telegram-Bot-Api-Secret-Token``; requests without it get a 401. Any
+replica behind the Service can take any update, so they are handled in parallel.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import signal
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+_STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+def add_webhook_routes(
+    app: web.Application,
+    dispatcher: Dispatcher,
+    bot: Bot,
+    *,
+    path: str,
+    secret_token: str = "",
+) -> None:
+    SimpleRequestHandler(dispatcher, bot, secret_token=secret_token or None).register(
+        app, path=path
+    )
+    setup_application(app, dispatcher, bot=bot)
+
+
+async def register_webhook(
+    bot: Bot, dispatcher: Dispatcher, *, url: str, secret_token: str = ""
+) -> None:
+    # Pending updates are kept: during a rolling restart other replicas still serve them.
+    await bot.set_webhook(
+        url,
+        secret_token=secret_token or None,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+    )
+
+
+async def wait_for_shutdown() -> None:
+    """Block until SIGINT/SIGTERM, standing in for the signal handling of ``start_polling``."""
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    installed = []
+    for sig in _STOP_SIGNALS:
+        with contextlib.suppress(NotImplementedError, RuntimeError):
+            loop.add_signal_handler(sig, stop.set)
+            installed.append(sig)
+    try:
+        await stop.wait()
+    finally:
+        for sig in installed:
+            loop.remove_signal_handler(sig)
@@ -0,0 +1,72 @@
+"""Scraper worker: ``python -m app.worker``, run next to the bot with SCRAPER_MODE=worker.
+
+It owns the browser and the scheduler, so a slow or crashing scrape never stalls
+update handling. Price alerts go to the notification outbox and interactive
+fetches come in as ``fetch_jobs`` rows; the bot process handles the Telegram side
+of both.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import timedelta
+
+from app import runtime
+from app.config import Settings
+from app.metrics import start_metrics_server
+from app.outbox import OutboxSender
+from app.services.fetch_jobs import FetchJobRunner
+from app.webhook import wait_for_shutdown
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    settings = Settings.from_env()
+    runtime.setup_logging(settings, prefix="scraper | ")
+    runtime.configure_services(settings)
+    runtime.migrate(settings)
+
+    engine, session_maker = runtime.init_db(settings)
+
+    if settings.metrics_enabled:
+        try:
+            await start_metrics_server(
+                settings.metrics_host,
+                settings.metrics_port,
+                profiling_token=settings.profiling_token,
+            )
+        except Exception as exc:
+            logger.warning("Failed to start metrics server: %s", exc)
+
+    loop_monitor = await runtime.start_loop_monitor(settings)
+    scheduler, leader = await runtime.start_scheduler(
+        settings, OutboxSender(session_maker), engine, session_maker
+    )
+    runner = FetchJobRunner(
+        session_maker,
+        concurrency=settings.fetch_workers,
+        max_age=timedelta(seconds=settings.fetch_job_timeout_seconds),
+    )
+    await runner.start()
+
+    logger.info("Scraper worker started")
+    try:
+        await wait_for_shutdown()
+    finally:
+        with suppress(Exception):
+            await runner.stop()
+        await runtime.shutdown(
+            bot=None,
+            scheduler=scheduler,
+            leader=leader,
+            loop_monitor=loop_monitor,
+            engine=engine,
+        )
+
+
+if __name__ == "__main__":
+    with suppress(KeyboardInterrupt):
+        asyncio.run(main())
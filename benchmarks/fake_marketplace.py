@@ -0,0 +1,142 @@
+"""Local stand-in for the Ozon composer API and card.wb.ru.
+
+Serves recorded payloads from ``benchmarks/payloads`` with a deterministic per-product
+price, plus configurable latency, transient errors and sticky blocks.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import random
+import re
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from aiohttp import web
+
+PAYLOADS_DIR = Path(__file__).parent / "payloads"
+
+OZON_COMPOSER_PATH = "/api/composer-api.bx/page/json/v2"
+WB_DETAIL_PATH = "/cards/v2/detail"
+
+_OZON_ID_RE = re.compile(r"(\d+)/?(?:\?|$)")
+
+
+@dataclass(frozen=True)
+class FakeMarketplaceConfig:
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0
+    block_rate: float = 0.0
+    seed: int = 0
+
+
+def product_price(product_id: int) -> int:
+    """Deterministic price in roubles so runs are comparable."""
+    return 500 + (product_id * 7919) % 50_000
+
+
+def _rub(value: int) -> str:
+    return f"{value:,}".replace(",", "\u2009") + "\u00a0₽"
+
+
+def _load(name: str) -> dict[str, Any]:
+    return json.loads((PAYLOADS_DIR / name).read_text(encoding="utf-8"))
+
+
+class FakeMarketplace:
+    def __init__(self, config: FakeMarketplaceConfig | None = None) -> None:
+        self.config = config or FakeMarketplaceConfig()
+        self.requests: Counter[str] = Counter()
+        self._rng = random.Random(self.config.seed)  # noqa: S311
+        self._ozon_template = _load("ozon_composer.json")
+        self._wb_template = _load("wb_card.json")
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(OZON_COMPOSER_PATH, self._ozon_composer)
+        app.router.add_get(WB_DETAIL_PATH, self._wb_detail)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.base_url = f"http://{host}:{self._runner.addresses[0][1]}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def is_blocked(self, key: str) -> bool:
+        """Blocks are sticky per product, like a real anti-bot ban on a listing."""
+        bucket = zlib.crc32(f"{self.config.seed}:{key}".encode()) % 10_000
+        return bucket < self.config.block_rate * 10_000
+
+    async def _delay(self) -> None:
+        cfg = self.config
+        latency = cfg.latency_ms + self._rng.uniform(-cfg.jitter_ms, cfg.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    async def _gate(self, marketplace: str, key: str) -> web.Response | None:
+        await self._delay()
+        if self.is_blocked(f"{marketplace}:{key}"):
+            self.requests[f"{marketplace}:blocked"] += 1
+            return web.Response(status=403, text="Access denied")
+        if self._rng.random() < self.config.error_rate:
+            self.requests[f"{marketplace}:error"] += 1
+            return web.Response(status=500, text="Internal error")
+        self.requests[f"{marketplace}:ok"] += 1
+        return None
+
+    async def _ozon_composer(self, request: web.Request) -> web.Response:
+        url = request.query.get("url", "")
+        match = _OZON_ID_RE.search(url)
+        if not match:
+            return web.json_response({"widgetStates": {}})
+        product_id = int(match.group(1))
+        if (rejected := await self._gate("ozon", str(product_id))) is not None:
+            return rejected
+        return web.json_response(self.ozon_payload(product_id))
+
+    async def _wb_detail(self, request: web.Request) -> web.Response:
+        nm = request.query.get("nm", "")
+        if not nm.isdigit():
+            return web.json_response({"data": {"products": []}})
+        if (rejected := await self._gate("wildberries", nm)) is not None:
+            return rejected
+        return web.json_response(self.wb_payload(int(nm)))
+
+    def ozon_payload(self, product_id: int) -> dict[str, Any]:
+        data = copy.deepcopy(self._ozon_template)
+        states = data["widgetStates"]
+        price = product_price(product_id)
+        for key, state in states.items():
+            if key.startswith("webProductHeading"):
+                state["title"] = f"Ozon product {product_id}"
+            elif key.startswith("webPrice"):
+                state["cardPrice"] = _rub(price)
+                state["price"] = _rub(price + price // 20)
+        # The real API ships every widget state as a JSON-encoded string.
+        data["widgetStates"] = {k: json.dumps(v, ensure_ascii=False) for k, v in states.items()}
+        return data
+
+    def wb_payload(self, product_id: int) -> dict[str, Any]:
+        data = copy.deepcopy(self._wb_template)
+        product = data["data"]["products"][0]
+        price = product_price(product_id)
+        product["id"] = product_id
+        product["name"] = f"WB product {product_id}"
+        product["sizes"][0]["price"].update(product=(price + price // 20) * 100, total=price * 100)
+        return data
@@ -0,0 +1,98 @@
+"""Payload corpus for the parser benchmarks.
+
+``small`` and ``typical`` are the recorded payloads from ``payloads/``. ``huge`` pads the
+typical one with recommendation shelves the way real product pages do (hundreds of widgets,
+price widget near the end), and ``fallback`` has no price widget at all, which forces the
+regex scan over the serialized page.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+from typing import Any
+
+from benchmarks.fake_marketplace import PAYLOADS_DIR
+
+HUGE_SHELVES = 300
+HUGE_SIZES = 60
+
+
+def _load(name: str) -> dict[str, Any]:
+    return json.loads((PAYLOADS_DIR / name).read_text(encoding="utf-8"))
+
+
+def _encoded(data: dict[str, Any]) -> dict[str, Any]:
+    # The composer API ships widget states as JSON strings.
+    data = copy.deepcopy(data)
+    data["widgetStates"] = {
+        k: v if isinstance(v, str) else json.dumps(v, ensure_ascii=False)
+        for k, v in data["widgetStates"].items()
+    }
+    return data
+
+
+def _shelf(index: int) -> dict[str, Any]:
+    return {
+        "title": f"Похожие товары {index}",
+        "items": [
+            {
+                "sku": 1_000_000 + index * 10 + i,
+                "title": f"Рекомендация {index}-{i}",
+                "price": {"price": f"{1000 + i * 37} ₽", "originalPrice": f"{1500 + i * 37} ₽"},
+                "rating": 4.7,
+            }
+            for i in range(8)
+        ],
+    }
+
+
+def ozon_payloads() -> dict[str, dict[str, Any]]:
+    typical = _load("ozon_composer.json")
+
+    huge = copy.deepcopy(typical)
+    states = huge["widgetStates"]
+    price_key = next(k for k in states if k.startswith("webPrice"))
+    price_state = states.pop(price_key)
+    for i in range(HUGE_SHELVES):
+        states[f"skuShelfGoods-{i}-default-1"] = _shelf(i)
+    states[price_key] = price_state
+
+    fallback = copy.deepcopy(typical)
+    fallback["widgetStates"] = {
+        k: v for k, v in fallback["widgetStates"].items() if not k.startswith("webPrice")
+    }
+
+    return {
+        "small": _encoded(_load("ozon_composer_small.json")),
+        "typical": _encoded(typical),
+        "huge": _encoded(huge),
+        "fallback": _encoded(fallback),
+    }
+
+
+def wb_payloads() -> dict[str, dict[str, Any]]:
+    typical = _load("wb_card.json")
+
+    huge = copy.deepcopy(typical)
+    product = huge["data"]["products"][0]
+    size = product["sizes"][0]
+    product["sizes"] = [
+        dict(size, name=str(i), optionId=size["optionId"] + i) for i in range(HUGE_SIZES)
+    ]
+    product["colors"] = [{"name": f"цвет {i}", "id": i} for i in range(HUGE_SIZES)]
+
+    return {
+        "small": _load("wb_card_small.json"),
+        "typical": typical,
+        "huge": huge,
+    }
+
+
+PRICE_STRINGS = [
+    "299 ₽",
+    "42\u2009490\u00a0₽",
+    "1\u202f234\u202f567,89 ₽",
+    "от 12 990 ₽ до 15 990 ₽",
+    "нет в наличии",
+]
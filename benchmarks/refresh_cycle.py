@@ -0,0 +1,300 @@
+"""Full refresh-cycle benchmark against the local fake marketplace.
+
+    python -m benchmarks.refresh_cycle --scenario default
+    python -m benchmarks.refresh_cycle --products 2000 --latency-ms 50 --json out.json
+
+Runs ``refresh_prices_and_notify`` over a seeded SQLite (or ``--database-url``) database
+with the real Ozon/WB clients pointed at ``FakeMarketplace`` through ``configure_endpoints``.
+Ozon requests go through a small aiohttp adapter in place of the Playwright request context,
+so the numbers measure our pipeline rather than Chromium.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import tempfile
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+import aiohttp
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app import metrics, scheduler
+from app.db.models import Base, Product, User
+from app.repositories.products import MAX_PRODUCTS_PER_USER
+from app.services import ozon_client, wb_client
+from app.services.marketplace_client import configure_endpoints
+from benchmarks.fake_marketplace import FakeMarketplace, FakeMarketplaceConfig, product_price
+
+
+@dataclass(frozen=True)
+class Scenario:
+    products: int = 10_000
+    overlap: float = 0.5
+    ozon_share: float = 0.5
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0
+    block_rate: float = 0.05
+    backoff_scale: float = 0.0
+    seed: int = 0
+
+
+SCENARIOS = {
+    "default": Scenario(),
+    "smoke": Scenario(products=200, latency_ms=1.0, jitter_ms=0.0),
+    "flaky": Scenario(products=2_000, error_rate=0.1, block_rate=0.1, backoff_scale=0.1),
+}
+
+
+@dataclass
+class Report:
+    scenario: dict[str, Any]
+    products: int
+    unique_urls: int
+    products_checked: int
+    errors: int
+    notifications: int
+    duration_seconds: float
+    products_per_second: float
+    fetch_p50_ms: float
+    fetch_p99_ms: float
+    db_writes: int
+    upstream_requests: dict[str, int]
+
+
+class _CountingBot:
+    def __init__(self) -> None:
+        self.sent = 0
+
+    async def send_message(self, *args: Any, **kwargs: Any) -> None:
+        self.sent += 1
+
+
+class _AiohttpResponse:
+    def __init__(self, status: int, headers: dict[str, str], body: bytes) -> None:
+        self.status = status
+        self.ok = 200 <= status < 300
+        self.headers = headers
+        self._body = body
+
+    async def json(self) -> Any:
+        return json.loads(self._body)
+
+    async def body(self) -> bytes:
+        return self._body
+
+
+class _AiohttpRequestContext:
+    """Quacks like Playwright's APIRequestContext for `_fetch_with_composer`."""
+
+    def __init__(self, session: aiohttp.ClientSession) -> None:
+        self._session = session
+
+    async def get(self, url: str, headers: dict[str, str] | None = None) -> _AiohttpResponse:
+        async with self._session.get(url, headers=headers) as resp:
+            return _AiohttpResponse(resp.status, dict(resp.headers), await resp.read())
+
+
+class _OzonContext:
+    def __init__(self, request: _AiohttpRequestContext) -> None:
+        self.request = request
+
+
+class _ScaledAsyncio:
+    """Proxy for the `asyncio` module with retry back-off sleeps scaled down."""
+
+    def __init__(self, scale: float) -> None:
+        self._scale = scale
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(asyncio, name)
+
+    async def sleep(self, delay: float, result: Any = None) -> Any:
+        return await asyncio.sleep(delay * self._scale, result)
+
+
+@contextlib.contextmanager
+def _patched(target: Any, name: str, value: Any) -> Iterator[None]:
+    original = getattr(target, name)
+    setattr(target, name, value)
+    try:
+        yield
+    finally:
+        setattr(target, name, original)
+
+
+def _product_url(index: int, ozon_share: float) -> str:
+    product_id = 100_000 + index
+    # 61 is coprime with 100, so any window of URLs gets a representative mix.
+    if (index * 61) % 100 < ozon_share * 100:
+        return f"https://www.ozon.ru/product/bench-item-{product_id}/"
+    return f"https://www.wildberries.ru/catalog/{product_id}/detail.aspx"
+
+
+async def _seed(engine: AsyncEngine, scenario: Scenario) -> int:
+    unique = max(1, round(scenario.products * (1 - scenario.overlap)))
+    users = (scenario.products + MAX_PRODUCTS_PER_USER - 1) // MAX_PRODUCTS_PER_USER
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(User),
+            [{"id": i + 1, "tg_user_id": 10_000_000 + i, "language": "en"} for i in range(users)],
+        )
+        rows = []
+        for i in range(scenario.products):
+            url_index = i % unique
+            price = product_price(100_000 + url_index)
+            rows.append(
+                {
+                    "user_id": i // MAX_PRODUCTS_PER_USER + 1,
+                    "url": _product_url(url_index, scenario.ozon_share),
+                    "title": f"Bench item {url_index}",
+                    # Every tenth product sits just above its target so deals fire.
+                    "target_price": price if i % 10 == 0 else price // 2,
+                    "current_price": price + 100,
+                    "is_active": True,
+                }
+            )
+        await conn.execute(insert(Product), rows)
+    return unique
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(scenario: Scenario, *, database_url: str | None = None) -> Report:
+    fake = FakeMarketplace(
+        FakeMarketplaceConfig(
+            latency_ms=scenario.latency_ms,
+            jitter_ms=scenario.jitter_ms,
+            error_rate=scenario.error_rate,
+            block_rate=scenario.block_rate,
+            seed=scenario.seed,
+        )
+    )
+    base_url = await fake.start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(database_url or f"sqlite+aiosqlite:///{tmp}/bench.sqlite3")
+        writes = 0
+
+        def _count_writes(conn, cursor, statement, parameters, context, executemany):
+            nonlocal writes
+            if statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+                writes += 1
+
+        latencies: list[float] = []
+        real_fetch = scheduler.fetch_product_info
+
+        async def _timed_fetch(url: str) -> Any:
+            started = perf_counter()
+            try:
+                return await real_fetch(url)
+            finally:
+                latencies.append(perf_counter() - started)
+
+        try:
+            configure_endpoints(ozon_base_url=base_url, wb_api_base_url=base_url)
+            unique = await _seed(engine, scenario)
+            session_maker = async_sessionmaker(engine, expire_on_commit=False)
+            bot = _CountingBot()
+            event.listen(engine.sync_engine, "before_cursor_execute", _count_writes)
+
+            async with aiohttp.ClientSession() as http:
+                ctx = _OzonContext(_AiohttpRequestContext(http))
+
+                async def _ctx() -> _OzonContext:
+                    return ctx
+
+                with (
+                    _patched(scheduler, "fetch_product_info", _timed_fetch),
+                    _patched(ozon_client, "_ensure_browser_context", _ctx),
+                    _patched(ozon_client, "asyncio", _ScaledAsyncio(scenario.backoff_scale)),
+                    _patched(ozon_client._Browser, "_skip_challenge", True),
+                ):
+                    checked_before = metrics.total_products_checked._value.get()
+                    errors_before = metrics.total_price_check_errors._value.get()
+                    started = perf_counter()
+                    await scheduler.refresh_prices_and_notify(bot, session_maker)
+                    duration = perf_counter() - started
+        finally:
+            configure_endpoints(
+                ozon_base_url=ozon_client.DEFAULT_BASE_URL,
+                wb_api_base_url=wb_client.DEFAULT_API_BASE_URL,
+            )
+            with contextlib.suppress(Exception):
+                event.remove(engine.sync_engine, "before_cursor_execute", _count_writes)
+            await engine.dispose()
+            await fake.stop()
+
+    checked = int(metrics.total_products_checked._value.get() - checked_before)
+    return Report(
+        scenario=asdict(scenario),
+        products=scenario.products,
+        unique_urls=unique,
+        products_checked=checked,
+        errors=int(metrics.total_price_check_errors._value.get() - errors_before),
+        notifications=bot.sent,
+        duration_seconds=round(duration, 3),
+        products_per_second=round(scenario.products / duration, 2) if duration else 0.0,
+        fetch_p50_ms=round(_percentile(latencies, 0.50) * 1000, 2),
+        fetch_p99_ms=round(_percentile(latencies, 0.99) * 1000, 2),
+        db_writes=writes,
+        upstream_requests=dict(sorted(fake.requests.items())),
+    )
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="default")
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--overlap", type=float, help="share of products sharing a URL")
+    parser.add_argument("--ozon-share", type=float)
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--jitter-ms", type=float)
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--block-rate", type=float)
+    parser.add_argument("--backoff-scale", type=float, help="multiplier for client retry sleeps")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--json", type=Path, help="write the report to this file")
+    parser.add_argument("--log-level", default="CRITICAL", help="app logs are silenced by default")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = _parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+
+    overrides = {
+        field: getattr(args, field)
+        for field in Scenario.__dataclass_fields__
+        if getattr(args, field, None) is not None
+    }
+    scenario = replace(SCENARIOS[args.scenario], **overrides)
+    report = asyncio.run(run(scenario, database_url=args.database_url))
+
+    for key, value in asdict(report).items():
+        if key != "scenario":
+            print(f"{key:>20}: {value}")
+    if args.json:
+        args.json.write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
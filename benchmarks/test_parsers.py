@@ -0,0 +1,33 @@
+"""Parser microbenchmarks, run with ``make bench-parsers`` (needs pytest-benchmark)."""
+
+import pytest
+
+from app.services import ozon_client, wb_client
+from benchmarks.parser_corpus import PRICE_STRINGS, ozon_payloads, wb_payloads
+
+OZON = ozon_payloads()
+WB = wb_payloads()
+
+
+@pytest.mark.parametrize("name", sorted(OZON))
+def test_ozon_pick_prices(benchmark, name):
+    with_card, no_card = benchmark(ozon_client._pick_prices, OZON[name])
+    assert with_card or no_card
+
+
+@pytest.mark.parametrize("name", sorted(OZON))
+def test_ozon_pick_title(benchmark, name):
+    assert benchmark(ozon_client._pick_title, OZON[name])
+
+
+@pytest.mark.parametrize("name", sorted(WB))
+def test_wb_parse_product(benchmark, name):
+    info = benchmark(wb_client._parse_product, WB[name])
+    assert info.price_for_compare is not None
+
+
+def test_normalize_price(benchmark):
+    def _run():
+        return [ozon_client._normalize_price(s) for s in PRICE_STRINGS]
+
+    assert benchmark(_run)[1] == 42490
@@ -0,0 +1,112 @@
+"""Per-call cost of the repository hot statements, run with ``make bench-statements``.
+
+Each query runs twice: ``inline`` builds the statement on every call, as the
+repositories did before, and ``prebuilt`` executes the module-level statement the
+repositories use now. Both run on an in-memory SQLite database through a plain ORM
+session, so the figures are dominated by SQLAlchemy's own per-call work: statement
+construction, cache key generation and the compiled-cache lookup.
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.db.models import Base, PriceHistory, Product, User
+from app.repositories import products, users
+
+VARIANTS = ("inline", "prebuilt")
+
+
+@pytest.fixture(scope="module")
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as s:
+        s.execute(insert(User), [{"id": 1, "tg_user_id": 1000}])
+        s.execute(
+            insert(Product),
+            [{"id": 1, "user_id": 1, "url": "u", "title": "t", "target_price": 100}],
+        )
+        s.execute(insert(PriceHistory), [{"product_id": 1, "price": 90, "source": "add"}])
+        s.commit()
+        yield s
+    engine.dispose()
+
+
+def _get_by_id(s, variant):
+    if variant == "inline":
+        return s.execute(select(Product).where(Product.id == 1)).scalar_one()
+    return s.execute(products._GET_BY_ID, {"product_id": 1}).scalar_one()
+
+
+def _get_latest_price(s, variant):
+    if variant == "inline":
+        stmt = (
+            select(PriceHistory.price, PriceHistory.observed_at)
+            .where(PriceHistory.product_id == 1)
+            .order_by(PriceHistory.observed_at.desc(), PriceHistory.id.desc())
+            .limit(1)
+        )
+        return s.execute(stmt).first()
+    return s.execute(products._GET_LATEST_PRICE, {"product_id": 1}).first()
+
+
+def _count_by_user(s, variant):
+    if variant == "inline":
+        stmt = select(func.count()).select_from(Product).where(Product.user_id == 1)
+        return s.execute(stmt).scalar_one()
+    return s.execute(products._COUNT_BY_USER, {"user_id": 1}).scalar_one()
+
+
+def _ensure_user_lookup(s, variant):
+    if variant == "inline":
+        return s.execute(select(User).where(User.tg_user_id == 1000)).scalar_one()
+    return s.execute(users._BY_TG_ID, {"tg_user_id": 1000}).scalar_one()
+
+
+def _update_current_and_history(s, variant):
+    if variant == "inline":
+        s.execute(
+            update(Product)
+            .where(Product.id == 1)
+            .values(current_price=95, updated_at=func.now(), last_checked_at=datetime.now())
+        )
+        s.add(PriceHistory(product_id=1, price=95, source="scheduler"))
+        s.flush()
+    else:
+        s.execute(
+            products._UPDATE_CURRENT_PRICE,
+            {"product_id": 1, "price": 95, "checked_at": datetime.now()},
+        )
+        s.execute(
+            products._INSERT_PRICE_HISTORY, {"product_id": 1, "price": 95, "source": "scheduler"}
+        )
+    # Keep the table small so later rounds measure the same work.
+    s.rollback()
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_get_by_id(benchmark, session, variant):
+    assert benchmark(_get_by_id, session, variant).id == 1
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_get_latest_price(benchmark, session, variant):
+    assert benchmark(_get_latest_price, session, variant) is not None
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_count_by_user(benchmark, session, variant):
+    assert benchmark(_count_by_user, session, variant) == 1
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_ensure_user_lookup(benchmark, session, variant):
+    assert benchmark(_ensure_user_lookup, session, variant).id == 1
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_update_current_and_history(benchmark, session, variant):
+    benchmark(_update_current_and_history, session, variant)
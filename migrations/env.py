@@ -27,7 +27,8 @@ load_dotenv()
 
 
 def _convert_async_dsn_to_sync(dsn: str) -> str:
-    return dsn.replace("+aiosqlite", "").replace("+asyncpg", "")
+    # Alembic runs synchronously: asyncpg has no sync mode, psycopg 3 has both.
+    return dsn.replace("+aiosqlite", "").replace("+asyncpg", "+psycopg")
 
 
 database_url = os.getenv("DATABASE_URL")
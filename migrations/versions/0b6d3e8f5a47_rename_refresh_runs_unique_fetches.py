@@ -0,0 +1,27 @@
+"""rename_refresh_runs_unique_fetches
+
+Revision ID: 0b6d3e8f5a47
+Revises: e2b9d5a7c148
+Create Date: 2026-10-19 18:12:40.318205
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0b6d3e8f5a47"
+down_revision: str | Sequence[str] | None = "e2b9d5a7c148"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column("refresh_runs", "unique_fetches", new_column_name="fetches")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column("refresh_runs", "fetches", new_column_name="unique_fetches")
@@ -0,0 +1,32 @@
+"""add_product_refresh_schedule
+
+Revision ID: 3c5e7a9b1d20
+Revises: 1da9ef061b12
+Create Date: 2026-10-19 10:12:41.208514
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3c5e7a9b1d20"
+down_revision: str | Sequence[str] | None = "1da9ef061b12"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("products", sa.Column("last_checked_at", sa.DateTime(), nullable=True))
+    op.add_column("products", sa.Column("next_check_at", sa.DateTime(), nullable=True))
+    op.create_index("idx_products_next_check", "products", ["next_check_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("idx_products_next_check", table_name="products")
+    op.drop_column("products", "next_check_at")
+    op.drop_column("products", "last_checked_at")
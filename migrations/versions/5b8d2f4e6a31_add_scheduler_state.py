@@ -0,0 +1,34 @@
+"""add_scheduler_state
+
+Revision ID: 5b8d2f4e6a31
+Revises: 3c5e7a9b1d20
+Create Date: 2026-10-19 14:03:27.540918
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5b8d2f4e6a31"
+down_revision: str | Sequence[str] | None = "3c5e7a9b1d20"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "scheduler_state",
+        sa.Column("key", sa.String(length=64), nullable=False),
+        sa.Column("value", sa.Text(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("key"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("scheduler_state")
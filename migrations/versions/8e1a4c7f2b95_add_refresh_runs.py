@@ -0,0 +1,46 @@
+"""add_refresh_runs
+
+Revision ID: 8e1a4c7f2b95
+Revises: 5b8d2f4e6a31
+Create Date: 2026-10-19 16:21:08.113402
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8e1a4c7f2b95"
+down_revision: str | Sequence[str] | None = "5b8d2f4e6a31"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "refresh_runs",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), nullable=False),
+        sa.Column("cycle", sa.String(length=16), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=False),
+        sa.Column("products_checked", sa.Integer(), nullable=False),
+        sa.Column("unique_fetches", sa.Integer(), nullable=False),
+        sa.Column("errors", sa.Integer(), nullable=False),
+        sa.Column("errors_by_type", sa.JSON(), nullable=False),
+        sa.Column("blocks", sa.Integer(), nullable=False),
+        sa.Column("notifications", sa.Integer(), nullable=False),
+        sa.Column("fetch_p50_ms", sa.Float(), nullable=True),
+        sa.Column("fetch_p95_ms", sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_refresh_runs_started", "refresh_runs", ["started_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("idx_refresh_runs_started", table_name="refresh_runs")
+    op.drop_table("refresh_runs")
@@ -0,0 +1,38 @@
+"""add_fsm_states
+
+Revision ID: c4f7a2d91e63
+Revises: 8e1a4c7f2b95
+Create Date: 2026-10-19 19:02:44.518230
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4f7a2d91e63"
+down_revision: str | Sequence[str] | None = "8e1a4c7f2b95"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "fsm_states",
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("state", sa.String(length=255), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index("idx_fsm_states_expires", "fsm_states", ["expires_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("idx_fsm_states_expires", table_name="fsm_states")
+    op.drop_table("fsm_states")
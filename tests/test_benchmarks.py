@@ -0,0 +1,41 @@
+from dataclasses import replace
+
+import pytest
+
+from benchmarks import db_drivers
+from benchmarks.fake_marketplace import FakeMarketplace, FakeMarketplaceConfig
+from benchmarks.refresh_cycle import SCENARIOS, run
+
+
+def test_fake_marketplace_blocks_are_sticky():
+    fake = FakeMarketplace(FakeMarketplaceConfig(block_rate=0.3))
+    blocked = [fake.is_blocked(f"ozon:{i}") for i in range(1000)]
+    assert blocked == [fake.is_blocked(f"ozon:{i}") for i in range(1000)]
+    assert 200 < sum(blocked) < 400
+
+
+@pytest.mark.asyncio
+async def test_refresh_cycle_smoke():
+    scenario = replace(SCENARIOS["smoke"], products=40, block_rate=0.0)
+    report = await run(scenario)
+
+    assert report.unique_urls == 20
+    assert report.products_checked == 40
+    assert report.errors == 0
+    assert report.notifications == 4
+    # Overlapping products are fetched once per tracking user.
+    assert set(report.upstream_requests) == {"ozon:ok", "wildberries:ok"}
+    assert sum(report.upstream_requests.values()) == 40
+    assert report.db_writes > 40
+
+
+@pytest.mark.asyncio
+async def test_db_drivers_smoke():
+    report = await db_drivers.run(
+        db_drivers.Scenario(users=5, products_per_user=3, operations=20, concurrency=2)
+    )
+
+    assert set(report.drivers) == {"aiosqlite"}
+    paths = report.drivers["aiosqlite"]
+    assert set(paths) == set(db_drivers.PATHS)
+    assert all(r.ops_per_second > 0 and r.p99_ms >= r.p50_ms for r in paths.values())
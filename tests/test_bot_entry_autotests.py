@@ -1,9 +1,11 @@
 import asyncio
+from datetime import timedelta
 from typing import Any, cast
 
 import pytest
 
 import app.bot as botmod
+import app.runtime as runtime
 from app.middlewares.db_session import DBSessionMiddleware
 
 
@@ -14,6 +16,7 @@ class _Sentinel:
 class FakeEngine:
     def __init__(self) -> None:
         self.disposed = False
+        self.dialect = type("Dialect", (), {"name": "sqlite"})()
 
     async def dispose(self) -> None:
         self.disposed = True
@@ -48,15 +51,23 @@ class _Pipe:
     def middleware(self, mw) -> None:
         self.middlewares.append(mw)
 
+    def outer_middleware(self, mw) -> None:
+        self.middlewares.append(mw)
+
 
 class FakeDispatcher:
-    def __init__(self, storage=None) -> None:
+    def __init__(self, storage=None, **workflow_data) -> None:
         self.storage = storage
+        self.workflow_data = workflow_data
         self.message = _Pipe()
         self.callback_query = _Pipe()
+        self.update = _Pipe()
         self.included = []
         self.poll_started = False
 
+    def __setitem__(self, key, value) -> None:
+        self.workflow_data[key] = value
+
     def include_router(self, router) -> None:
         self.included.append(router)
 
@@ -68,6 +79,10 @@ class FakeDispatcher:
 class _FakeBotSession:
     def __init__(self) -> None:
         self.closed = False
+        self.middlewares = []
+
+    def middleware(self, mw) -> None:
+        self.middlewares.append(mw)
 
     async def close(self) -> None:
         self.closed = True
@@ -78,9 +93,13 @@ class FakeBot:
         self.token = token
         self.default = default
         self.deleted_webhook = None
+        self.webhook = None
         self.commands_set = None
         self.session = _FakeBotSession()
 
+    async def set_webhook(self, url, **kwargs) -> None:
+        self.webhook = {"url": url, **kwargs}
+
     async def delete_webhook(self, drop_pending_updates=False) -> None:
         self.deleted_webhook = {"drop_pending_updates": drop_pending_updates}
 
@@ -147,12 +166,52 @@ async def test_main_wires_everything_and_cleans_up(monkeypatch):
     class _S:
         bot_token = "TEST:TOKEN"  # noqa: S105
         database_url = "sqlite+aiosqlite:///file.db"
+        database_replica_url = "sqlite+aiosqlite:///replica.db"
         log_level = "INFO"
+        bot_mode = "polling"
+        webhook_url = ""
+        webhook_path = "/telegram/webhook"
+        webhook_secret = ""
+        bot_workers = 1
+        fsm_storage = "sql"
+        fsm_state_ttl_hours = 12
+        fsm_cache_seconds = 1.5
+        scraper_mode = "embedded"
+        fetch_job_timeout_seconds = 120
+        fetch_workers = 2
         price_check_hours = "1,2,3"
+        refresh_mode = "rolling"
+        refresh_batch_size = 5
+        refresh_tick_seconds = 30
+        refresh_interval_minutes = 120
+        refresh_adaptive = True
+        refresh_min_interval_minutes = 30
+        refresh_max_interval_minutes = 600
+        refresh_cycle_budget_minutes = 45
         auto_migrate = True
         metrics_enabled: bool = True
         metrics_host: str = "0.0.0.0"  # noqa: S104
         metrics_port: int = 8000
+        db_metrics_enabled = True
+        db_session_mode = "lazy"
+        db_pool_size = 5
+        db_max_overflow = 7
+        db_pool_recycle_seconds = 1800
+        db_pool_pre_ping = False
+        db_statement_cache_size = 0
+        db_replica_max_lag_seconds = 3.0
+        profiling_token = ""
+        loop_monitor_enabled = True
+        loop_slow_callback_ms = 100
+        parse_workers = 2
+        parse_offload_min_kb = 128
+        leader_election_enabled = True
+        leader_lock_key = 42
+        ozon_base_url = "http://127.0.0.1:8081"
+        wb_api_base_url = "http://127.0.0.1:8082"
+        admin_ids = frozenset({1001})
+        tracing_enabled = False
+        tracing_service_name = "marketplace-bot"
 
     monkeypatch.setattr(botmod.Settings, "from_env", staticmethod(lambda: _S))
 
@@ -160,48 +219,287 @@ async def test_main_wires_everything_and_cleans_up(monkeypatch):
     session = _FakeSession()
     session_maker = make_session_maker(session)
 
-    def _init_engine_and_schema(db_url):
+    def _init_engine_and_schema(
+        db_url, *, db_metrics=False, pool=None, replica_dsn=None, replica_max_lag_seconds=5.0
+    ):
         assert db_url == _S.database_url
+        assert db_metrics is True
+        assert pool == runtime.PoolConfig(
+            size=5, max_overflow=7, recycle_seconds=1800, pre_ping=False, statement_cache_size=0
+        )
+        assert (replica_dsn, replica_max_lag_seconds) == (_S.database_replica_url, 3.0)
         return engine, session_maker
 
-    monkeypatch.setattr(botmod, "init_engine_and_schema", _init_engine_and_schema)
+    monkeypatch.setattr(runtime, "init_engine_and_schema", _init_engine_and_schema)
 
     monkeypatch.setattr(botmod, "Bot", FakeBot)
     monkeypatch.setattr(botmod, "Dispatcher", FakeDispatcher)
 
     scheduler = FakeScheduler()
 
-    def _setup_scheduler(bot, price_check_hours, session_maker_arg):
+    def _setup_scheduler(
+        bot, price_check_hours, session_maker_arg, *, leader=None, rolling=None, cycle_budget=None
+    ):
         assert bot.token == _S.bot_token
         assert session_maker_arg is session_maker
         assert price_check_hours == _S.price_check_hours
+        assert leader is not None and leader.is_leader
+        assert rolling is not None and rolling.batch_size == 5 and rolling.tick_seconds == 30
+        assert cycle_budget == timedelta(minutes=45)
         return scheduler
 
-    monkeypatch.setattr(botmod, "setup_scheduler", _setup_scheduler)
+    monkeypatch.setattr(runtime, "setup_scheduler", _setup_scheduler)
 
     called = {"shutdown_browser": 0}
 
     async def _shutdown_browser() -> None:
         called["shutdown_browser"] += 1
 
-    monkeypatch.setattr(botmod, "shutdown_browser", _shutdown_browser)
+    monkeypatch.setattr(runtime, "shutdown_browser", _shutdown_browser)
+
+    endpoints = {}
+    monkeypatch.setattr(runtime, "configure_endpoints", lambda **kw: endpoints.update(kw))
+    parse_pool = {}
+    monkeypatch.setattr(
+        runtime,
+        "configure_parse_executor",
+        lambda workers, **kw: parse_pool.update(workers=workers, **kw),
+    )
 
     included = []
 
     orig_include_router = FakeDispatcher.include_router
 
+    dispatchers = []
+
     def _spy_include_router(self, router):
         included.append(router)
+        dispatchers.append(self)
         return orig_include_router(self, router)
 
     monkeypatch.setattr(FakeDispatcher, "include_router", _spy_include_router, raising=False)
 
+    fetch_pools = []
+    monkeypatch.setattr(runtime, "configure_fetch_queue", fetch_pools.append)
+
+    async def _shutdown_fetch_queue() -> None:
+        fetch_pools.append("closed")
+
+    monkeypatch.setattr(runtime, "shutdown_fetch_queue", _shutdown_fetch_queue)
+
     await botmod.main()
 
-    assert len(included) == 4
+    assert fetch_pools == [2, "closed"]
+    dbmw = dispatchers[0].message.middlewares[1]
+    assert isinstance(dbmw, botmod.DBSessionMiddleware) and dbmw.lazy is True
+    assert len(included) == 5
+    assert dispatchers[0].workflow_data == {"admin_ids": frozenset({1001})}
+    storage = dispatchers[0].storage
+    assert isinstance(storage, botmod.SQLStorage)
+    assert storage.session_maker is session_maker
+    assert storage.state_ttl == timedelta(hours=12) and storage.cache_seconds == 1.5
 
     FakeDispatcher()
 
     assert scheduler.shutdown_called is True and scheduler.kwargs == {"wait": False}
     assert called["shutdown_browser"] == 1
+    assert endpoints == {
+        "ozon_base_url": "http://127.0.0.1:8081",
+        "wb_api_base_url": "http://127.0.0.1:8082",
+    }
+    assert parse_pool == {"workers": 2, "min_bytes": 128 * 1024}
     assert engine.disposed is True
+
+
+@pytest.mark.asyncio
+async def test_main_webhook_mode_serves_updates_on_http_server(monkeypatch):
+    settings = botmod.Settings(
+        bot_token="TEST:TOKEN",  # noqa: S106
+        database_url="sqlite+aiosqlite:///file.db",
+        bot_mode="webhook",
+        webhook_url="https://bot.example",
+        webhook_path="/tg",
+        webhook_secret="s3cret",  # noqa: S106
+        auto_migrate=False,
+        metrics_enabled=False,
+        loop_monitor_enabled=False,
+        leader_election_enabled=False,
+        fsm_storage="memory",
+    )
+    monkeypatch.setattr(botmod.Settings, "from_env", staticmethod(lambda: settings))
+
+    engine = FakeEngine()
+    monkeypatch.setattr(
+        runtime,
+        "init_engine_and_schema",
+        lambda db_url, **kw: (engine, make_session_maker(_FakeSession())),
+    )
+    monkeypatch.setattr(botmod, "Bot", FakeBot)
+    monkeypatch.setattr(botmod, "Dispatcher", FakeDispatcher)
+    scheduler = FakeScheduler()
+    monkeypatch.setattr(runtime, "setup_scheduler", lambda *a, **kw: scheduler)
+
+    async def _noop() -> None:
+        pass
+
+    monkeypatch.setattr(runtime, "shutdown_browser", _noop)
+    monkeypatch.setattr(runtime, "stop_metrics_server", _noop)
+    monkeypatch.setattr(botmod, "wait_for_shutdown", _noop)
+
+    server = {}
+
+    async def _start_server(host, port, **kwargs) -> None:
+        server.update(host=host, port=port, **kwargs)
+
+    monkeypatch.setattr(botmod, "start_metrics_server", _start_server)
+
+    mounted = {}
+    monkeypatch.setattr(botmod, "add_webhook_routes", lambda app, **kw: mounted.update(kw))
+
+    registered = {}
+
+    async def _register(bot, dp, **kwargs) -> None:
+        registered.update(kwargs)
+
+    monkeypatch.setattr(botmod, "register_webhook", _register)
+
+    await botmod.main()
+
+    assert server["expose_metrics"] is False and server["port"] == 8000
+    server["setup_app"](object())
+    assert mounted["path"] == "/tg" and mounted["secret_token"] == "s3cret"  # noqa: S105
+    assert registered == {"url": "https://bot.example/tg", "secret_token": "s3cret"}
+    bot = mounted["bot"]
+    assert bot.deleted_webhook is None
+    assert mounted["dispatcher"].poll_started is False
+    assert isinstance(mounted["dispatcher"].storage, botmod.MemoryStorage)
+    assert scheduler.shutdown_called is True and engine.disposed is True
+
+
+@pytest.mark.asyncio
+async def test_main_supervisor_mode_forwards_to_worker_pool(monkeypatch):
+    settings = botmod.Settings(
+        bot_token="TEST:TOKEN",  # noqa: S106
+        database_url="sqlite+aiosqlite:///file.db",
+        bot_workers=3,
+        auto_migrate=False,
+        metrics_enabled=False,
+    )
+    monkeypatch.setattr(botmod.Settings, "from_env", staticmethod(lambda: settings))
+
+    def _no_engine(*a, **kw):
+        raise AssertionError("the front process must not open the database")
+
+    monkeypatch.setattr(runtime, "init_engine_and_schema", _no_engine)
+    monkeypatch.setattr(botmod, "Bot", FakeBot)
+    monkeypatch.setattr(botmod, "Dispatcher", FakeDispatcher)
+
+    async def _noop() -> None:
+        pass
+
+    monkeypatch.setattr(runtime, "shutdown_browser", _noop)
+
+    pools = []
+
+    class _FakePool:
+        def __init__(self, target, workers) -> None:
+            self.target = target
+            self.queues = [object() for _ in range(workers)]
+            self.started = self.stopped = False
+            pools.append(self)
+
+        def start(self) -> None:
+            self.started = True
+
+        async def stop(self) -> None:
+            self.stopped = True
+
+    monkeypatch.setattr(botmod, "WorkerPool", _FakePool)
+
+    dispatchers = []
+    orig_init = FakeDispatcher.__init__
+
+    def _spy_init(self, *a, **kw):
+        orig_init(self, *a, **kw)
+        dispatchers.append(self)
+
+    monkeypatch.setattr(FakeDispatcher, "__init__", _spy_init)
+
+    await botmod.main()
+
+    (pool,) = pools
+    assert pool.target is botmod.run_worker and len(pool.queues) == 3
+    assert pool.started and pool.stopped
+    (front,) = dispatchers
+    (forwarder,) = front.update.middlewares
+    assert isinstance(forwarder, botmod.ShardForwarder) and forwarder.queues is pool.queues
+    assert front.poll_started is True and len(front.included) == 5
+
+
+@pytest.mark.asyncio
+async def test_main_with_scraper_worker_delivers_outbox_instead_of_scheduling(monkeypatch):
+    settings = botmod.Settings(
+        bot_token="TEST:TOKEN",  # noqa: S106
+        database_url="sqlite+aiosqlite:///file.db",
+        scraper_mode="worker",
+        fetch_job_timeout_seconds=90,
+        parse_workers=2,
+        auto_migrate=False,
+        metrics_enabled=False,
+        loop_monitor_enabled=False,
+        fsm_storage="memory",
+    )
+    monkeypatch.setattr(botmod.Settings, "from_env", staticmethod(lambda: settings))
+
+    engine = FakeEngine()
+    session_maker = make_session_maker(_FakeSession())
+    monkeypatch.setattr(
+        runtime, "init_engine_and_schema", lambda db_url, **kw: (engine, session_maker)
+    )
+    monkeypatch.setattr(botmod, "Bot", FakeBot)
+    monkeypatch.setattr(botmod, "Dispatcher", FakeDispatcher)
+
+    def _no_scheduler(*a, **kw):
+        raise AssertionError("the scraper worker runs the scheduler")
+
+    monkeypatch.setattr(runtime, "setup_scheduler", _no_scheduler)
+
+    def _no_parse_pool(*a, **kw):
+        raise AssertionError("the bot does not parse marketplace pages")
+
+    monkeypatch.setattr(runtime, "configure_parse_executor", _no_parse_pool)
+
+    deliveries = []
+
+    class _FakeDelivery:
+        def __init__(self, bot, session_maker_arg) -> None:
+            assert session_maker_arg is session_maker
+            self.started = self.stopped = False
+            deliveries.append(self)
+
+        async def start(self) -> None:
+            self.started = True
+
+        async def stop(self) -> None:
+            self.stopped = True
+
+    monkeypatch.setattr(botmod, "OutboxDelivery", _FakeDelivery)
+
+    dispatchers = []
+    orig_init = FakeDispatcher.__init__
+
+    def _spy_init(self, *a, **kw):
+        orig_init(self, *a, **kw)
+        dispatchers.append(self)
+
+    monkeypatch.setattr(FakeDispatcher, "__init__", _spy_init)
+
+    await botmod.main()
+
+    (delivery,) = deliveries
+    assert delivery.started and delivery.stopped
+    (dp,) = dispatchers
+    fetch_product = dp.workflow_data["fetch_product"]
+    assert isinstance(fetch_product, botmod.FetchJobClient)
+    assert fetch_product.session_maker is session_maker and fetch_product.timeout == 90
+    assert dp.poll_started is True and engine.disposed is True
@@ -27,3 +27,206 @@ def test_settings_from_env_missing_db(monkeypatch):
     with pytest.raises(RuntimeError) as e:
         Settings.from_env()
     assert "DATABASE_URL is not set" in str(e.value)
+
+
+def test_settings_refresh_mode(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:ABC")
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///file.db")
+    monkeypatch.setenv("REFRESH_MODE", "CRON")
+    monkeypatch.setenv("REFRESH_BATCH_SIZE", "50")
+    s = Settings.from_env()
+    assert s.refresh_mode == "cron"
+    assert s.refresh_batch_size == 50
+
+    monkeypatch.setenv("REFRESH_MODE", "bursty")
+    with pytest.raises(RuntimeError, match="REFRESH_MODE"):
+        Settings.from_env()
+
+
+def test_settings_admin_ids(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:ABC")
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///file.db")
+    monkeypatch.setenv("ADMIN_IDS", "111, 222,")
+    assert Settings.from_env().admin_ids == frozenset({111, 222})
+
+    monkeypatch.delenv("ADMIN_IDS")
+    assert Settings.from_env().admin_ids == frozenset()
+
+
+def test_settings_parse_workers(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:ABC")
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///file.db")
+    monkeypatch.delenv("PARSE_WORKERS", raising=False)
+    assert Settings.from_env().parse_workers == 0
+
+    monkeypatch.setenv("PARSE_WORKERS", "auto")
+    monkeypatch.setattr("os.cpu_count", lambda: 6)
+    assert Settings.from_env().parse_workers == 6
+
+    monkeypatch.setenv("PARSE_WORKERS", "2")
+    monkeypatch.setenv("PARSE_OFFLOAD_MIN_KB", "64")
+    s = Settings.from_env()
+    assert (s.parse_workers, s.parse_offload_min_kb) == (2, 64)
+
+
+def test_settings_bot_mode(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:ABC")
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///file.db")
+    monkeypatch.delenv("BOT_MODE", raising=False)
+    assert Settings.from_env().bot_mode == "polling"
+
+    monkeypatch.setenv("BOT_MODE", "webhook")
+    monkeypatch.delenv("WEBHOOK_URL", raising=False)
+    with pytest.raises(RuntimeError, match="WEBHOOK_URL"):
+        Settings.from_env()
+
+    monkeypatch.setenv("WEBHOOK_URL", "https://bot.example/")
+    monkeypatch.delenv("WEBHOOK_SECRET", raising=False)
+    with pytest.raises(RuntimeError, match="WEBHOOK_SECRET is required"):
+        Settings.from_env()
+
+    monkeypatch.setenv("WEBHOOK_SECRET", "abc_DEF-123")
+    s = Settings.from_env()
+    assert (s.bot_mode, s.webhook_url, s.webhook_path) == (
+        "webhook",
+        "https://bot.example",
+        "/telegram/webhook",
+    )
+    assert s.webhook_secret == "abc_DEF-123"  # noqa: S105
+
+    monkeypatch.setenv("WEBHOOK_SECRET", "has spaces")
+    with pytest.raises(RuntimeError, match="WEBHOOK_SECRET"):
+        Settings.from_env()
+
+    monkeypatch.setenv("BOT_MODE", "push")
+    with pytest.raises(RuntimeError, match="BOT_MODE"):
+        Settings.from_env()
+
+
+def test_settings_fsm_storage(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:ABC")
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///file.db")
+    monkeypatch.delenv("FSM_STORAGE", raising=False)
+    s = Settings.from_env()
+    assert (s.fsm_storage, s.fsm_state_ttl_hours, s.fsm_cache_seconds) == ("sql", 24, 2.0)
+
+    monkeypatch.setenv("FSM_STORAGE", "Memory")
+    assert Settings.from_env().fsm_storage == "memory"
+
+    monkeypatch.setenv("FSM_STORAGE", "redis")
+    with pytest.raises(RuntimeError, match="FSM_STORAGE"):
+        Settings.from_env()
+
+
+def test_settings_scraper_mode(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:ABC")
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///file.db")
+    monkeypatch.delenv("SCRAPER_MODE", raising=False)
+    monkeypatch.delenv("FETCH_JOB_TIMEOUT_SECONDS", raising=False)
+    s = Settings.from_env()
+    assert (s.scraper_mode, s.fetch_job_timeout_seconds) == ("embedded", 120)
+
+    monkeypatch.setenv("SCRAPER_MODE", "Worker")
+    monkeypatch.setenv("FETCH_JOB_TIMEOUT_SECONDS", "60")
+    s = Settings.from_env()
+    assert (s.scraper_mode, s.fetch_job_timeout_seconds) == ("worker", 60)
+
+    monkeypatch.setenv("SCRAPER_MODE", "remote")
+    with pytest.raises(RuntimeError, match="SCRAPER_MODE"):
+        Settings.from_env()
+
+
+def test_settings_fetch_workers(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:ABC")
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///file.db")
+    monkeypatch.delenv("FETCH_WORKERS", raising=False)
+    assert Settings.from_env().fetch_workers == 2
+
+    monkeypatch.setenv("FETCH_WORKERS", "0")
+    assert Settings.from_env().fetch_workers == 0
+
+
+def test_settings_db_session_mode(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:ABC")
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///file.db")
+    monkeypatch.delenv("DB_SESSION_MODE", raising=False)
+    assert Settings.from_env().db_session_mode == "lazy"
+
+    monkeypatch.setenv("DB_SESSION_MODE", "Handler")
+    assert Settings.from_env().db_session_mode == "handler"
+
+    monkeypatch.setenv("DB_SESSION_MODE", "eager")
+    with pytest.raises(RuntimeError, match="DB_SESSION_MODE"):
+        Settings.from_env()
+
+
+def test_settings_db_pool(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:ABC")
+    monkeypatch.setenv("DATABASE_URL", "postgresql+asyncpg://u:p@db/app")
+    for name in (
+        "DB_POOL_SIZE",
+        "DB_MAX_OVERFLOW",
+        "DB_POOL_RECYCLE_SECONDS",
+        "DB_POOL_PRE_PING",
+        "DB_STATEMENT_CACHE_SIZE",
+    ):
+        monkeypatch.delenv(name, raising=False)
+    s = Settings.from_env()
+    assert (
+        s.db_pool_size,
+        s.db_max_overflow,
+        s.db_pool_recycle_seconds,
+        s.db_pool_pre_ping,
+        s.db_statement_cache_size,
+    ) == (10, 20, -1, True, None)
+
+    monkeypatch.setenv("DB_POOL_SIZE", "4")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_RECYCLE_SECONDS", "1800")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    monkeypatch.setenv("DB_STATEMENT_CACHE_SIZE", "0")
+    s = Settings.from_env()
+    assert (
+        s.db_pool_size,
+        s.db_max_overflow,
+        s.db_pool_recycle_seconds,
+        s.db_pool_pre_ping,
+        s.db_statement_cache_size,
+    ) == (4, 0, 1800, False, 0)
+
+
+def test_settings_read_replica(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:ABC")
+    monkeypatch.setenv("DATABASE_URL", "postgresql+psycopg://u:p@db/app")
+    monkeypatch.delenv("DATABASE_REPLICA_URL", raising=False)
+    monkeypatch.delenv("DB_REPLICA_MAX_LAG_SECONDS", raising=False)
+    s = Settings.from_env()
+    assert (s.database_replica_url, s.db_replica_max_lag_seconds) == ("", 5.0)
+
+    monkeypatch.setenv("DATABASE_REPLICA_URL", " postgresql+psycopg://u:p@replica/app ")
+    monkeypatch.setenv("DB_REPLICA_MAX_LAG_SECONDS", "1.5")
+    s = Settings.from_env()
+    assert s.database_replica_url == "postgresql+psycopg://u:p@replica/app"
+    assert s.db_replica_max_lag_seconds == 1.5
+
+
+def test_settings_bot_workers(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:ABC")
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///file.db")
+    monkeypatch.delenv("BOT_WORKERS", raising=False)
+    assert Settings.from_env().bot_workers == 1
+
+    monkeypatch.setenv("BOT_WORKERS", "auto")
+    monkeypatch.setattr("os.cpu_count", lambda: 4)
+    assert Settings.from_env().bot_workers == 4
+
+
+def test_settings_slow_callback_tracking_is_opt_in(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:ABC")
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///file.db")
+    monkeypatch.delenv("LOOP_SLOW_CALLBACK_MS", raising=False)
+    s = Settings.from_env()
+    assert (s.loop_monitor_enabled, s.loop_slow_callback_ms) == (True, 0)
+
+    monkeypatch.setenv("LOOP_SLOW_CALLBACK_MS", "100")
+    assert Settings.from_env().loop_slow_callback_ms == 100
@@ -3,7 +3,7 @@ from pathlib import Path
 import pytest
 from sqlalchemy import func, select, text
 
-from app.db.db import get_session, init_engine_and_schema
+from app.db.db import PoolConfig, _connect_args, get_session, init_engine_and_schema
 from app.db.migrations import run_migrations
 from app.db.models import User
 
@@ -79,3 +79,73 @@ async def test_get_session_returns_distinct_sessions(tmp_path: Path):
     assert first is not second, "ожидали разные объекты сессий из разных вызовов get_session"
 
     await engine.dispose()
+
+
+def test_normalize_statement_strips_literals_and_params():
+    from app.db.instrumentation import fingerprint, normalize_statement
+
+    sql = """SELECT products.id FROM products
+             WHERE products.user_id = %(user_id_1)s AND products.title = 'a''b'
+             AND products.id IN ($1, $2, $3) LIMIT 20"""
+    assert normalize_statement(sql) == (
+        "SELECT products.id FROM products WHERE products.user_id = ? "
+        "AND products.title = ? AND products.id IN (?) LIMIT ?"
+    )
+    assert fingerprint(sql) == fingerprint(sql.replace("20", "50").replace("$3", "$3, $4"))
+    assert fingerprint("UPDATE users SET language=? WHERE users.id = ?")[0] == "update users"
+
+
+@pytest.mark.asyncio
+async def test_db_metrics_record_queries_and_pool(tmp_path: Path):
+    from prometheus_client import REGISTRY
+
+    from app.db.instrumentation import fingerprint
+
+    dsn = f"sqlite+aiosqlite:///{tmp_path / 'db_metrics.sqlite3'}"
+    engine, session_maker = init_engine_and_schema(dsn, db_metrics=True)
+    operation, digest = fingerprint("SELECT 42")
+    labels = {"operation": operation, "fingerprint": digest}
+    before = REGISTRY.get_sample_value("marketplace_bot_db_query_duration_seconds_count", labels)
+    waits = REGISTRY.get_sample_value("marketplace_bot_db_pool_checkout_wait_seconds_count")
+    holds = REGISTRY.get_sample_value("marketplace_bot_db_connection_hold_seconds_count")
+
+    async with session_maker() as s:
+        await s.execute(text("SELECT 42"))
+        assert (
+            REGISTRY.get_sample_value(
+                "marketplace_bot_db_pool_connections", {"state": "checked_out"}
+            )
+            == 1
+        )
+        assert REGISTRY.get_sample_value("marketplace_bot_db_pool_saturation_ratio") == 1 / 30
+
+    after = REGISTRY.get_sample_value("marketplace_bot_db_query_duration_seconds_count", labels)
+    assert after - (before or 0) == 1
+    assert REGISTRY.get_sample_value("marketplace_bot_db_pool_checkout_wait_seconds_count") > (
+        waits or 0
+    )
+    assert REGISTRY.get_sample_value("marketplace_bot_db_connection_hold_seconds_count") > (
+        holds or 0
+    )
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_config_is_applied(tmp_path: Path):
+    dsn = f"sqlite+aiosqlite:///{tmp_path / 'pool.sqlite3'}"
+    engine, _ = init_engine_and_schema(
+        dsn, pool=PoolConfig(size=3, max_overflow=1, recycle_seconds=600, pre_ping=False)
+    )
+    pool = engine.sync_engine.pool
+    assert (pool.size(), pool._max_overflow, pool._recycle, pool._pre_ping) == (3, 1, 600, False)
+    await engine.dispose()
+
+
+def test_statement_cache_maps_to_driver_connect_args():
+    assert _connect_args("asyncpg", None) == {}
+    assert _connect_args("asyncpg", 500) == {"prepared_statement_cache_size": 500}
+    assert _connect_args("asyncpg", 0) == {"prepared_statement_cache_size": 0}
+    assert _connect_args("psycopg", 0) == {"prepare_threshold": None}
+    # A non-zero size for psycopg is applied per connection as prepared_max.
+    assert _connect_args("psycopg", 200) == {}
+    assert _connect_args("aiosqlite", 0) == {}
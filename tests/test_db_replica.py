@@ -0,0 +1,160 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.db.replica as replica_mod
+from app.db.db import init_engine_and_schema
+from app.db.models import Base, PriceHistory, Product, User
+from app.db.replica import on_replica
+from app.middlewares.db_session import DBSessionMiddleware
+from app.repositories.products import ProductsRepo
+
+
+async def _seed(dsn, title):
+    engine = create_async_engine(dsn)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User).values(id=1, tg_user_id=7300))
+        await conn.execute(
+            insert(Product).values(
+                id=1, user_id=1, url="https://ozon.ru/product/1", title=title, target_price=100
+            )
+        )
+        await conn.execute(insert(PriceHistory).values(product_id=1, price=90, source="add"))
+    await engine.dispose()
+
+
+@pytest.fixture
+async def databases(tmp_path):
+    primary = f"sqlite+aiosqlite:///{tmp_path}/primary.db"
+    replica = f"sqlite+aiosqlite:///{tmp_path}/replica.db"
+    await _seed(primary, "primary")
+    await _seed(replica, "replica")
+    engine, maker = init_engine_and_schema(primary, replica_dsn=replica, replica_max_lag_seconds=2)
+    yield maker
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_marked_reads_go_to_the_replica(databases):
+    async with databases() as s:
+        repo = ProductsRepo(s)
+        assert (await repo.get_by_id(1)).title == "replica"
+        items, pages = await repo.list_page(1, 1)
+        assert [p.title for p in items] == ["replica"] and pages == 1
+        assert await repo.get_latest_price(1) is not None
+        assert [p.title async for p in repo.list_all_active()] == ["replica"]
+        # Unmarked statements stay on the primary.
+        assert (await repo.get_by_url(1, "https://ozon.ru/product/1")).title == "primary"
+
+
+@pytest.mark.asyncio
+async def test_session_reads_back_its_own_writes(databases):
+    async with databases() as s:
+        repo = ProductsRepo(s)
+        await repo.update_target_price(1, 50)
+        product = await repo.get_by_id(1)
+        assert (product.title, product.target_price) == ("primary", 50)
+        # price_history was not written, so it may still come from the replica.
+        assert await s.scalar(on_replica(select(PriceHistory.source))) == "add"
+
+    async with databases() as s:
+        assert (await ProductsRepo(s).get_by_id(1)).title == "replica"
+
+
+def _from(tg_user_id):
+    return SimpleNamespace(
+        from_user=SimpleNamespace(
+            id=tg_user_id,
+            username=None,
+            first_name=None,
+            last_name=None,
+            is_bot=False,
+            is_premium=False,
+        )
+    )
+
+
+@pytest.mark.asyncio
+async def test_users_next_updates_read_back_their_writes(databases, monkeypatch):
+    mw = DBSessionMiddleware(databases, lazy=True)
+
+    async def _edit(event, data):
+        await data["products"].update_target_price(1, 50)
+
+    async def _card(event, data):
+        return (await data["products"].get_by_id(1)).title
+
+    await mw(_edit, _from(7301), {})
+    assert await mw(_card, _from(7301), {}) == "primary"
+    assert await mw(_card, _from(7302), {}) == "replica"
+
+    # Once the replica has had max_lag_seconds plus a lag check to catch up.
+    later = replica_mod.monotonic() + 10
+    monkeypatch.setattr(replica_mod, "monotonic", lambda: later)
+    assert await mw(_card, _from(7301), {}) == "replica"
+
+
+@pytest.mark.asyncio
+async def test_open_write_transaction_and_locks_stay_on_the_primary(databases):
+    async with databases() as s:
+        await s.execute(update(User).where(User.id == 1).values(language="en"))
+        assert await s.scalar(on_replica(select(Product.title))) == "primary"
+        await s.rollback()
+
+    async with databases() as s:
+        stmt = on_replica(select(Product.title).with_for_update())
+        assert await s.scalar(stmt) == "primary"
+
+
+@pytest.mark.asyncio
+async def test_lagging_replica_falls_back_to_the_primary(databases, monkeypatch):
+    lag = 10.0
+    probes = 0
+
+    async def _lag(conn):
+        nonlocal probes
+        probes += 1
+        return lag
+
+    monkeypatch.setattr(replica_mod, "replica_lag", _lag)
+    async with databases() as s:
+        router = s.replica
+        assert (await ProductsRepo(s).get_by_id(1)).title == "primary"
+        assert not router.available
+
+        lag = 0.5
+        assert (await ProductsRepo(s).get_by_id(1)).title == "primary"
+        assert probes == 1
+
+        router.check_interval = 0
+        assert (await ProductsRepo(s).get_by_id(1)).title == "replica"
+        assert probes == 2
+
+
+@pytest.mark.asyncio
+async def test_unreachable_replica_falls_back_to_the_primary(tmp_path):
+    primary = f"sqlite+aiosqlite:///{tmp_path}/primary.db"
+    await _seed(primary, "primary")
+    engine, maker = init_engine_and_schema(
+        primary, replica_dsn=f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db"
+    )
+    try:
+        async with maker() as s:
+            assert (await ProductsRepo(s).get_by_id(1)).title == "primary"
+            assert not s.replica.available
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_disposing_the_primary_disposes_the_replica(databases):
+    async with databases() as s:
+        await ProductsRepo(s).get_by_id(1)
+    replica_pool = s.replica.engine.sync_engine.pool
+    assert replica_pool.checkedin() == 1
+
+    await s.bind.dispose()
+    assert replica_pool.checkedin() == 0
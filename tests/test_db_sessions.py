@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.models import User
+from app.db.sessions import ReleasingSession
+from app.middlewares.db_session import DBSessionMiddleware
+
+
+@pytest.fixture
+def releasing_maker(engine):
+    return async_sessionmaker(engine, class_=ReleasingSession, expire_on_commit=False)
+
+
+@pytest.mark.asyncio
+async def test_reads_hand_the_connection_back(releasing_maker, engine):
+    async with releasing_maker() as s:
+        s.add(User(tg_user_id=7200))
+        await s.commit()
+
+    async with releasing_maker(release_between_queries=True) as s:
+        user = (await s.execute(select(User).where(User.tg_user_id == 7200))).scalar_one()
+        assert not s.in_transaction()
+        assert engine.sync_engine.pool.checkedout() == 0
+        assert user.tg_user_id == 7200
+
+        assert await s.scalar(select(User.id).where(User.tg_user_id == 7200)) == user.id
+        assert await s.get(User, user.id) is user
+        assert not s.in_transaction()
+
+
+@pytest.mark.asyncio
+async def test_writes_locks_and_pending_changes_keep_the_transaction(releasing_maker):
+    async with releasing_maker(release_between_queries=True) as s:
+        await s.execute(update(User).where(User.tg_user_id == 7201).values(language="en"))
+        assert s.in_transaction()
+        await s.execute(select(User.id))
+        assert s.in_transaction()
+        await s.commit()
+
+        await s.execute(select(User.id).with_for_update())
+        assert s.in_transaction()
+        await s.rollback()
+
+        s.add(User(tg_user_id=7202))
+        await s.execute(text("SELECT 1"))
+        assert s.in_transaction()
+        await s.rollback()
+
+
+@pytest.mark.asyncio
+async def test_sessions_keep_their_connection_unless_asked(releasing_maker):
+    async with releasing_maker() as s:
+        await s.execute(select(User.id))
+        assert s.in_transaction()
+
+
+@pytest.mark.asyncio
+async def test_lazy_middleware_releases_after_ensure_user(releasing_maker):
+    mw = DBSessionMiddleware(releasing_maker, lazy=True)
+    seen = {}
+
+    event = SimpleNamespace(
+        from_user=SimpleNamespace(
+            id=7203,
+            username="lazy",
+            first_name=None,
+            last_name=None,
+            is_bot=False,
+            is_premium=False,
+        )
+    )
+
+    async def handler(event, data):
+        seen["in_transaction"] = data["db_session"].in_transaction()
+        seen["user"] = await data["user_repo"].get_by_tg_id(7203)
+
+    await mw(handler, event, {})
+    assert seen["in_transaction"] is False
+    assert seen["user"] is not None
@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import update
+
+from app.db.models import FetchJob
+from app.repositories.fetch_jobs import FetchJobsRepo
+from app.services import fetch_jobs as fetch_jobs_mod
+from app.services.fetch_jobs import (
+    FetchJobClient,
+    FetchJobRunner,
+    info_to_result,
+    result_to_info,
+)
+from app.services.marketplace_client import MarketplaceBlockedError, ProductInfo
+
+INFO = ProductInfo(
+    marketplace="ozon",
+    title="Phone",
+    price_with_card=Decimal("999.90"),
+    price_no_card=None,
+)
+
+
+def _jobs(status: str) -> float:
+    return REGISTRY.get_sample_value("marketplace_bot_fetch_jobs_total", {"status": status}) or 0.0
+
+
+def test_result_roundtrip_keeps_decimal_prices():
+    assert result_to_info(info_to_result(INFO)) == INFO
+
+
+@pytest.mark.asyncio
+async def test_claim_next_takes_oldest_pending_once_and_skips_abandoned(session):
+    repo = FetchJobsRepo(session)
+    abandoned = await repo.enqueue("https://www.ozon.ru/product/old")
+    await session.execute(
+        update(FetchJob)
+        .where(FetchJob.id == abandoned)
+        .values(created_at=datetime.now() - timedelta(hours=1))
+    )
+    await session.commit()
+    first = await repo.enqueue("https://www.ozon.ru/product/1")
+    second = await repo.enqueue("https://www.ozon.ru/product/2")
+
+    claimed = await repo.claim_next(max_age=timedelta(minutes=2))
+    assert claimed is not None and claimed.id == first and claimed.status == "running"
+    again = await repo.claim_next(max_age=timedelta(minutes=2))
+    assert again is not None and again.id == second
+    assert await repo.claim_next(max_age=timedelta(minutes=2)) is None
+
+    await repo.finish(first, error="x" * 300)
+    job = await repo.get(first)
+    assert job is not None and job.status == "failed" and len(job.error or "") == 255
+
+
+@pytest.mark.asyncio
+async def test_runner_and_client_complete_a_fetch(monkeypatch, session_maker):
+    async def _fetch(url):
+        assert url == "https://www.ozon.ru/product/42"
+        return INFO
+
+    monkeypatch.setattr(fetch_jobs_mod, "fetch_product_info", _fetch)
+    runner = FetchJobRunner(session_maker, poll_interval=0.01)
+    client = FetchJobClient(session_maker, timeout=5, poll_interval=0.01)
+    done_before = _jobs("done")
+
+    await runner.start()
+    try:
+        info = await client("https://www.ozon.ru/product/42")
+    finally:
+        await runner.stop()
+
+    assert info == INFO
+    assert _jobs("done") == done_before + 1
+
+
+@pytest.mark.asyncio
+async def test_runner_records_errors_for_the_client(monkeypatch, session_maker):
+    async def _blocked(url):
+        raise MarketplaceBlockedError("ozon_blocked")
+
+    monkeypatch.setattr(fetch_jobs_mod, "fetch_product_info", _blocked)
+    client = FetchJobClient(session_maker, timeout=5, poll_interval=0.01)
+    runner = FetchJobRunner(session_maker)
+
+    pending = asyncio.create_task(client("https://www.ozon.ru/product/43"))
+    while not await runner.run_once():
+        await asyncio.sleep(0.01)
+
+    with pytest.raises(MarketplaceBlockedError, match="ozon_blocked"):
+        await pending
+
+
+@pytest.mark.asyncio
+async def test_runner_runs_jobs_concurrently_up_to_its_limit(monkeypatch, session_maker):
+    active = peak = 0
+    release = asyncio.Event()
+
+    async def _fetch(url):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await release.wait()
+        active -= 1
+        return INFO
+
+    monkeypatch.setattr(fetch_jobs_mod, "fetch_product_info", _fetch)
+    async with session_maker() as s:
+        ids = [
+            await FetchJobsRepo(s).enqueue(f"https://www.ozon.ru/product/5{i}") for i in range(3)
+        ]
+    runner = FetchJobRunner(session_maker, concurrency=2, poll_interval=0.01)
+
+    await runner.start()
+    try:
+        while peak < 2:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        assert peak == 2
+        release.set()
+        for _ in range(500):
+            async with session_maker() as s:
+                jobs = [await FetchJobsRepo(s).get(i) for i in ids]
+            if all(j is not None and j.status == "done" for j in jobs):
+                break
+            await asyncio.sleep(0.01)
+        else:
+            pytest.fail("jobs did not finish")
+    finally:
+        await runner.stop()
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_client_times_out_without_a_worker(session_maker):
+    client = FetchJobClient(session_maker, timeout=0.05, poll_interval=0.01)
+    with pytest.raises(MarketplaceBlockedError, match="timed out"):
+        await client("https://www.ozon.ru/product/44")
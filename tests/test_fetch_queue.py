@@ -0,0 +1,202 @@
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services import fetch_queue
+from app.services.fetch_queue import (
+    FetchQueue,
+    Priority,
+    configure_fetch_queue,
+    run_fetch,
+    shutdown_fetch_queue,
+    spawn_task,
+)
+
+
+def _waits(priority: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "marketplace_bot_fetch_queue_wait_seconds_count", {"priority": priority}
+        )
+        or 0.0
+    )
+
+
+@pytest.mark.asyncio
+async def test_interactive_jobs_overtake_queued_scheduled_ones():
+    queue = FetchQueue(1)
+    release = asyncio.Event()
+    order = []
+
+    async def _job(name):
+        if name == "busy":
+            await release.wait()
+        order.append(name)
+        return name
+
+    busy = queue.submit(lambda: _job("busy"), priority=Priority.SCHEDULED)
+    await asyncio.sleep(0)
+    scheduled = [
+        queue.submit(lambda n=n: _job(n), priority=Priority.SCHEDULED) for n in ("s1", "s2")
+    ]
+    interactive = queue.submit(lambda: _job("user"), priority=Priority.INTERACTIVE)
+    interactive_waits = _waits("interactive")
+
+    release.set()
+    assert await asyncio.gather(busy, *scheduled, interactive) == ["busy", "s1", "s2", "user"]
+    assert order == ["busy", "user", "s1", "s2"]
+    assert _waits("interactive") == interactive_waits + 1
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_the_waiter_and_close_cancels_pending():
+    queue = FetchQueue(1)
+
+    async def _fail():
+        raise RuntimeError("blocked")
+
+    with pytest.raises(RuntimeError, match="blocked"):
+        await queue.submit(_fail, priority=Priority.SCHEDULED)
+
+    never = asyncio.Event()
+    queue.submit(never.wait, priority=Priority.SCHEDULED)
+    pending = queue.submit(never.wait, priority=Priority.INTERACTIVE)
+    await asyncio.sleep(0)
+    await queue.close()
+    assert pending.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_without_a_configured_pool_jobs_run_inline():
+    ran = []
+
+    async def _job():
+        ran.append(True)
+        return 42
+
+    assert await run_fetch(_job, priority=Priority.SCHEDULED, key="u") == 42
+    assert ran == [True]
+
+
+def _depth(priority: str) -> float:
+    return (
+        REGISTRY.get_sample_value("marketplace_bot_fetch_queue_depth", {"priority": priority})
+        or 0.0
+    )
+
+
+def _coalesced(priority: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "marketplace_bot_fetch_queue_coalesced_total", {"priority": priority}
+        )
+        or 0.0
+    )
+
+
+@pytest.mark.asyncio
+async def test_fetches_with_the_same_key_share_one_job():
+    queue = FetchQueue(1)
+    release = asyncio.Event()
+    runs = []
+
+    async def _job(name):
+        await release.wait()
+        runs.append(name)
+        return name
+
+    first = queue.submit(lambda: _job("a"), priority=Priority.SCHEDULED, key="a")
+    coalesced = _coalesced("interactive")
+    second = queue.submit(lambda: _job("a again"), priority=Priority.INTERACTIVE, key="a")
+    other = queue.submit(lambda: _job("b"), priority=Priority.SCHEDULED, key="b")
+    assert _coalesced("interactive") == coalesced + 1
+
+    release.set()
+    assert await asyncio.gather(first, second, other) == ["a", "a", "b"]
+    assert runs == ["a", "b"]
+
+    # Once it finished, the key starts a new fetch.
+    assert await queue.submit(lambda: _job("a"), priority=Priority.SCHEDULED, key="a") == "a"
+    assert runs == ["a", "b", "a"]
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_interactive_caller_promotes_a_queued_scheduled_fetch():
+    queue = FetchQueue(1)
+    release = asyncio.Event()
+    order = []
+
+    async def _job(name):
+        if name == "busy":
+            await release.wait()
+        order.append(name)
+        return name
+
+    busy = queue.submit(lambda: _job("busy"), priority=Priority.SCHEDULED)
+    await asyncio.sleep(0)
+    earlier = queue.submit(lambda: _job("s1"), priority=Priority.SCHEDULED)
+    scheduled = queue.submit(lambda: _job("u"), priority=Priority.SCHEDULED, key="u")
+    depth = {p: _depth(p) for p in ("scheduled", "interactive")}
+    interactive = queue.submit(lambda: _job("u"), priority=Priority.INTERACTIVE, key="u")
+    assert _depth("scheduled") == depth["scheduled"] - 1
+    assert _depth("interactive") == depth["interactive"] + 1
+
+    release.set()
+    assert await asyncio.gather(busy, earlier, scheduled, interactive) == ["busy", "s1", "u", "u"]
+    assert order == ["busy", "u", "s1"]
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_caller_leaves_the_shared_fetch_running():
+    queue = FetchQueue(1)
+    release = asyncio.Event()
+
+    async def _job():
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(queue.submit(_job, priority=Priority.INTERACTIVE, key="k"))
+    second = queue.submit(_job, priority=Priority.INTERACTIVE, key="k")
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second == "done"
+    assert first.cancelled()
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_spawned_tasks_do_not_wait_for_a_fetch_slot(caplog):
+    configure_fetch_queue(1)
+    release = asyncio.Event()
+    try:
+        busy = asyncio.ensure_future(run_fetch(release.wait, priority=Priority.INTERACTIVE))
+        done = asyncio.Event()
+
+        async def _wait_for_worker():
+            done.set()
+
+        async def _broken():
+            raise ValueError("boom")
+
+        spawn_task(_wait_for_worker)
+        await asyncio.wait_for(done.wait(), 1)
+
+        spawn_task(_broken)
+        for _ in range(100):
+            if "Background fetch failed" in caplog.text:
+                break
+            await asyncio.sleep(0.01)
+        assert "Background fetch failed" in caplog.text
+
+        spawn_task(asyncio.Event().wait)
+        assert len(fetch_queue._Pool.tasks) == 1
+        release.set()
+        await busy
+    finally:
+        await shutdown_fetch_queue()
+    assert not fetch_queue._Pool.tasks
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from prometheus_client import REGISTRY
+from sqlalchemy import select, update
+
+from app.db.models import FsmState
+from app.fsm_storage import SQLStorage
+
+
+class Dialog(StatesGroup):
+    waiting = State()
+
+
+def _key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+def _reads(result: str) -> float:
+    return (
+        REGISTRY.get_sample_value("marketplace_bot_fsm_storage_reads_total", {"result": result})
+        or 0.0
+    )
+
+
+@pytest.mark.asyncio
+async def test_state_and_data_roundtrip_through_fsm_context(session_maker):
+    storage = SQLStorage(session_maker)
+    ctx = FSMContext(storage, _key(7001))
+
+    await ctx.set_state(Dialog.waiting)
+    await ctx.update_data(product_id=5, page=2)
+    assert await ctx.get_state() == "Dialog:waiting"
+    assert await ctx.get_data() == {"product_id": 5, "page": 2}
+
+    await ctx.clear()
+    assert await ctx.get_state() is None
+    assert await ctx.get_data() == {}
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_repeated_reads_and_is_written_through(session_maker):
+    storage = SQLStorage(session_maker, cache_seconds=60)
+    key = _key(7002)
+
+    misses, hits = _reads("miss"), _reads("hit")
+    assert await storage.get_state(key) is None
+    await storage.set_state(key, "Dialog:waiting")
+    await storage.set_data(key, {"a": 1})
+    assert await storage.get_state(key) == "Dialog:waiting"
+    assert await storage.get_data(key) == {"a": 1}
+    assert _reads("miss") - misses == 1
+    assert _reads("hit") - hits == 2
+
+    data = await storage.get_data(key)
+    data["a"] = 2
+    assert await storage.get_data(key) == {"a": 1}
+
+
+@pytest.mark.asyncio
+async def test_replicas_share_state(session_maker):
+    first = SQLStorage(session_maker, cache_seconds=0)
+    second = SQLStorage(session_maker, cache_seconds=0)
+    key = _key(7003)
+
+    await first.set_state(key, Dialog.waiting)
+    await first.set_data(key, {"url": "https://x"})
+    assert await second.get_state(key) == "Dialog:waiting"
+    assert await second.get_data(key) == {"url": "https://x"}
+
+    await second.set_state(key, None)
+    assert await first.get_state(key) is None
+
+
+@pytest.mark.asyncio
+async def test_abandoned_state_expires_and_is_purged(session_maker):
+    storage = SQLStorage(session_maker, cache_seconds=0, state_ttl=timedelta(hours=1))
+    key = _key(7004)
+    db_key = storage.key_builder.build(key)
+    await storage.set_state(key, Dialog.waiting)
+    await storage.set_data(key, {"stale": True})
+
+    async with session_maker() as session:
+        await session.execute(
+            update(FsmState)
+            .where(FsmState.key == db_key)
+            .values(expires_at=datetime.now() - timedelta(seconds=1))
+        )
+        await session.commit()
+
+    assert await storage.get_state(key) is None
+    assert await storage.get_data(key) == {}
+
+    # A new dialog on top of the expired row must not inherit its data.
+    await storage.set_state(key, Dialog.waiting)
+    assert await storage.get_data(key) == {}
+
+    await storage.set_state(key, None)
+    async with session_maker() as session:
+        await session.execute(
+            update(FsmState)
+            .where(FsmState.key == db_key)
+            .values(expires_at=datetime.now() - timedelta(seconds=1))
+        )
+        await session.commit()
+    assert await storage.purge_expired() >= 1
+    async with session_maker() as session:
+        assert (
+            await session.execute(select(FsmState).where(FsmState.key == db_key))
+        ).first() is None
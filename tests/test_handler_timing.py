@@ -0,0 +1,69 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.instrumentation import instrument_engine
+from app.middlewares.telegram_timing import TelegramTimingMiddleware
+from app.utils.handler_timing import measure_handler
+from app.utils.logging import log_callback_handler
+
+
+def _count(action: str, component: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "marketplace_bot_handler_duration_seconds_count",
+        {"action": action, "component": component},
+    )
+    return value or 0.0
+
+
+@pytest.mark.asyncio
+async def test_db_time_is_charged_to_current_handler(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/timing.sqlite3")
+    instrument_engine(engine)
+    instrument_engine(engine)
+    try:
+        async with async_sessionmaker(engine)() as session:
+            await session.execute(text("SELECT 1"))
+            with measure_handler("timing_db") as timer:
+                await session.execute(text("SELECT 1"))
+            assert timer.db > 0
+            assert timer.telegram == 0
+            with pytest.raises(OperationalError):
+                await session.execute(text("SELECT * FROM missing_table"))
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_telegram_time_is_charged_to_current_handler():
+    calls = []
+
+    async def make_request(bot, method):
+        calls.append(method)
+        return "ok"
+
+    mw = TelegramTimingMiddleware()
+    assert await mw(make_request, None, "sendMessage") == "ok"
+    with measure_handler("timing_tg") as timer:
+        assert await mw(make_request, None, "editMessageText") == "ok"
+    assert calls == ["sendMessage", "editMessageText"]
+    assert timer.telegram > 0 and timer.db == 0
+
+
+@pytest.mark.asyncio
+async def test_handler_decorator_observes_components(dummy_cb):
+    before = {c: _count("timing_cb", c) for c in ("total", "db", "telegram")}
+
+    @log_callback_handler("timing_cb")
+    async def handler(cb):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await handler(dummy_cb)
+    assert {c: _count("timing_cb", c) - before[c] for c in before} == {
+        "total": 1,
+        "db": 1,
+        "telegram": 1,
+    }
@@ -1,9 +1,17 @@
+import asyncio
 from decimal import Decimal
 
 import pytest
 
 from app.handlers.add_product import AddProduct, add_cancel, got_target_price, got_url, start_add
 from app.repositories.products import MAX_PRODUCTS_PER_USER
+from app.services import fetch_queue
+from app.services.fetch_queue import (
+    Priority,
+    configure_fetch_queue,
+    run_fetch,
+    shutdown_fetch_queue,
+)
 
 
 class _PI:
@@ -18,6 +26,11 @@ class _PI:
         return self.price_with_card or self.price_no_card
 
 
+async def _fetched():
+    """Wait for the fetch that `got_url` left running in a task."""
+    await asyncio.gather(*fetch_queue._Pool.tasks)
+
+
 @pytest.mark.asyncio
 async def test_start_add_under_limit(dummy_cb, users_repo, products_repo, fsm):
     await start_add(dummy_cb, users_repo, products_repo, fsm)
@@ -84,6 +97,7 @@ async def test_got_url_fetch_blocked(monkeypatch, dummy_message, users_repo, pro
     monkeypatch.setattr("app.handlers.add_product.fetch_product_info", _blocked)
 
     await got_url(dummy_message, users_repo, products_repo, fsm)
+    await _fetched()
     assert dummy_message.children, "ожидали временное сообщение"
     temp = dummy_message.children[-1]
     assert temp.edits and any("блокирует доступ" in e["text"] for e in temp.edits)
@@ -100,6 +114,7 @@ async def test_got_url_fetch_error(monkeypatch, dummy_message, users_repo, produ
     monkeypatch.setattr("app.handlers.add_product.fetch_product_info", _error)
 
     await got_url(dummy_message, users_repo, products_repo, fsm)
+    await _fetched()
     temp = dummy_message.children[-1]
     assert temp.edits and any("Не удалось получить данные" in e["text"] for e in temp.edits)  # noqa: RUF001
 
@@ -119,6 +134,7 @@ async def test_got_url_success_to_wait_target(
     monkeypatch.setattr("app.handlers.add_product.fetch_product_info", _ok)
 
     await got_url(dummy_message, users_repo, products_repo, fsm)
+    await _fetched()
 
     edited_children = [c for c in dummy_message.children if c.edits]
     assert edited_children, "ожидали редактирование временного сообщения"
@@ -154,3 +170,37 @@ async def test_got_target_price_success(dummy_message, users_repo, products_repo
     assert existing is not None
     latest = await products_repo.get_latest_price(existing.id)
     assert latest and latest[0] == 99.99
+
+
+@pytest.mark.asyncio
+async def test_got_url_returns_before_queued_fetch_finishes(
+    dummy_message, users_repo, products_repo, fsm
+):
+    await fsm.set_state(AddProduct.waiting_for_url)
+    dummy_message.text = "https://www.ozon.ru/item/104"
+    release = asyncio.Event()
+
+    async def _slow(url):
+        await release.wait()
+        return _PI(title="Lamp", price_with_card=Decimal("99"), marketplace="ozon")
+
+    configure_fetch_queue(1)
+    try:
+        await got_url(dummy_message, users_repo, products_repo, fsm, fetch_product=_slow)
+        (temp,) = dummy_message.children
+        assert not temp.edits
+        assert await fsm.get_state() == AddProduct.waiting_for_url.state
+        # Waiting on the scraper worker leaves the only fetch slot free.
+        free = run_fetch(lambda: asyncio.sleep(0, "free"), priority=Priority.SCHEDULED)
+        assert await asyncio.wait_for(free, 1) == "free"
+
+        release.set()
+        for _ in range(100):
+            if temp.edits:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await shutdown_fetch_queue()
+
+    assert "Lamp" in temp.edits[-1]["text"]
+    assert await fsm.get_state() == AddProduct.waiting_for_target_price.state
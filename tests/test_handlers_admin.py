@@ -0,0 +1,62 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from conftest import DummyMessage
+
+from app.handlers.admin import cmd_runs
+from app.repositories.refresh_runs import RefreshRunsRepo
+
+
+async def _add_run(session, **overrides):
+    fields = {
+        "cycle": "rolling",
+        "status": "completed",
+        "started_at": datetime(2100, 3, 1, 12, 0),
+        "finished_at": datetime(2100, 3, 1, 12, 1),
+        "products_checked": 40,
+        "fetches": 31,
+        "errors": 3,
+        "errors_by_type": {"WBBlockedError": 2, "TimeoutError": 1},
+        "blocks": 2,
+        "notifications": 4,
+        "fetch_p50_ms": 210.4,
+        "fetch_p95_ms": 1870.0,
+    }
+    fields.update(overrides)
+    return await RefreshRunsRepo(session).add(**fields)
+
+
+@pytest.mark.asyncio
+async def test_cmd_runs_ignores_non_admins(dummy_message, users_repo, session):
+    await cmd_runs(dummy_message, SimpleNamespace(args=None), users_repo, session, frozenset({42}))
+    assert dummy_message.answers == []
+
+
+@pytest.mark.asyncio
+async def test_cmd_runs_lists_recent_runs(users_repo, session):
+    msg = DummyMessage(user_id=4242)
+    run_id = await _add_run(session)
+    u = await users_repo.ensure_user(msg.from_user.id)
+    await users_repo.set_language(u.tg_user_id, "en")
+
+    admins = frozenset({msg.from_user.id})
+    await cmd_runs(msg, SimpleNamespace(args="1"), users_repo, session, admins)
+
+    text = msg.answers[0]["text"]
+    assert "Recent price refresh cycles" in text
+    assert f"#{run_id} rolling" in text
+    assert "checked 40, fetches 31, errors 3 (blocks 2)" in text
+    assert "p50/p95: 210/1870 ms" in text
+    assert "WBBlockedError: 2, TimeoutError: 1" in text
+
+
+@pytest.mark.asyncio
+async def test_cmd_runs_does_not_create_the_admin_user(users_repo, session):
+    msg = DummyMessage(user_id=4243)
+    await _add_run(session)
+
+    await cmd_runs(msg, SimpleNamespace(args="1"), users_repo, session, frozenset({4243}))
+
+    assert "Последние циклы" in msg.answers[0]["text"]
+    assert await users_repo.get_by_tg_id(4243) is None
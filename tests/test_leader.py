@@ -0,0 +1,132 @@
+from types import SimpleNamespace
+from typing import Any, cast
+
+import pytest
+
+from app.leader import LeaderElector
+from app.metrics import leader_gauge
+from app.scheduler import run_as_leader
+
+
+class _FakeConn:
+    def __init__(self, acquired=True) -> None:
+        self.acquired = acquired
+        self.statements = []
+        self.closed = False
+        self.invalidated = False
+        self.broken = False
+        self.fail_unlock = False
+
+    async def scalar(self, stmt, params=None):
+        self.statements.append(str(stmt))
+        return self.acquired
+
+    async def execute(self, stmt, params=None):
+        if self.broken or (self.fail_unlock and "unlock" in str(stmt)):
+            raise ConnectionError("server closed the connection")
+        self.statements.append(str(stmt))
+
+    async def commit(self):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+    async def invalidate(self):
+        self.invalidated = True
+
+
+class _FakePgEngine:
+    def __init__(self, conns) -> None:
+        self.dialect = SimpleNamespace(name="postgresql")
+        self._conns = list(conns)
+        self.connects = 0
+
+    async def connect(self):
+        self.connects += 1
+        return self._conns.pop(0)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_is_always_leader(engine):
+    elector = LeaderElector(engine, lock_key=1)
+    assert await elector.check() is True
+    assert elector.is_leader
+    assert leader_gauge._value.get() == 1
+
+    await elector.stop()
+    assert not elector.is_leader
+    assert leader_gauge._value.get() == 0
+
+
+@pytest.mark.asyncio
+async def test_pg_acquires_lock_and_keeps_connection():
+    conn = _FakeConn(acquired=True)
+    pg = _FakePgEngine([conn])
+    elector = LeaderElector(cast(Any, pg), lock_key=99)
+
+    assert await elector.check() is True
+    assert "pg_try_advisory_lock" in conn.statements[0]
+    assert not conn.closed
+
+    assert await elector.check() is True
+    assert pg.connects == 1
+
+    await elector.stop()
+    assert any("pg_advisory_unlock" in s for s in conn.statements)
+    assert conn.closed and not conn.invalidated
+
+
+@pytest.mark.asyncio
+async def test_pg_follower_releases_connection():
+    conn = _FakeConn(acquired=False)
+    elector = LeaderElector(cast(Any, _FakePgEngine([conn])), lock_key=99)
+
+    assert await elector.check() is False
+    assert conn.closed and not conn.invalidated
+    assert not elector.is_leader
+
+
+@pytest.mark.asyncio
+async def test_pg_steps_down_on_lost_connection_and_retries():
+    first = _FakeConn(acquired=True)
+    second = _FakeConn(acquired=False)
+    pg = _FakePgEngine([first, second])
+    elector = LeaderElector(cast(Any, pg), lock_key=99)
+
+    assert await elector.check() is True
+    first.broken = True
+
+    assert await elector.check() is False
+    assert first.closed and first.invalidated
+    assert pg.connects == 2
+    assert not elector.is_leader
+
+
+@pytest.mark.asyncio
+async def test_pg_failed_unlock_invalidates_the_lock_connection():
+    conn = _FakeConn(acquired=True)
+    elector = LeaderElector(cast(Any, _FakePgEngine([conn])), lock_key=99)
+    assert await elector.check() is True
+
+    conn.fail_unlock = True
+    await elector.stop()
+    assert conn.invalidated and conn.closed
+    assert not elector.is_leader
+
+
+@pytest.mark.asyncio
+async def test_run_as_leader_gates_job():
+    calls = []
+
+    async def job(**kwargs):
+        calls.append(kwargs)
+
+    follower = SimpleNamespace(is_leader=False)
+    await run_as_leader(job, cast(Any, follower), x=1)
+    assert calls == []
+
+    leader = SimpleNamespace(is_leader=True)
+    await run_as_leader(job, cast(Any, leader), x=2)
+    await run_as_leader(job, None, x=3)
+    assert calls == [{"leader": leader, "x": 2}, {"leader": None, "x": 3}]
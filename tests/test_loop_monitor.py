@@ -0,0 +1,47 @@
+import asyncio
+import logging
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.loop_monitor import LoopMonitor
+
+
+def _sample(name: str) -> float:
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+async def _hog_loop() -> None:
+    await asyncio.sleep(0)
+    time.sleep(0.06)
+
+
+@pytest.mark.asyncio
+async def test_loop_monitor_records_lag_and_slow_callbacks(caplog):
+    original_run = asyncio.Handle._run
+    lag_before = _sample("marketplace_bot_event_loop_lag_seconds_count")
+    slow_before = _sample("marketplace_bot_event_loop_slow_callbacks_total")
+
+    monitor = LoopMonitor(interval=0.01, slow_callback_seconds=0.05)
+    await monitor.start()
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.loop_monitor"):
+            await asyncio.create_task(_hog_loop(), name="hog")
+            await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    assert asyncio.Handle._run is original_run
+    assert _sample("marketplace_bot_event_loop_lag_seconds_count") > lag_before
+    assert _sample("marketplace_bot_event_loop_slow_callbacks_total") - slow_before >= 1
+    assert any("task 'hog' running _hog_loop" in r.getMessage() for r in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_loop_monitor_without_slow_callback_tracking_leaves_handles_alone():
+    original_run = asyncio.Handle._run
+    monitor = LoopMonitor(interval=0.01, slow_callback_seconds=0)
+    await monitor.start()
+    assert asyncio.Handle._run is original_run
+    await monitor.stop()
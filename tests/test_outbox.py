@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError
+from aiogram.methods import SendMessage
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from prometheus_client import REGISTRY
+from sqlalchemy import select
+
+from app.db.models import NotificationOutbox
+from app.outbox import MAX_ATTEMPTS, OutboxDelivery, OutboxSender
+from app.repositories.outbox import NotificationOutboxRepo
+
+
+def _outbox(result: str) -> float:
+    return (
+        REGISTRY.get_sample_value("marketplace_bot_outbox_messages_total", {"result": result})
+        or 0.0
+    )
+
+
+class _FlakyBot:
+    def __init__(self, error: Exception | None = None):
+        self.error = error
+        self.sent = []
+
+    async def send_message(
+        self, chat_id, text, *, reply_markup=None, disable_web_page_preview=None
+    ):
+        if self.error is not None:
+            raise self.error
+        self.sent.append((chat_id, text, reply_markup, disable_web_page_preview))
+
+
+async def _row(session_maker, message_id: int) -> NotificationOutbox:
+    async with session_maker() as session:
+        return (
+            await session.execute(
+                select(NotificationOutbox).where(NotificationOutbox.id == message_id)
+            )
+        ).scalar_one()
+
+
+async def _drain(session_maker) -> None:
+    # The sqlite database is shared by the whole session; start from an empty outbox.
+    async with session_maker() as session:
+        await NotificationOutboxRepo(session).claim_batch(10_000, stale_after=timedelta(0))
+
+
+@pytest.mark.asyncio
+async def test_sender_queues_and_delivery_sends_with_keyboard(session_maker):
+    await _drain(session_maker)
+    kb = InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text="Open", url="https://www.ozon.ru/product/1")]]
+    )
+    await OutboxSender(session_maker).send_message(7101, "deal", reply_markup=kb)
+    await OutboxSender(session_maker).send_message(7102, "over", disable_web_page_preview=True)
+
+    bot = _FlakyBot()
+    sent_before = _outbox("sent")
+    assert await OutboxDelivery(bot, session_maker).deliver_once() == 2  # type: ignore[arg-type]
+
+    assert bot.sent == [(7101, "deal", kb, False), (7102, "over", None, True)]
+    assert _outbox("sent") == sent_before + 2
+    assert await OutboxDelivery(bot, session_maker).deliver_once() == 0  # type: ignore[arg-type]
+
+
+@pytest.mark.asyncio
+async def test_blocked_user_is_not_retried(session_maker):
+    await _drain(session_maker)
+    async with session_maker() as session:
+        message_id = await NotificationOutboxRepo(session).add(7103, "deal")
+
+    error = TelegramForbiddenError(SendMessage(chat_id=7103, text="deal"), "bot was blocked")
+    await OutboxDelivery(_FlakyBot(error), session_maker).deliver_once()  # type: ignore[arg-type]
+
+    row = await _row(session_maker, message_id)
+    assert row.status == "failed"
+    assert row.attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried_up_to_max_attempts(session_maker):
+    await _drain(session_maker)
+    async with session_maker() as session:
+        message_id = await NotificationOutboxRepo(session).add(7104, "deal")
+
+    error = TelegramNetworkError(SendMessage(chat_id=7104, text="deal"), "timeout")
+    delivery = OutboxDelivery(_FlakyBot(error), session_maker)  # type: ignore[arg-type]
+    for attempt in range(1, MAX_ATTEMPTS):
+        await delivery.deliver_once()
+        row = await _row(session_maker, message_id)
+        assert (row.status, row.attempts) == ("pending", attempt)
+
+    await delivery.deliver_once()
+    row = await _row(session_maker, message_id)
+    assert (row.status, row.attempts) == ("failed", MAX_ATTEMPTS)
+
+
+@pytest.mark.asyncio
+async def test_stale_claims_are_reclaimed(session_maker):
+    await _drain(session_maker)
+    async with session_maker() as session:
+        repo = NotificationOutboxRepo(session)
+        message_id = await repo.add(7105, "deal")
+        assert [m.id for m in await repo.claim_batch(10, stale_after=timedelta(minutes=5))] == [
+            message_id
+        ]
+        assert await repo.claim_batch(10, stale_after=timedelta(minutes=5)) == []
+        reclaimed = await repo.claim_batch(10, stale_after=timedelta(0))
+        assert [m.id for m in reclaimed] == [message_id]
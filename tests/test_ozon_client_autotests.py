@@ -4,10 +4,15 @@ from decimal import Decimal
 from typing import Any, cast
 
 import pytest
+from prometheus_client import REGISTRY
 
 import app.services.ozon_client as oc
 
 
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
 class FakeResponseOK:
     def __init__(self, payload, status=200, headers=None):
         self.ok = True
@@ -18,6 +23,9 @@ class FakeResponseOK:
     async def json(self):
         return self._payload
 
+    async def body(self):
+        return json.dumps(self._payload, ensure_ascii=False).encode()
+
 
 class FakeResponseBad:
     def __init__(self, status=500, headers=None):
@@ -28,6 +36,9 @@ class FakeResponseBad:
     async def json(self):
         raise RuntimeError("should not be called")
 
+    async def body(self):
+        raise RuntimeError("should not be called")
+
 
 class FakeRequestClient:
     def __init__(self, response):
@@ -237,6 +248,28 @@ async def test_pass_ozon_challenge_ok():
     assert page.goto_calls, "ожидали заход на abt-страницу"
 
 
+@pytest.mark.asyncio
+async def test_warmup_challenge_records_refresh_and_stage(monkeypatch, tmp_path):
+    monkeypatch.setattr(oc._Browser, "_skip_challenge", False)
+    monkeypatch.setattr(oc, "_cookie_storage_path", lambda: tmp_path / "cookies.json")
+    passed_before = _sample("marketplace_bot_ozon_challenge_refresh_total", result="passed")
+    stage_before = _sample(
+        "marketplace_bot_ozon_stage_duration_seconds_count", stage="warmup_challenge"
+    )
+
+    ctx = FakeContext()
+    assert await oc._warmup_challenge(cast(Any, ctx)) is True
+
+    assert _sample("marketplace_bot_ozon_challenge_refresh_total", result="passed") == (
+        passed_before + 1
+    )
+    assert (
+        _sample("marketplace_bot_ozon_stage_duration_seconds_count", stage="warmup_challenge")
+        == stage_before + 1
+    )
+    assert ctx.created_pages[0].closed
+
+
 @pytest.mark.asyncio
 async def test_pass_ozon_challenge_navigation_error():
     ctx = FakeContext()
@@ -279,10 +312,25 @@ async def test_fetch_with_composer_happy(monkeypatch):
     payload = {"widgetStates": {"x": "{}"}}
     ctx.request = FakeRequestClient(FakeResponseOK(payload))
     data = await oc._fetch_with_composer(ctx, "https://www.ozon.ru/product/test")
-    assert data == payload
+    assert data is not None and json.loads(data) == payload
     assert ctx.request.calls, "expected API call"
 
 
+@pytest.mark.asyncio
+async def test_fetch_with_composer_uses_configured_base(monkeypatch):
+    monkeypatch.setattr(oc._Endpoints, "base_url", oc._Endpoints.base_url)
+    oc.configure_base_url("http://127.0.0.1:9000/")
+    ctx = FakeContext()
+    ctx.request = FakeRequestClient(FakeResponseOK({"widgetStates": {"x": "{}"}}))
+
+    await oc._fetch_with_composer(ctx, "https://www.ozon.ru/product/test-1/")
+
+    url, headers = ctx.request.calls[0]
+    assert url.startswith("http://127.0.0.1:9000/api/composer-api.bx/page/json/v2?url=")
+    assert "product/test-1" in url
+    assert headers["Referer"] == "http://127.0.0.1:9000/"
+
+
 @pytest.mark.asyncio
 async def test_fetch_with_composer_retry(monkeypatch):
     ctx = FakeContext()
@@ -300,9 +348,18 @@ async def test_fetch_with_composer_retry(monkeypatch):
 
     monkeypatch.setattr(oc.asyncio, "sleep", fake_sleep)
 
+    stage = "marketplace_bot_ozon_stage_duration_seconds_count"
+    retries = "marketplace_bot_ozon_retries_total"
+    attempts_before = _sample(stage, stage="composer_attempt")
+    sleeps_before = _sample(stage, stage="backoff_sleep")
+    throttled_before = _sample(retries, level="composer", reason="429")
+
     data = await oc._fetch_with_composer(ctx, "https://www.ozon.ru/product/test")
-    assert data == payload
+    assert data is not None and json.loads(data) == payload
     assert len(sleeps) == 1
+    assert _sample(stage, stage="composer_attempt") - attempts_before == 2
+    assert _sample(stage, stage="backoff_sleep") - sleeps_before == 1
+    assert _sample(retries, level="composer", reason="429") - throttled_before == 1
 
 
 def test_pick_title_routes():
@@ -346,6 +403,108 @@ def test_pick_prices_widget_and_fallback_ruble():
     assert wc != nc
 
 
+def test_is_composer_payload():
+    assert oc._is_composer_payload(b'{"widgetStates": {}}')
+    assert oc._is_composer_payload(b'  \n {"seo": {}}')
+    assert not oc._is_composer_payload(None)
+    assert not oc._is_composer_payload(b"")
+    assert not oc._is_composer_payload(b" {} ")
+    assert not oc._is_composer_payload(b"{ \n}")
+    assert not oc._is_composer_payload(b"   ")
+    assert oc._is_composer_payload(b" " * 100 + b'{"seo": {}}')
+    assert not oc._is_composer_payload(b"<html>challenge</html>")
+
+
+@pytest.mark.asyncio
+async def test_parse_payload_inline_and_in_process_pool():
+    body = json.dumps(
+        {
+            "widgetStates": make_widget_states(
+                ("webProductHeading-1", {"title": "Стул"}),
+                ("webProductPrices-1", {"price": "2 499,00", "cardPrice": "2 199,00"}),
+            )
+        },
+        ensure_ascii=False,
+    ).encode()
+    expected = ("Стул", Decimal("2199.00"), Decimal("2499.00"))
+    duration = "marketplace_bot_ozon_parse_duration_seconds_count"
+    queue_wait = "marketplace_bot_ozon_parse_queue_wait_seconds_count"
+
+    inline_before = _sample(duration, mode="inline")
+    assert await oc._parse_payload(body) == expected
+    assert _sample(duration, mode="inline") - inline_before == 1
+
+    oc.configure_parse_executor(1, min_bytes=len(body) + 1)
+    try:
+        inline_before = _sample(duration, mode="inline")
+        assert await oc._parse_payload(body) == expected
+        assert _sample(duration, mode="inline") - inline_before == 1
+
+        oc.configure_parse_executor(1, min_bytes=0)
+        process_before = _sample(duration, mode="process")
+        wait_before = _sample(queue_wait)
+        assert await oc._parse_payload(body) == expected
+        assert _sample(duration, mode="process") - process_before == 1
+        assert _sample(queue_wait) - wait_before == 1
+    finally:
+        oc.shutdown_parse_executor()
+    assert oc._ParsePool.executor is None
+
+
+@pytest.mark.asyncio
+async def test_fetch_product_info_via_api_invalid_json(monkeypatch, tmp_path):
+    fake_ctx = FakeContext()
+
+    async def fake_ensure_started():
+        oc._Browser._ctx = cast(Any, fake_ctx)
+
+    monkeypatch.setattr(oc._Browser, "ensure_started", fake_ensure_started)
+    monkeypatch.setattr(oc._Browser, "_ctx", fake_ctx, raising=False)
+    cookie_file = tmp_path / "cookies.json"
+    cookie_file.write_text("{}")
+    monkeypatch.setattr(oc, "_cookie_storage_path", lambda: cookie_file)
+
+    calls = []
+
+    async def truncated(ctx, url, attempts=3):
+        calls.append(url)
+        return b'{"widgetStates": {"webProductHeading-1": '
+
+    monkeypatch.setattr(oc, "_fetch_with_composer", truncated)
+
+    with pytest.raises(json.JSONDecodeError):
+        await oc.fetch_product_info_via_api("https://ozon.ru/product/whatever")
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_product_info_via_api_refetches_invalid_json(monkeypatch, tmp_path):
+    fake_ctx = FakeContext()
+
+    async def fake_ensure_started():
+        oc._Browser._ctx = cast(Any, fake_ctx)
+
+    monkeypatch.setattr(oc._Browser, "ensure_started", fake_ensure_started)
+    monkeypatch.setattr(oc._Browser, "_ctx", fake_ctx, raising=False)
+    cookie_file = tmp_path / "cookies.json"
+    cookie_file.write_text("{}")
+    monkeypatch.setattr(oc, "_cookie_storage_path", lambda: cookie_file)
+
+    payload = {"widgetStates": make_widget_states(("webProductHeading-1", {"title": "Lamp"}))}
+    bodies = [b'{"widgetStates": {"webProductHeading-1": ', json.dumps(payload).encode()]
+
+    async def flaky(ctx, url, attempts=3):
+        return bodies.pop(0)
+
+    monkeypatch.setattr(oc, "_fetch_with_composer", flaky)
+    retries = "marketplace_bot_ozon_retries_total"
+    before = _sample(retries, level="composer", reason="invalid_json")
+
+    info = await oc.fetch_product_info_via_api("https://ozon.ru/product/whatever")
+    assert info.title == "Lamp"
+    assert _sample(retries, level="composer", reason="invalid_json") - before == 1
+
+
 @pytest.mark.asyncio
 async def test_fetch_product_info_via_api_happy(monkeypatch, tmp_path):
     fake_ctx = FakeContext()
@@ -377,11 +536,17 @@ async def test_fetch_product_info_via_api_happy(monkeypatch, tmp_path):
     monkeypatch.setattr(oc, "_warmup_challenge", fail_warmup)
 
     async def fake_composer(ctx, url, attempts=3):
-        return payload
+        return json.dumps(payload).encode()
 
     monkeypatch.setattr(oc, "_fetch_with_composer", fake_composer)
 
+    stage = "marketplace_bot_ozon_stage_duration_seconds_count"
+    started_before = _sample(stage, stage="ensure_started")
+    parse_before = _sample(stage, stage="parse")
+
     info = await oc.fetch_product_info_via_api("https://ozon.ru/product/whatever")
+    assert _sample(stage, stage="ensure_started") - started_before == 1
+    assert _sample(stage, stage="parse") - parse_before == 1
     assert info.title == "Awesome Chair"
     assert info.price_with_card == Decimal("2199.00")
     assert info.price_no_card == Decimal("2499.00")
@@ -492,3 +657,47 @@ def test_to_www_and_normalize_price_and_os_profile(monkeypatch):
     monkeypatch.setattr(oc.platform, "system", lambda: "Windows")
     prof3 = oc._os_profile()
     assert prof3["channel"] == "chrome"
+
+
+@pytest.mark.asyncio
+async def test_parse_payload_recovers_from_a_dead_worker():
+    import os
+    import signal
+
+    body = json.dumps(
+        {"widgetStates": make_widget_states(("webProductHeading-1", {"title": "Стол"}))},
+        ensure_ascii=False,
+    ).encode()
+    oc.configure_parse_executor(1, min_bytes=0)
+    try:
+        broken = oc._ParsePool.executor
+        assert broken is not None
+        assert (await oc._parse_payload(body))[0] == "Стол"
+
+        for pid in list(broken._processes):
+            os.kill(pid, signal.SIGKILL)
+        for _ in range(100):
+            if broken._broken:
+                break
+            await asyncio.sleep(0.05)
+
+        inline_before = _sample("marketplace_bot_ozon_parse_duration_seconds_count", mode="inline")
+        assert (await oc._parse_payload(body))[0] == "Стол"
+        assert (
+            _sample("marketplace_bot_ozon_parse_duration_seconds_count", mode="inline")
+            - inline_before
+            == 1
+        )
+        assert oc._ParsePool.executor is not broken
+        # The replacement pool serves the next payload.
+        process_before = _sample(
+            "marketplace_bot_ozon_parse_duration_seconds_count", mode="process"
+        )
+        assert (await oc._parse_payload(body))[0] == "Стол"
+        assert (
+            _sample("marketplace_bot_ozon_parse_duration_seconds_count", mode="process")
+            - process_before
+            == 1
+        )
+    finally:
+        oc.shutdown_parse_executor()
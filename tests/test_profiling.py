@@ -0,0 +1,84 @@
+import asyncio
+import tracemalloc
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.profiling import add_profiling_routes
+
+AUTH = {"Authorization": "Bearer s3cret"}
+
+
+@pytest.fixture
+async def client():
+    app = web.Application()
+    add_profiling_routes(app, "s3cret")
+    async with TestClient(TestServer(app)) as c:
+        yield c
+
+
+@pytest.mark.asyncio
+async def test_debug_routes_require_token(client):
+    for headers in ({}, {"Authorization": "Bearer nope"}):
+        resp = await client.get("/debug/tasks", headers=headers)
+        assert resp.status == 401
+
+
+async def _parked_worker(event: asyncio.Event) -> None:
+    await event.wait()
+
+
+@pytest.mark.asyncio
+async def test_task_dump_shows_await_chain(client):
+    event = asyncio.Event()
+    task = asyncio.create_task(_parked_worker(event), name="parked-worker")
+    await asyncio.sleep(0)
+    try:
+        resp = await client.get("/debug/tasks", headers=AUTH)
+        text = await resp.text()
+    finally:
+        event.set()
+        await task
+    assert resp.status == 200
+    assert "parked-worker [pending]" in text
+    assert "_parked_worker" in text and "Event.wait" in text
+
+
+@pytest.mark.asyncio
+async def test_profile_samples_loop_thread(client):
+    async def _busy():
+        end = asyncio.get_running_loop().time() + 1
+        while asyncio.get_running_loop().time() < end:
+            total = 0
+            for i in range(200_000):
+                total += i
+            await asyncio.sleep(0)
+
+    busy = asyncio.create_task(_busy())
+    resp = await client.get("/debug/profile?seconds=1&interval_ms=2", headers=AUTH)
+    await busy
+    text = await resp.text()
+    assert resp.status == 200
+    assert "_busy" in text
+    stack, count = text.splitlines()[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+
+
+@pytest.mark.asyncio
+async def test_tracemalloc_start_snapshot_stop(client):
+    was_tracing = tracemalloc.is_tracing()
+    try:
+        resp = await client.get("/debug/tracemalloc?top=5", headers=AUTH)
+        assert resp.status == (200 if was_tracing else 202)
+        keep = [bytearray(1024) for _ in range(100)]
+        resp = await client.get("/debug/tracemalloc?top=5", headers=AUTH)
+        text = await resp.text()
+        assert resp.status == 200 and text.startswith("traced: current=")
+        assert len(text.splitlines()) <= 7
+        del keep
+        resp = await client.delete("/debug/tracemalloc", headers=AUTH)
+        assert resp.status == 200 and not tracemalloc.is_tracing()
+    finally:
+        if was_tracing and not tracemalloc.is_tracing():
+            tracemalloc.start()
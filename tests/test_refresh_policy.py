@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+from app.refresh_policy import (
+    RefreshQueue,
+    next_check_interval,
+    price_volatility,
+    refresh_priority,
+)
+from app.repositories.products import Product
+from app.repositories.users import UserDTO
+
+BOUNDS = {
+    "base": timedelta(hours=8),
+    "min_interval": timedelta(hours=1),
+    "max_interval": timedelta(hours=24),
+}
+
+
+def test_price_volatility():
+    assert price_volatility([]) == 0.0
+    assert price_volatility([100.0]) == 0.0
+    assert price_volatility([100.0, 100.0, 100.0]) == 0.0
+    assert price_volatility([100.0, 110.0, 99.0]) == (0.1 + 0.1) / 2
+
+
+def test_short_history_keeps_base_interval():
+    assert next_check_interval([100.0], 120.0, 100.0, **BOUNDS) == timedelta(hours=8)
+
+
+def test_static_far_from_target_checked_less_often():
+    prices = [500.0] * 10
+    interval = next_check_interval(prices, 500.0, 100.0, **BOUNDS)
+    assert interval == timedelta(hours=24)
+
+
+def test_volatile_near_target_checked_more_often():
+    prices = [105.0, 120.0, 104.0, 118.0, 103.0]
+    interval = next_check_interval(prices, 103.0, 100.0, **BOUNDS)
+    assert interval == timedelta(hours=1)
+
+
+def test_active_deal_is_watched_closer():
+    prices = [100.0, 100.0, 100.0]
+    below = next_check_interval(prices, 90.0, 100.0, **BOUNDS)
+    above = next_check_interval(prices, 120.0, 100.0, **BOUNDS)
+    assert below < above
+
+
+def test_interval_is_monotonic_in_volatility():
+    calm = next_check_interval([100.0, 101.0, 100.0, 101.0], 120.0, 100.0, **BOUNDS)
+    jumpy = next_check_interval([100.0, 110.0, 100.0, 110.0], 120.0, 100.0, **BOUNDS)
+    assert jumpy < calm
+
+
+NOW = datetime(2030, 1, 1, 12, 0)
+
+
+def _product(pid=1, current=150.0, target=100.0, last_checked_at=NOW):
+    return Product(
+        id=pid,
+        user_id=1,
+        url=f"https://www.ozon.ru/item/{pid}",
+        title="T",
+        target_price=target,
+        current_price=current,
+        last_notified_price=None,
+        last_state=None,
+        is_active=True,
+        last_checked_at=last_checked_at,
+    )
+
+
+def _priority(product, user=None):
+    return refresh_priority(product, user, now=NOW, base=timedelta(hours=8))
+
+
+def test_priority_prefers_near_target():
+    assert _priority(_product(current=101.0)) > _priority(_product(current=300.0))
+
+
+def test_priority_prefers_stale_and_never_checked():
+    fresh = _product(last_checked_at=NOW)
+    stale = _product(last_checked_at=NOW - timedelta(hours=8))
+    never = _product(last_checked_at=None)
+    assert _priority(never) > _priority(stale) > _priority(fresh)
+
+
+def test_priority_prefers_active_premium_users():
+    idle = UserDTO(id=1, tg_user_id=1, last_active_at=NOW - timedelta(days=60))
+    active = UserDTO(id=2, tg_user_id=2, last_active_at=NOW - timedelta(hours=1))
+    premium = UserDTO(id=3, tg_user_id=3, last_active_at=NOW - timedelta(hours=1), is_premium=True)
+    p = _product()
+    assert _priority(p, premium) > _priority(p, active) > _priority(p, idle) > _priority(p, None)
+
+
+def test_refresh_queue_orders_by_priority_then_insertion():
+    q = RefreshQueue()
+    q.push(_product(1), 1.0)
+    q.push(_product(2), 5.0)
+    q.push(_product(3), 1.0)
+    assert len(q) == 3
+    assert [p.id for p in q.drain()] == [2, 1, 3]
+    assert len(q) == 0
@@ -232,3 +232,84 @@ def test_extract_user_data_minimal() -> None:
     assert data.first_name == "Minimal"
     assert data.last_name is None
     assert data.is_bot is False
+
+
+@pytest.mark.asyncio
+async def test_refresh_runs_recent_first(session: AsyncSession) -> None:
+    from datetime import datetime, timedelta
+
+    from app.repositories.refresh_runs import RefreshRunsRepo
+
+    repo = RefreshRunsRepo(session)
+    base = datetime(2099, 1, 1, 9, 0)
+    ids = [
+        await repo.add(
+            cycle="cron",
+            status="completed",
+            started_at=base + timedelta(hours=i),
+            finished_at=base + timedelta(hours=i, minutes=5),
+            products_checked=10 + i,
+            fetches=8,
+            errors=2,
+            errors_by_type={"OzonBlockedError": 2},
+            blocks=2,
+            notifications=1,
+            fetch_p50_ms=120.0,
+            fetch_p95_ms=None,
+        )
+        for i in range(3)
+    ]
+
+    assert len(await repo.list_recent(2)) == 2
+    runs = [r for r in await repo.list_recent(50) if r.id in ids]
+    assert [r.id for r in runs] == ids[::-1]
+    assert runs[0].errors_by_type == {"OzonBlockedError": 2}
+    assert runs[0].duration_seconds == 300
+    assert runs[0].fetch_p95_ms is None
+
+
+@pytest.mark.asyncio
+async def test_refresh_runs_window_merges_ticks_and_retention(session: AsyncSession) -> None:
+    from datetime import datetime, timedelta
+
+    from app.repositories.refresh_runs import RefreshRunsRepo
+
+    repo = RefreshRunsRepo(session)
+    window = datetime(1990, 6, 1, 10, 0)
+    tick = {
+        "cycle": "rolling",
+        "window_start": window,
+        "fetches": 4,
+        "blocks": 0,
+        "notifications": 1,
+    }
+    first = await repo.add_to_window(
+        **tick,
+        status="completed",
+        finished_at=window + timedelta(minutes=1),
+        products_checked=10,
+        errors=1,
+        errors_by_type={"TimeoutError": 1},
+        fetch_p50_ms=100.0,
+        fetch_p95_ms=300.0,
+    )
+    second = await repo.add_to_window(
+        **tick,
+        status="partial",
+        finished_at=window + timedelta(minutes=2),
+        products_checked=30,
+        errors=2,
+        errors_by_type={"TimeoutError": 1, "OzonBlockedError": 1},
+        fetch_p50_ms=200.0,
+        fetch_p95_ms=250.0,
+    )
+    assert first == second
+
+    (run,) = [r for r in await repo.list_recent(50) if r.id == first]
+    assert (run.status, run.products_checked, run.errors) == ("partial", 40, 3)
+    assert run.errors_by_type == {"TimeoutError": 2, "OzonBlockedError": 1}
+    assert (run.fetch_p50_ms, run.fetch_p95_ms) == (175.0, 300.0)
+    assert run.duration_seconds == 120
+
+    assert await repo.delete_older_than(window + timedelta(minutes=1)) >= 1
+    assert all(r.id != first for r in await repo.list_recent(50))
@@ -1,3 +1,5 @@
+from datetime import datetime, timedelta
+
 import pytest
 
 
@@ -24,3 +26,83 @@ async def test_list_all_active_and_state(users_repo, products_repo):
     await products_repo.set_last_state(ids[0], "below", last_notified_price=9.99)
     p = await products_repo.get_by_id(ids[0])
     assert p.last_state == "below" and p.last_notified_price == 9.99
+
+
+@pytest.mark.asyncio
+async def test_lease_hides_listed_products_until_it_expires(users_repo, products_repo):
+    u = await users_repo.ensure_user(4343)
+    pid = await products_repo.create(
+        user_id=u.id,
+        url="https://www.ozon.ru/item/rolling",
+        title="Rolling",
+        target_price=10,
+        current_price=None,
+    )
+    now = datetime(2030, 1, 1, 12, 0)
+
+    listed = await products_repo.list_due(limit=1000, now=now)
+    assert pid in {p.id for p in listed}
+    await products_repo.lease([p.id for p in listed], now + timedelta(hours=2))
+
+    p = await products_repo.get_by_id(pid)
+    assert p.next_check_at == now + timedelta(hours=2)
+
+    assert pid not in {p.id for p in await products_repo.list_due(limit=1000, now=now)}
+    assert await products_repo.count_due(now) == 0
+
+    later = now + timedelta(hours=3)
+    assert await products_repo.count_due(later) >= 1
+    assert pid in {p.id for p in await products_repo.list_due(limit=1000, now=later)}
+
+
+@pytest.mark.asyncio
+async def test_update_current_sets_last_checked(users_repo, products_repo):
+    u = await users_repo.ensure_user(4344)
+    pid = await products_repo.create(
+        user_id=u.id,
+        url="https://www.ozon.ru/item/checked",
+        title="Checked",
+        target_price=10,
+        current_price=None,
+    )
+    assert (await products_repo.get_by_id(pid)).last_checked_at is None
+
+    await products_repo.update_current_and_history(pid, 12.5)
+    assert (await products_repo.get_by_id(pid)).last_checked_at is not None
+
+
+@pytest.mark.asyncio
+async def test_update_current_refreshes_a_loaded_product(session, users_repo, products_repo):
+    from app.db.models import Product as ProductModel
+
+    u = await users_repo.ensure_user(4346)
+    pid = await products_repo.create(
+        user_id=u.id,
+        url="https://www.ozon.ru/item/loaded",
+        title="Loaded",
+        target_price=10,
+        current_price=50,
+    )
+    loaded = await session.get(ProductModel, pid)
+    assert loaded.current_price == 50
+
+    await products_repo.update_current_and_history(pid, 77.0)
+    assert (await session.get(ProductModel, pid)).current_price == 77
+    assert (await products_repo.get_by_id(pid)).current_price == 77.0
+
+
+@pytest.mark.asyncio
+async def test_recent_prices_chronological(users_repo, products_repo):
+    u = await users_repo.ensure_user(4345)
+    pid = await products_repo.create(
+        user_id=u.id,
+        url="https://www.ozon.ru/item/recent",
+        title="Recent",
+        target_price=10,
+        current_price=None,
+    )
+    for price in (30.0, 20.0, 25.0):
+        await products_repo.add_price_history(pid, price, source="scheduler")
+
+    assert await products_repo.recent_prices(pid, 2) == [20.0, 25.0]
+    assert await products_repo.recent_prices(pid, 10) == [30.0, 20.0, 25.0]
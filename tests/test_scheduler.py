@@ -1,3 +1,5 @@
+import asyncio
+from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Any, cast
 
@@ -5,7 +7,12 @@ import pytest
 
 from app.repositories.products import ProductsRepo
 from app.repositories.users import PostgresUserRepo
-from app.scheduler import refresh_prices_and_notify
+from app.scheduler import (
+    CANDIDATES_PER_SLOT,
+    RollingConfig,
+    refresh_due_products,
+    refresh_prices_and_notify,
+)
 
 
 class _SessionCtx:
@@ -215,3 +222,370 @@ async def test_scheduler_skips_when_user_missing(
 
     latest = await products_repo.get_latest_price(pid)
     assert latest and latest[0] == 9.00
+
+
+@pytest.mark.asyncio
+async def test_refresh_due_products_processes_claimed_batch(
+    fake_bot, users_repo: PostgresUserRepo, products_repo: ProductsRepo, session, monkeypatch
+):
+    user = await users_repo.ensure_user(3003)
+    pid = await products_repo.create(
+        user_id=user.id,
+        url="https://www.ozon.ru/item/rolling-batch",
+        title="Rolling Thing",
+        target_price=100.00,
+        current_price=150.00,
+    )
+    claims = []
+    leases = []
+
+    async def _list_due(*, limit, now):
+        claims.append(limit)
+        p = await products_repo.get_by_id(pid)
+        return [p] if len(claims) == 1 else []
+
+    async def _lease(ids, until):
+        leases.append(ids)
+
+    async def _count_due():
+        return 0
+
+    monkeypatch.setattr(products_repo, "list_due", _list_due)
+    monkeypatch.setattr(products_repo, "lease", _lease)
+    monkeypatch.setattr(products_repo, "count_due", _count_due)
+
+    async def fake_fetch(url: str):
+        from app.services.ozon_client import OzonProductInfo
+
+        return OzonProductInfo(
+            title="Rolling Thing", price_no_card=Decimal("90"), price_with_card=None
+        )
+
+    monkeypatch.setattr("app.scheduler.fetch_product_info", fake_fetch)
+    monkeypatch.setattr("app.scheduler.PostgresUserRepo", lambda s: users_repo)
+    monkeypatch.setattr("app.scheduler.ProductsRepo", lambda s: products_repo)
+
+    config = RollingConfig(batch_size=7, tick_seconds=10, interval_minutes=60)
+    session_maker = make_session_maker(session)
+
+    await refresh_due_products(fake_bot, cast(Any, session_maker), config=config)
+    assert claims == [7 * CANDIDATES_PER_SLOT]
+    assert leases == [[pid]]
+    assert len(fake_bot.messages) == 1
+
+    await refresh_due_products(fake_bot, cast(Any, session_maker), config=config)
+    assert len(fake_bot.messages) == 1
+    latest = await products_repo.get_latest_price(pid)
+    assert latest and latest[0] == 90.00
+
+    refreshed = await products_repo.get_by_id(pid)
+    assert refreshed is not None and refreshed.next_check_at is not None
+    assert refreshed.next_check_at - datetime.now() <= timedelta(minutes=60)
+
+
+def test_setup_scheduler_picks_trigger_by_mode(fake_bot):
+    from apscheduler.triggers.cron import CronTrigger
+    from apscheduler.triggers.interval import IntervalTrigger
+
+    from app.scheduler import setup_scheduler
+
+    async def _run():
+        cron = setup_scheduler(fake_bot, "9,21", cast(Any, None))
+        rolling = setup_scheduler(
+            fake_bot, "9,21", cast(Any, None), rolling=RollingConfig(tick_seconds=15)
+        )
+        try:
+            (cron_job,) = cron.get_jobs()
+            (rolling_job,) = rolling.get_jobs()
+            assert isinstance(cron_job.trigger, CronTrigger)
+            assert cron_job.max_instances == 1 and cron_job.coalesce
+            assert isinstance(rolling_job.trigger, IntervalTrigger)
+            assert rolling_job.max_instances == 1
+        finally:
+            cron.shutdown(wait=False)
+            rolling.shutdown(wait=False)
+
+    asyncio.run(_run())
+
+
+@pytest.mark.asyncio
+async def test_cron_cycle_refreshes_near_target_first(
+    fake_bot, users_repo: PostgresUserRepo, products_repo: ProductsRepo, session, monkeypatch
+):
+    user = await users_repo.ensure_user(3004)
+    far = await products_repo.create(
+        user_id=user.id,
+        url="https://www.ozon.ru/item/far",
+        title="Far",
+        target_price=100.00,
+        current_price=500.00,
+    )
+    near = await products_repo.create(
+        user_id=user.id,
+        url="https://www.ozon.ru/item/near",
+        title="Near",
+        target_price=100.00,
+        current_price=101.00,
+    )
+
+    async def _two():
+        for pid in (far, near):
+            p = await products_repo.get_by_id(pid)
+            assert p is not None
+            yield p
+
+    monkeypatch.setattr(products_repo, "list_all_active", _two)
+
+    fetched = []
+
+    async def fake_fetch(url: str):
+        from app.services.ozon_client import OzonProductInfo
+
+        fetched.append(url)
+        return OzonProductInfo(title="X", price_no_card=Decimal("300"), price_with_card=None)
+
+    monkeypatch.setattr("app.scheduler.fetch_product_info", fake_fetch)
+    monkeypatch.setattr("app.scheduler.PostgresUserRepo", lambda s: users_repo)
+    monkeypatch.setattr("app.scheduler.ProductsRepo", lambda s: products_repo)
+
+    await refresh_prices_and_notify(fake_bot, cast(Any, make_session_maker(session)))
+    assert fetched == ["https://www.ozon.ru/item/near", "https://www.ozon.ru/item/far"]
+
+
+@pytest.mark.asyncio
+async def test_cron_cycle_stops_on_budget_and_resumes(
+    fake_bot, users_repo: PostgresUserRepo, products_repo: ProductsRepo, session, monkeypatch
+):
+    from app.metrics import refresh_skipped_products_total, scheduler_runs_total
+    from app.repositories.scheduler_state import SchedulerStateRepo
+    from app.scheduler import CRON_CURSOR_KEY
+
+    user = await users_repo.ensure_user(3005)
+    ids = [
+        await products_repo.create(
+            user_id=user.id,
+            url=f"https://www.ozon.ru/item/budget-{i}",
+            title=f"B{i}",
+            target_price=100.00,
+            current_price=200.00,
+        )
+        for i in range(2)
+    ]
+
+    async def _mine():
+        for pid in ids:
+            p = await products_repo.get_by_id(pid)
+            assert p is not None
+            yield p
+
+    monkeypatch.setattr(products_repo, "list_all_active", _mine)
+
+    fetched = []
+
+    async def fake_fetch(url: str):
+        from app.services.ozon_client import OzonProductInfo
+
+        fetched.append(url)
+        return OzonProductInfo(title="X", price_no_card=Decimal("300"), price_with_card=None)
+
+    monkeypatch.setattr("app.scheduler.fetch_product_info", fake_fetch)
+    monkeypatch.setattr("app.scheduler.PostgresUserRepo", lambda s: users_repo)
+    monkeypatch.setattr("app.scheduler.ProductsRepo", lambda s: products_repo)
+    state = SchedulerStateRepo(session)
+    skipped = refresh_skipped_products_total.labels("budget")
+    skipped_before = skipped._value.get()
+    partial = scheduler_runs_total.labels("partial")
+    partial_before = partial._value.get()
+
+    session_maker = cast(Any, make_session_maker(session))
+    await refresh_prices_and_notify(fake_bot, session_maker, budget=timedelta(0))
+    assert fetched == []
+    assert skipped._value.get() - skipped_before == 2
+    assert partial._value.get() - partial_before == 1
+    assert await state.get_datetime(CRON_CURSOR_KEY) is not None
+
+    # One product got checked by someone else after the interrupted cycle started.
+    await products_repo.update_current_and_history(ids[0], 250.00)
+
+    await refresh_prices_and_notify(fake_bot, session_maker)
+    assert fetched == ["https://www.ozon.ru/item/budget-1"]
+    assert await state.get(CRON_CURSOR_KEY) is None
+
+
+@pytest.mark.asyncio
+async def test_cron_cycle_skips_overlapping_run(fake_bot, monkeypatch):
+    from app import scheduler
+
+    async def _fail(*args, **kwargs):
+        raise AssertionError("overlapping cycle must not run")
+
+    monkeypatch.setattr(scheduler, "_run_cron_cycle", _fail)
+    async with scheduler._cron_lock:
+        await refresh_prices_and_notify(fake_bot, cast(Any, None))
+
+
+@pytest.mark.asyncio
+async def test_cron_cycle_records_refresh_run(
+    fake_bot, users_repo: PostgresUserRepo, products_repo: ProductsRepo, session, monkeypatch
+):
+    from app.repositories.refresh_runs import RefreshRunsRepo
+    from app.services.marketplace_client import MarketplaceBlockedError
+    from app.services.ozon_client import OzonBlockedError, OzonProductInfo
+
+    user = await users_repo.ensure_user(3006)
+    ids = [
+        await products_repo.create(
+            user_id=user.id,
+            url=f"https://www.ozon.ru/item/run-{i}",
+            title=f"R{i}",
+            target_price=100.00,
+            current_price=200.00,
+        )
+        for i in range(3)
+    ]
+
+    async def _mine():
+        for pid in ids:
+            p = await products_repo.get_by_id(pid)
+            assert p is not None
+            yield p
+
+    monkeypatch.setattr(products_repo, "list_all_active", _mine)
+
+    async def fake_fetch(url: str):
+        if url.endswith("run-1"):
+            raise MarketplaceBlockedError("captcha") from OzonBlockedError("captcha")
+        if url.endswith("run-2"):
+            raise TimeoutError
+        return OzonProductInfo(title="X", price_no_card=Decimal("90"), price_with_card=None)
+
+    monkeypatch.setattr("app.scheduler.fetch_product_info", fake_fetch)
+    monkeypatch.setattr("app.scheduler.PostgresUserRepo", lambda s: users_repo)
+    monkeypatch.setattr("app.scheduler.ProductsRepo", lambda s: products_repo)
+
+    await refresh_prices_and_notify(fake_bot, cast(Any, make_session_maker(session)))
+
+    run = max(await RefreshRunsRepo(session).list_recent(50), key=lambda r: r.id)
+    assert (run.cycle, run.status) == ("cron", "completed")
+    assert run.products_checked == 1 and run.fetches == 3
+    assert run.errors == 2 and run.blocks == 1
+    assert run.errors_by_type == {"OzonBlockedError": 1, "TimeoutError": 1}
+    assert run.notifications == 1
+    assert run.fetch_p50_ms is not None and run.fetch_p95_ms is not None
+
+
+@pytest.mark.asyncio
+async def test_cancelled_cycle_is_not_recorded(monkeypatch):
+    from app import scheduler as scheduler_mod
+
+    saved = []
+
+    async def _save(*args):
+        saved.append(args)
+
+    monkeypatch.setattr(scheduler_mod, "_save_run", _save)
+
+    with pytest.raises(asyncio.CancelledError):
+        async with scheduler_mod._track_cycle("rolling", cast(Any, None)):
+            raise asyncio.CancelledError
+
+    async with scheduler_mod._track_cycle("rolling", cast(Any, None)):
+        pass
+    assert [args[1:3] for args in saved] == [("rolling", "completed")]
+
+
+@pytest.mark.asyncio
+async def test_cron_cycle_stops_when_leadership_is_lost(
+    fake_bot, users_repo: PostgresUserRepo, products_repo: ProductsRepo, session, monkeypatch
+):
+    from app.metrics import refresh_skipped_products_total
+    from app.repositories.scheduler_state import SchedulerStateRepo
+    from app.scheduler import CRON_CURSOR_KEY
+
+    user = await users_repo.ensure_user(3008)
+    ids = [
+        await products_repo.create(
+            user_id=user.id,
+            url=f"https://www.ozon.ru/item/leader-{i}",
+            title=f"L{i}",
+            target_price=100.00,
+            current_price=200.00,
+        )
+        for i in range(3)
+    ]
+
+    async def _mine():
+        for pid in ids:
+            p = await products_repo.get_by_id(pid)
+            assert p is not None
+            yield p
+
+    fetched = []
+
+    async def fake_fetch(url: str):
+        from app.services.ozon_client import OzonProductInfo
+
+        fetched.append(url)
+        return OzonProductInfo(title="X", price_no_card=Decimal("300"), price_with_card=None)
+
+    class _Leader:
+        checks = 0
+
+        async def check(self):
+            self.checks += 1
+            return False
+
+    monkeypatch.setattr(products_repo, "list_all_active", _mine)
+    monkeypatch.setattr("app.scheduler.fetch_product_info", fake_fetch)
+    monkeypatch.setattr("app.scheduler.PostgresUserRepo", lambda s: users_repo)
+    monkeypatch.setattr("app.scheduler.ProductsRepo", lambda s: products_repo)
+    monkeypatch.setattr("app.scheduler.LEADER_CHECK_EVERY", 1)
+    skipped = refresh_skipped_products_total.labels("leadership")
+    skipped_before = skipped._value.get()
+    leader = _Leader()
+
+    session_maker = cast(Any, make_session_maker(session))
+    await refresh_prices_and_notify(fake_bot, session_maker, leader=cast(Any, leader))
+
+    assert len(fetched) == 1 and leader.checks == 1
+    assert skipped._value.get() - skipped_before == 2
+    state = SchedulerStateRepo(session)
+    assert await state.get_datetime(CRON_CURSOR_KEY) is not None
+    await state.delete(CRON_CURSOR_KEY)
+
+
+@pytest.mark.asyncio
+async def test_rolling_ticks_prune_refresh_runs_once_per_window(monkeypatch):
+    from app import scheduler as scheduler_mod
+
+    pruned = []
+
+    class _Runs:
+        def __init__(self, session):
+            pass
+
+        async def add_to_window(self, **kwargs):
+            pass
+
+        async def add(self, **kwargs):
+            pass
+
+        async def delete_older_than(self, cutoff):
+            pruned.append(cutoff)
+
+    monkeypatch.setattr(scheduler_mod, "RefreshRunsRepo", _Runs)
+    monkeypatch.setattr(scheduler_mod._RunsRetention, "window", None)
+    session_maker = cast(Any, make_session_maker(None))
+    stats = scheduler_mod.CycleStats()
+
+    for minute in (0, 1, 59):
+        started = datetime(2026, 1, 1, 10, minute)
+        await scheduler_mod._save_run(session_maker, "rolling", "completed", started, stats)
+    assert len(pruned) == 1
+    await scheduler_mod._save_run(
+        session_maker, "rolling", "completed", datetime(2026, 1, 1, 11, 0), stats
+    )
+    await scheduler_mod._save_run(
+        session_maker, "cron", "completed", datetime(2026, 1, 1, 11, 5), stats
+    )
+    assert len(pruned) == 3
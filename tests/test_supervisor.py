@@ -0,0 +1,149 @@
+import asyncio
+import queue
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message, Update
+from prometheus_client import REGISTRY
+
+from app.supervisor import ShardForwarder, WorkerPool, chat_id_of, consume_updates
+
+USER = {"id": 42, "is_bot": False, "first_name": "T"}
+
+
+def _message_update(update_id: int, chat_id: int, text: str = "hi") -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"},
+                "from": USER,
+                "text": text,
+            },
+        }
+    )
+
+
+def test_chat_id_of_messages_callbacks_and_chatless_updates():
+    assert chat_id_of(_message_update(1, -100500)) == -100500
+
+    callback = Update.model_validate(
+        {
+            "update_id": 2,
+            "callback_query": {
+                "id": "c",
+                "from": USER,
+                "chat_instance": "x",
+                "data": "d",
+                "message": {"message_id": 5, "date": 0, "chat": {"id": 77, "type": "private"}},
+            },
+        }
+    )
+    assert chat_id_of(callback) == 77
+
+    inline = Update.model_validate(
+        {"update_id": 3, "inline_query": {"id": "q", "from": USER, "query": "", "offset": ""}}
+    )
+    assert chat_id_of(inline) == 42
+
+
+@pytest.mark.asyncio
+async def test_forwarder_shards_by_chat_and_round_trips_updates():
+    queues: list = [queue.Queue() for _ in range(3)]
+    forwarder = ShardForwarder(queues)
+
+    async def handler(event, data):
+        raise AssertionError("the front dispatcher must not handle updates")
+
+    for update_id, chat_id in ((1, 9), (2, 10), (3, 9), (4, -100501)):
+        await forwarder(handler, _message_update(update_id, chat_id), {})
+
+    assert [q.qsize() for q in queues] == [2, 1, 1]
+    original = _message_update(1, 9)
+    assert Update.model_validate_json(queues[0].get()) == original
+
+
+@pytest.mark.asyncio
+async def test_consume_updates_feeds_dispatcher_until_sentinel():
+    seen = []
+    router = Router()
+
+    @router.message()
+    async def _collect(message: Message) -> None:
+        seen.append((message.chat.id, message.text))
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    updates: queue.Queue = queue.Queue()
+    for update_id in (1, 2):
+        update = _message_update(update_id, 9, text=f"m{update_id}")
+        updates.put(update.model_dump_json(by_alias=True, exclude_unset=True))
+    updates.put(None)
+
+    bot = Bot("42:TEST")
+    try:
+        await asyncio.wait_for(consume_updates(updates, dp, bot, poll_interval=0.05), 5)  # type: ignore[arg-type]
+    finally:
+        await bot.session.close()
+    assert sorted(seen) == [(9, "m1"), (9, "m2")]
+
+
+@pytest.mark.asyncio
+async def test_consume_updates_keeps_chat_order_and_runs_chats_concurrently():
+    seen = []
+    other_chat_done = asyncio.Event()
+    router = Router()
+
+    @router.message()
+    async def _collect(message: Message) -> None:
+        if message.text == "slow":
+            # Only finishes if chat 10 is not stuck behind chat 9.
+            await asyncio.wait_for(other_chat_done.wait(), 2)
+        seen.append((message.chat.id, message.text))
+        if message.chat.id == 10:
+            other_chat_done.set()
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    updates: queue.Queue = queue.Queue()
+    for update_id, chat_id, text in ((1, 9, "slow"), (2, 9, "fast"), (3, 10, "other")):
+        update = _message_update(update_id, chat_id, text=text)
+        updates.put(update.model_dump_json(by_alias=True, exclude_unset=True))
+    updates.put("not json")
+    updates.put(None)
+
+    bot = Bot("42:TEST")
+    try:
+        await asyncio.wait_for(consume_updates(updates, dp, bot, poll_interval=0.05), 5)  # type: ignore[arg-type]
+    finally:
+        await bot.session.close()
+    assert seen == [(10, "other"), (9, "slow"), (9, "fast")]
+
+
+def _exit_at_once(shard, workers, updates):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_restarts_exited_workers():
+    def restarts():
+        return (
+            REGISTRY.get_sample_value(
+                "marketplace_bot_supervisor_worker_restarts_total", {"shard": "0"}
+            )
+            or 0.0
+        )
+
+    before = restarts()
+    pool = WorkerPool(_exit_at_once, 1, check_interval=0.05)
+    pool.start()
+    try:
+        for _ in range(200):
+            if restarts() > before:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        await pool.stop(timeout=10)
+    assert restarts() > before
@@ -0,0 +1,74 @@
+import contextlib
+import sys
+
+import pytest
+
+from app.utils import tracing
+
+
+class _FakeTracer:
+    def __init__(self) -> None:
+        self.spans = []
+
+    @contextlib.contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        self.spans.append((name, attributes))
+        yield
+
+
+@pytest.fixture
+def fake_tracer(monkeypatch):
+    tracer = _FakeTracer()
+    monkeypatch.setattr(tracing._Tracing, "tracer", tracer)
+    return tracer
+
+
+def test_setup_tracing_without_opentelemetry(monkeypatch):
+    monkeypatch.setitem(sys.modules, "opentelemetry", None)
+    assert tracing.setup_tracing() is False
+    assert tracing._Tracing.tracer is None
+
+
+def test_span_is_noop_when_disabled():
+    with tracing.span("anything", {"k": "v"}):
+        pass
+
+
+def test_span_drops_empty_attributes(fake_tracer):
+    with tracing.span("handler.start", {"telegram.user_id": 7, "handler.kind": None}):
+        pass
+    assert fake_tracer.spans == [("handler.start", {"telegram.user_id": 7})]
+
+
+@pytest.mark.asyncio
+async def test_traced_methods_wraps_public_coroutines(fake_tracer):
+    @tracing.traced_methods
+    class Repo:
+        async def get(self, x):
+            return x * 2
+
+        async def _private(self):
+            return 1
+
+        async def stream(self):
+            yield 1
+
+    repo = Repo()
+    assert await repo.get(21) == 42
+    assert await repo._private() == 1
+    assert [i async for i in repo.stream()] == [1]
+    assert [name for name, _ in fake_tracer.spans] == ["Repo.get"]
+
+
+@pytest.mark.asyncio
+async def test_handler_decorator_opens_span(fake_tracer, dummy_message):
+    from app.utils.logging import log_message_handler
+
+    @log_message_handler("ping")
+    async def handler(message):
+        return "pong"
+
+    assert await handler(dummy_message) == "pong"
+    assert fake_tracer.spans == [
+        ("handler.ping", {"handler.kind": "message", "telegram.user_id": 1000})
+    ]
@@ -2,7 +2,7 @@ from decimal import Decimal
 
 import pytest
 
-from app.utils.validators import is_marketplace_url, parse_price
+from app.utils.validators import is_marketplace_url, marketplace_of, parse_price
 
 
 @pytest.mark.parametrize(
@@ -41,3 +41,18 @@ def test_parse_price_bad(text):
 )
 def test_is_marketplace_url(url, ok):
     assert is_marketplace_url(url) is ok
+
+
+@pytest.mark.parametrize(
+    "url, marketplace",
+    [
+        ("https://www.ozon.ru/product/abc", "ozon"),
+        ("HTTPS://OZON.RU", "ozon"),
+        ("https://wb.ru/product/1", "wildberries"),
+        ("https://www.wildberries.ru/catalog/1/detail.aspx", "wildberries"),
+        ("https://not-ozon.ru/product/abc", None),
+        ("https://example.com/?next=https://www.ozon.ru/", None),
+    ],
+)
+def test_marketplace_of(url, marketplace):
+    assert marketplace_of(url) == marketplace
@@ -8,6 +8,7 @@ from app.services.wb_client import (
     WBProductInfo,
     _extract_product_id,
     _get_api_url,
+    _parse_product,
     fetch_product_info,
 )
 
@@ -231,3 +232,29 @@ async def test_fetch_product_info_invalid_json():
     with patch("app.services.wb_client.aiohttp.ClientSession", return_value=mock_session):
         with pytest.raises(WBBlockedError):
             await fetch_product_info("https://www.wildberries.ru/catalog/123456789/detail.aspx")
+
+
+def test_get_api_url_uses_configured_base():
+    from app.services import wb_client
+
+    wb_client.configure_api_base_url("http://127.0.0.1:9000/")
+    try:
+        assert _get_api_url(42).startswith("http://127.0.0.1:9000/cards/v2/detail?")
+    finally:
+        wb_client.configure_api_base_url(wb_client.DEFAULT_API_BASE_URL)
+
+
+def test_parse_product_prices_and_empty_payload():
+    info = _parse_product(
+        {
+            "data": {
+                "products": [{"name": "X", "sizes": [{"price": {"total": 12345, "product": 0}}]}]
+            }
+        }
+    )
+    assert info.title == "X"
+    assert info.price_with_card == Decimal("123.45")
+    assert info.price_no_card is None
+
+    with pytest.raises(WBBlockedError, match="No product data"):
+        _parse_product({"data": {"products": []}})
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import signal
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.webhook import add_webhook_routes, register_webhook, wait_for_shutdown
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 10,
+        "date": 0,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "T"},
+        "text": "hi",
+    },
+}
+
+
+class _FakeSession:
+    async def close(self) -> None:
+        pass
+
+
+class _FakeBot:
+    id = 1
+
+    def __init__(self) -> None:
+        self.session = _FakeSession()
+        self.webhook = None
+
+    async def set_webhook(self, url, **kwargs) -> None:
+        self.webhook = {"url": url, **kwargs}
+
+
+def _dispatcher(seen: list) -> Dispatcher:
+    dp = Dispatcher(admin_ids=frozenset({7}))
+    router = Router()
+
+    @router.message()
+    async def _echo(message: Message, admin_ids: frozenset[int]) -> None:
+        seen.append((message.text, admin_ids))
+
+    dp.include_router(router)
+    return dp
+
+
+@pytest.mark.asyncio
+async def test_webhook_checks_secret_and_feeds_dispatcher():
+    seen: list = []
+    app = web.Application()
+    bot = Bot("42:TEST")
+    add_webhook_routes(app, _dispatcher(seen), bot, path="/tg", secret_token="s3cret")  # noqa: S106
+
+    async with TestClient(TestServer(app)) as client:
+        for headers in ({}, {"X-Telegram-Bot-Api-Secret-Token": "nope"}):
+            resp = await client.post("/tg", json=UPDATE, headers=headers)
+            assert resp.status == 401
+
+        resp = await client.post(
+            "/tg", json=UPDATE, headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"}
+        )
+        assert resp.status == 200
+        for _ in range(50):
+            if seen:
+                break
+            await asyncio.sleep(0.01)
+
+    assert seen == [("hi", frozenset({7}))]
+
+
+@pytest.mark.asyncio
+async def test_register_webhook_limits_updates_to_used_types():
+    bot = _FakeBot()
+    await register_webhook(bot, _dispatcher([]), url="https://bot.example/tg", secret_token="")  # type: ignore[arg-type]
+    assert bot.webhook == {
+        "url": "https://bot.example/tg",
+        "secret_token": None,
+        "allowed_updates": ["message"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_wait_for_shutdown_returns_on_sigterm():
+    waiter = asyncio.create_task(wait_for_shutdown())
+    await asyncio.sleep(0)
+    os.kill(os.getpid(), signal.SIGTERM)
+    await asyncio.wait_for(waiter, timeout=2)